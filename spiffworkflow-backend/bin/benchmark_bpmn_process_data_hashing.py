@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""Compares how often bpmn process data gets hashed when every task of a process instance is saved.
+
+The changes are rolled back so this is safe to run against any process instance.
+"""
+
+import sys
+import time
+
+from spiffworkflow_backend import create_app
+from spiffworkflow_backend.models.db import db
+from spiffworkflow_backend.models.process_instance import ProcessInstanceModel
+from spiffworkflow_backend.services.process_instance_processor import ProcessInstanceProcessor
+from spiffworkflow_backend.services.task_service import TaskService
+
+
+def save_every_task(processor: ProcessInstanceProcessor, hash_after_every_task: bool) -> tuple[int, float]:
+    """Saves every task and returns how often bpmn process data was hashed and how long it took.
+
+    With hash_after_every_task the pending bpmn process data is hashed after each task like it was before it was batched.
+    """
+    task_service = TaskService(
+        process_instance=processor.process_instance_model,
+        serializer=processor._serializer,
+        bpmn_definition_to_task_definitions_mappings=processor.bpmn_definition_to_task_definitions_mappings,
+        task_model_mapping=processor.task_model_mapping,
+        bpmn_subprocess_mapping=processor.bpmn_subprocess_mapping,
+    )
+
+    hash_count = 0
+    update_task_data_on_bpmn_process = task_service.update_task_data_on_bpmn_process
+
+    def counting_update_task_data_on_bpmn_process(*args, **kwargs):  # type: ignore
+        nonlocal hash_count
+        hash_count += 1
+        return update_task_data_on_bpmn_process(*args, **kwargs)
+
+    task_service.update_task_data_on_bpmn_process = counting_update_task_data_on_bpmn_process  # type: ignore
+
+    start = time.perf_counter()
+    for spiff_task in processor.bpmn_process_instance.get_tasks():
+        task_service.update_task_model_with_spiff_task(spiff_task, store_process_instance_events=False)
+        if hash_after_every_task:
+            task_service.update_pending_task_data_on_bpmn_processes()
+    task_service.save_objects_to_database(save_process_instance_events=False)
+    elapsed = time.perf_counter() - start
+    db.session.rollback()
+    return (hash_count, elapsed)
+
+
+def main(process_instance_id: str) -> None:
+    app = create_app()
+    with app.app_context():
+        process_instance = ProcessInstanceModel.query.filter_by(id=process_instance_id).first()
+        if not process_instance:
+            raise Exception(f"Could not find a process instance with id: {process_instance_id}")
+
+        processor = ProcessInstanceProcessor(process_instance, include_completed_subprocesses=True)
+        task_count = len(processor.bpmn_process_instance.get_tasks())
+        per_task_hash_count, per_task_elapsed = save_every_task(processor, hash_after_every_task=True)
+        batched_hash_count, batched_elapsed = save_every_task(processor, hash_after_every_task=False)
+
+        print(f"Tasks saved: {task_count}")
+        print(f"Bpmn process data hashes: {batched_hash_count} batched, {per_task_hash_count} when hashed after every task")
+        print(f"Save pass time: {batched_elapsed:.3f}s batched, {per_task_elapsed:.3f}s when hashed after every task")
+
+
+if len(sys.argv) < 2:
+    raise Exception("Process instance id not supplied")
+
+main(sys.argv[1])
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""Measures how long it takes to load process instances and how many queries it takes.
+
+Pass the ids of process instances with different numbers of active subprocesses to see
+how load latency changes with the subprocess count.
+"""
+
+import sys
+import time
+from typing import Any
+
+from sqlalchemy import event
+
+from spiffworkflow_backend import create_app
+from spiffworkflow_backend.models.bpmn_process import BpmnProcessModel
+from spiffworkflow_backend.models.db import db
+from spiffworkflow_backend.models.process_instance import ProcessInstanceModel
+from spiffworkflow_backend.services.process_instance_processor import ProcessInstanceProcessor
+
+ITERATIONS = 10
+
+
+def main(process_instance_ids: list[str]) -> None:
+    app = create_app()
+    with app.app_context():
+        query_count = 0
+
+        def count_query(*_args: Any, **_kwargs: Any) -> None:
+            nonlocal query_count
+            query_count += 1
+
+        event.listen(db.engine, "before_cursor_execute", count_query)
+        print("process_instance_id, subprocesses, queries, mean_seconds, max_seconds")
+        for process_instance_id in process_instance_ids:
+            process_instance = ProcessInstanceModel.query.filter_by(id=process_instance_id).first()
+            if not process_instance:
+                raise Exception(f"Could not find a process instance with id: {process_instance_id}")
+            subprocess_count = BpmnProcessModel.query.filter_by(top_level_process_id=process_instance.bpmn_process_id).count()
+
+            durations = []
+            for _ in range(ITERATIONS):
+                # start from an empty session each time so nothing is served from the identity map
+                db.session.expunge_all()
+                process_instance = ProcessInstanceModel.query.filter_by(id=process_instance_id).first()
+                query_count = 0
+                start = time.perf_counter()
+                ProcessInstanceProcessor(process_instance)
+                durations.append(time.perf_counter() - start)
+
+            mean_duration = sum(durations) / len(durations)
+            print(f"{process_instance_id}, {subprocess_count}, {query_count}, {mean_duration:.4f}, {max(durations):.4f}")
+        event.remove(db.engine, "before_cursor_execute", count_query)
+
+
+if len(sys.argv) < 2:
+    raise Exception("At least one process instance id must be supplied")
+
+main(sys.argv[1:])
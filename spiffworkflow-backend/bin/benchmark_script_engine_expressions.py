@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+"""Measures how many gateway style expressions the script engine can evaluate per second.
+
+Every evaluate used to instantiate every Script subclass and build closures for it. The script helpers are
+now built once per process so this shows how much of each evaluate is left for the expression itself.
+Expressions run against the first task of the given process instance with made up task data and nothing is saved.
+"""
+
+import sys
+import time
+
+from spiffworkflow_backend import create_app
+from spiffworkflow_backend.models.process_instance import ProcessInstanceModel
+from spiffworkflow_backend.scripts.script import Script
+from spiffworkflow_backend.services.process_instance_processor import ProcessInstanceProcessor
+
+EXPRESSIONS = [
+    "amount > 1000",
+    "approved == True and amount <= 1000",
+    "len(items) > 2",
+    "get_env() != 'production'",
+]
+
+
+def main(process_instance_id: str, iterations: int) -> None:
+    app = create_app()
+    with app.app_context():
+        process_instance = ProcessInstanceModel.query.filter_by(id=process_instance_id).first()
+        if not process_instance:
+            raise Exception(f"Could not find a process instance with id: {process_instance_id}")
+        processor = ProcessInstanceProcessor(process_instance)
+        script_engine = processor._script_engine
+        spiff_task = processor.bpmn_process_instance.get_tasks()[0]
+        spiff_task.data = {"amount": 1500, "approved": True, "items": [1, 2, 3]}
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for expression in EXPRESSIONS:
+                script_engine.evaluate(spiff_task, expression)
+        elapsed = time.perf_counter() - start
+        evaluations = iterations * len(EXPRESSIONS)
+        print(f"Script functions: {len(Script.script_functions())}")
+        print(f"Expressions evaluated: {evaluations}")
+        print(f"Expressions per second: {evaluations / elapsed:.0f}")
+        print(f"Microseconds per expression: {elapsed / evaluations * 1_000_000:.1f}")
+
+
+if len(sys.argv) < 2:
+    raise Exception("Process instance id not supplied")
+
+main(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 10000)
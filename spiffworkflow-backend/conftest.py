@@ -8,8 +8,11 @@ from flask.app import Flask
 from spiffworkflow_backend.models.bpmn_process import BpmnProcessModel
 from spiffworkflow_backend.models.db import db
 from spiffworkflow_backend.models.user import UserModel
+from spiffworkflow_backend.services.authentication_service import AuthenticationService
 from spiffworkflow_backend.services.authorization_service import AuthorizationService
+from spiffworkflow_backend.services.data_setup_service import DataSetupService
 from spiffworkflow_backend.services.process_model_service import ProcessModelService
+from spiffworkflow_backend.services.spec_file_service import SpecFileService
 from tests.spiffworkflow_backend.helpers.base_test import BaseTest
 
 # We need to call this before importing spiffworkflow_backend
@@ -51,12 +54,18 @@ def with_db_and_bpmn_file_cleanup() -> None:
     for table in reversed(meta.sorted_tables):
         db.session.execute(table.delete())
     db.session.commit()
+    # ids get reused once the tables are emptied so anything cached by generation or principal id is stale
+    AuthorizationService.clear_permission_matcher_cache()
+    AuthenticationService.VERIFIED_TOKEN_CACHE.clear()
 
     try:
         yield
     finally:
         if os.path.exists(ProcessModelService.root_path()):
             shutil.rmtree(ProcessModelService.root_path())
+        ProcessModelService.clear_process_model_catalog()
+        SpecFileService.REFERENCES_CACHE.clear()
+        DataSetupService.REFERENCES_BY_FILE = {}
 
 
 @pytest.fixture()
@@ -1,3 +1,7 @@
 CELERY_TASK_PROCESS_INSTANCE_RUN = (
     "spiffworkflow_backend.background_processing.celery_tasks.process_instance_task.celery_task_process_instance_run"
 )
+CELERY_TASK_MESSAGE_INSTANCE_PAIRS_CORRELATE = (
+    "spiffworkflow_backend.background_processing.celery_tasks.message_correlation_task."
+    "celery_task_correlate_message_instance_pairs"
+)
@@ -1,10 +1,38 @@
 import os
+import threading
+import time
+from datetime import datetime
+from datetime import timezone
 
 import flask.wrappers
+from apscheduler.events import EVENT_SCHEDULER_STARTED  # type: ignore
 from apscheduler.schedulers.background import BackgroundScheduler  # type: ignore
+from apscheduler.schedulers.base import STATE_RUNNING  # type: ignore
 from apscheduler.schedulers.base import BaseScheduler  # type: ignore
 
 from spiffworkflow_backend.background_processing.background_processing_service import BackgroundProcessingService
+from spiffworkflow_backend.background_processing.background_wakeup_channel import WAKEUP_TOPIC_ALL
+from spiffworkflow_backend.background_processing.background_wakeup_channel import WAKEUP_TOPIC_FUTURE_TASK
+from spiffworkflow_backend.background_processing.background_wakeup_channel import WAKEUP_TOPIC_MESSAGE_INSTANCE
+from spiffworkflow_backend.background_processing.background_wakeup_channel import WAKEUP_TOPIC_PROCESS_INSTANCE_QUEUE_PREFIX
+from spiffworkflow_backend.background_processing.background_wakeup_channel import BackgroundWakeupChannel
+from spiffworkflow_backend.background_processing.background_wakeup_channel import Wakeup
+from spiffworkflow_backend.models.process_instance import ProcessInstanceStatus
+from spiffworkflow_backend.services.process_instance_service import ProcessInstanceService
+
+# the jobs a wakeup for each topic runs early. the job ids are the names of the BackgroundProcessingService methods they run.
+WAKEUP_TOPIC_JOB_IDS = {
+    WAKEUP_TOPIC_MESSAGE_INSTANCE: "process_message_instances",
+    WAKEUP_TOPIC_FUTURE_TASK: "process_future_tasks",
+}
+for _status in [
+    ProcessInstanceStatus.not_started,
+    ProcessInstanceStatus.waiting,
+    ProcessInstanceStatus.running,
+    ProcessInstanceStatus.user_input_required,
+]:
+    _topic = f"{WAKEUP_TOPIC_PROCESS_INSTANCE_QUEUE_PREFIX}{_status.value}"
+    WAKEUP_TOPIC_JOB_IDS[_topic] = f"process_{_status.value}_process_instances"
 
 
 def should_start_apscheduler(app: flask.app.Flask) -> bool:
@@ -35,9 +63,66 @@ def start_apscheduler(app: flask.app.Flask, scheduler_class: BaseScheduler = Bac
 
     _add_jobs_that_should_run_regardless_of_celery_config(app, scheduler)
 
+    if app.config["SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_WAKEUPS_ENABLED"]:
+        _start_wakeup_listener(app, scheduler)
+
     scheduler.start()
 
 
+def _polling_interval(app: flask.app.Flask, polling_interval_in_seconds: int) -> int:
+    """With wakeups over postgres the jobs run as soon as there is work so polling is only a safety net for missed wakeups.
+
+    Other databases only deliver wakeups from this process and the scheduler usually runs in a process of its own
+    so it has to keep polling at the normal interval to see work queued anywhere else.
+    """
+    if not app.config["SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_WAKEUPS_ENABLED"]:
+        return polling_interval_in_seconds
+    with app.app_context():
+        if not BackgroundWakeupChannel.uses_postgres():
+            return polling_interval_in_seconds
+    return max(
+        polling_interval_in_seconds,
+        int(app.config["SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_WAKEUP_SAFETY_NET_POLLING_INTERVAL_IN_SECONDS"]),
+    )
+
+
+def _wake_up_jobs(app: flask.app.Flask, scheduler: BaseScheduler, wakeup: Wakeup) -> None:
+    if scheduler.state != STATE_RUNNING:
+        return
+    topic = wakeup["topic"]
+    run_at_in_seconds = int(wakeup.get("run_at_in_seconds") or time.time())
+    topics = list(WAKEUP_TOPIC_JOB_IDS.keys()) if topic == WAKEUP_TOPIC_ALL else [topic]
+    for topic_to_wake in topics:
+        wake_at_in_seconds = run_at_in_seconds
+        if topic_to_wake.startswith(WAKEUP_TOPIC_PROCESS_INSTANCE_QUEUE_PREFIX) and topic != WAKEUP_TOPIC_ALL:
+            # do_waiting leaves recently enqueued process instances alone for a while
+            wake_at_in_seconds = max(
+                wake_at_in_seconds, round(time.time()) + ProcessInstanceService.WAITING_MIN_AGE_IN_SECONDS + 1
+            )
+        elif topic_to_wake == WAKEUP_TOPIC_FUTURE_TASK:
+            # future tasks are picked up once they are within the lookahead
+            wake_at_in_seconds -= int(app.config["SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_FUTURE_TASK_LOOKAHEAD_IN_SECONDS"])
+
+        job = scheduler.get_job(WAKEUP_TOPIC_JOB_IDS.get(topic_to_wake, ""))
+        if job is None or job.next_run_time is None:
+            continue
+        wake_at = datetime.fromtimestamp(max(wake_at_in_seconds, time.time()), tz=timezone.utc)
+        # only ever move jobs earlier so a wakeup never delays work that is already due
+        if wake_at < job.next_run_time:
+            scheduler.modify_job(job.id, next_run_time=wake_at)
+
+
+def _start_wakeup_listener(app: flask.app.Flask, scheduler: BaseScheduler) -> None:
+    listener_thread = threading.Thread(
+        target=BackgroundWakeupChannel.listen,
+        args=(app, lambda wakeup: _wake_up_jobs(app, scheduler, wakeup)),
+        name="spiff-bg-wakeup-listener",
+        daemon=True,
+    )
+    # jobs can only be woken up once the scheduler is running and a blocking scheduler never returns from start
+    scheduler.add_listener(lambda _event: listener_thread.start(), EVENT_SCHEDULER_STARTED)
+
+
 def _add_jobs_for_celery_based_configuration(app: flask.app.Flask, scheduler: BaseScheduler) -> None:
     future_task_execution_interval_in_seconds = app.config[
         "SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_FUTURE_TASK_EXECUTION_INTERVAL_IN_SECONDS"
@@ -47,6 +132,7 @@ def _add_jobs_for_celery_based_configuration(app: flask.app.Flask, scheduler: Ba
         BackgroundProcessingService(app).process_future_tasks,
         "interval",
         seconds=future_task_execution_interval_in_seconds,
+        id="process_future_tasks",
     )
 
 
@@ -58,23 +144,25 @@ def _add_jobs_for_non_celery_based_configuration(app: flask.app.Flask, scheduler
     ]
     # TODO: add job to release locks to simplify other queries
     # TODO: add job to delete completed entires
-    # TODO: add job to run old/low priority instances so they do not get drowned out
 
     # we should be able to remove these once we switch over to future tasks for non-celery configuration
     scheduler.add_job(
         BackgroundProcessingService(app).process_waiting_process_instances,
         "interval",
-        seconds=polling_interval_in_seconds,
+        seconds=_polling_interval(app, polling_interval_in_seconds),
+        id="process_waiting_process_instances",
     )
     scheduler.add_job(
         BackgroundProcessingService(app).process_running_process_instances,
         "interval",
-        seconds=polling_interval_in_seconds,
+        seconds=_polling_interval(app, polling_interval_in_seconds),
+        id="process_running_process_instances",
     )
     scheduler.add_job(
         BackgroundProcessingService(app).process_user_input_required_process_instances,
         "interval",
-        seconds=user_input_required_polling_interval_in_seconds,
+        seconds=_polling_interval(app, user_input_required_polling_interval_in_seconds),
+        id="process_user_input_required_process_instances",
     )
 
 
@@ -87,14 +175,16 @@ def _add_jobs_that_should_run_regardless_of_celery_config(app: flask.app.Flask,
     scheduler.add_job(
         BackgroundProcessingService(app).process_message_instances_with_app_context,
         "interval",
-        seconds=10,
+        seconds=_polling_interval(app, 10),
+        id="process_message_instances",
     )
 
     # when you create a process instance via the API and do not use the run API method, this would pick up the instance.
     scheduler.add_job(
         BackgroundProcessingService(app).process_not_started_process_instances,
         "interval",
-        seconds=not_started_polling_interval_in_seconds,
+        seconds=_polling_interval(app, not_started_polling_interval_in_seconds),
+        id="process_not_started_process_instances",
     )
     scheduler.add_job(
         BackgroundProcessingService(app).remove_stale_locks,
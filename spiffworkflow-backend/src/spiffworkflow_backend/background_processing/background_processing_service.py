@@ -1,4 +1,5 @@
 import time
+from typing import Any
 
 import flask
 from sqlalchemy import and_
@@ -7,15 +8,19 @@ from sqlalchemy import or_
 from spiffworkflow_backend.background_processing.celery_tasks.process_instance_task_producer import (
     queue_future_task_if_appropriate,
 )
+from spiffworkflow_backend.background_processing.process_instance_worker_pool import ProcessInstanceWorkerPool
 from spiffworkflow_backend.models.db import db
 from spiffworkflow_backend.models.future_task import FutureTaskModel
 from spiffworkflow_backend.models.process_instance import ProcessInstanceModel
 from spiffworkflow_backend.models.process_instance import ProcessInstanceStatus
-from spiffworkflow_backend.models.task import TaskModel  # noqa: F401
+from spiffworkflow_backend.models.task import TaskModel
 from spiffworkflow_backend.services.message_service import MessageService
 from spiffworkflow_backend.services.process_instance_lock_service import ProcessInstanceLockService
 from spiffworkflow_backend.services.process_instance_service import ProcessInstanceService
 
+# how many due future tasks are looked up and queued per query
+FUTURE_TASK_BATCH_SIZE = 500
+
 
 class BackgroundProcessingService:
     """Used to facilitate doing work outside of an HTTP request/response."""
@@ -27,25 +32,31 @@ class BackgroundProcessingService:
         """Since this runs in a scheduler, we need to specify the app context as well."""
         with self.app.app_context():
             ProcessInstanceLockService.set_thread_local_locking_context("bg:notstarted")
-            ProcessInstanceService.do_waiting(ProcessInstanceStatus.not_started.value)
+            self.do_waiting(ProcessInstanceStatus.not_started.value)
 
     def process_waiting_process_instances(self) -> None:
         """Since this runs in a scheduler, we need to specify the app context as well."""
         with self.app.app_context():
             ProcessInstanceLockService.set_thread_local_locking_context("bg:waiting")
-            ProcessInstanceService.do_waiting(ProcessInstanceStatus.waiting.value)
+            self.do_waiting(ProcessInstanceStatus.waiting.value)
 
     def process_running_process_instances(self) -> None:
         """Since this runs in a scheduler, we need to specify the app context as well."""
         with self.app.app_context():
             ProcessInstanceLockService.set_thread_local_locking_context("bg:running")
-            ProcessInstanceService.do_waiting(ProcessInstanceStatus.running.value)
+            self.do_waiting(ProcessInstanceStatus.running.value)
 
     def process_user_input_required_process_instances(self) -> None:
         """Since this runs in a scheduler, we need to specify the app context as well."""
         with self.app.app_context():
             ProcessInstanceLockService.set_thread_local_locking_context("bg:userinput")
-            ProcessInstanceService.do_waiting(ProcessInstanceStatus.user_input_required.value)
+            self.do_waiting(ProcessInstanceStatus.user_input_required.value)
+
+    def do_waiting(self, status_value: str) -> None:
+        if ProcessInstanceWorkerPool.is_enabled(self.app):
+            ProcessInstanceWorkerPool.for_app(self.app).do_waiting(status_value)
+        else:
+            ProcessInstanceService.do_waiting(status_value)
 
     def process_message_instances_with_app_context(self) -> None:
         """Since this runs in a scheduler, we need to specify the app context as well."""
@@ -74,35 +85,64 @@ class BackgroundProcessingService:
 
     @classmethod
     def do_process_future_tasks(cls, future_task_lookahead_in_seconds: int) -> None:
-        future_tasks = cls.imminent_future_tasks(future_task_lookahead_in_seconds)
-        for future_task in future_tasks:
-            process_instance = (
-                ProcessInstanceModel.query.join(TaskModel, TaskModel.process_instance_id == ProcessInstanceModel.id)
-                .filter(TaskModel.guid == future_task.guid)
-                .first()
+        """Queues the future tasks that are due within the lookahead in the order they are due.
+
+        The future tasks and their process instances are looked up in batches instead of one query per future task.
+        """
+        lookahead_in_seconds = round(time.time() + future_task_lookahead_in_seconds)
+        due_guids = [
+            guid
+            for (guid,) in cls.future_tasks_not_yet_queued()
+            .filter(FutureTaskModel.run_at_in_seconds < lookahead_in_seconds)
+            .order_by(FutureTaskModel.run_at_in_seconds)
+            .with_entities(FutureTaskModel.guid)
+            .all()
+        ]
+
+        for index in range(0, len(due_guids), FUTURE_TASK_BATCH_SIZE):
+            guids = due_guids[index : index + FUTURE_TASK_BATCH_SIZE]
+            future_tasks = cls.future_tasks_not_yet_queued().filter(FutureTaskModel.guid.in_(guids)).all()  # type: ignore
+            process_instances_by_task_guid: dict[str, ProcessInstanceModel] = dict(
+                db.session.query(TaskModel.guid, ProcessInstanceModel)
+                .join(ProcessInstanceModel, ProcessInstanceModel.id == TaskModel.process_instance_id)
+                .filter(TaskModel.guid.in_(guids))  # type: ignore
+                .all()
             )
-            if process_instance and process_instance.allowed_to_run():
-                queue_future_task_if_appropriate(
-                    process_instance, eta_in_seconds=future_task.run_at_in_seconds, task_guid=future_task.guid
-                )
-            else:
-                # if we are not allowed to run the process instance, we should not keep processing the future task
-                future_task.archived_for_process_instance_status = True
-                db.session.add(future_task)
-                db.session.commit()
+            for future_task in future_tasks:
+                if future_task.run_at_in_seconds >= lookahead_in_seconds:
+                    # it was moved later since the due future tasks were looked up
+                    continue
+                process_instance = process_instances_by_task_guid.get(future_task.guid)
+                if process_instance and process_instance.allowed_to_run():
+                    if queue_future_task_if_appropriate(
+                        process_instance, eta_in_seconds=future_task.run_at_in_seconds, task_guid=future_task.guid
+                    ):
+                        # remember it was handed off so it is not loaded and queued again
+                        future_task.queued_to_run_at_in_seconds = future_task.run_at_in_seconds
+                        db.session.add(future_task)
+                else:
+                    # if we are not allowed to run the process instance, we should not keep processing the future task
+                    future_task.archived_for_process_instance_status = True
+                    db.session.add(future_task)
+            db.session.commit()
 
     @classmethod
-    def imminent_future_tasks(cls, future_task_lookahead_in_seconds: int) -> list[FutureTaskModel]:
-        lookahead = time.time() + future_task_lookahead_in_seconds
-        future_tasks: list[FutureTaskModel] = FutureTaskModel.query.filter(
+    def future_tasks_not_yet_queued(cls) -> Any:
+        return FutureTaskModel.query.filter(
             and_(
                 FutureTaskModel.completed == False,  # noqa: E712
                 FutureTaskModel.archived_for_process_instance_status == False,  # noqa: E712
-                FutureTaskModel.run_at_in_seconds < lookahead,
                 or_(
                     FutureTaskModel.queued_to_run_at_in_seconds != FutureTaskModel.run_at_in_seconds,
                     FutureTaskModel.queued_to_run_at_in_seconds == None,  # noqa: E711
                 ),
             )
-        ).all()
+        )
+
+    @classmethod
+    def imminent_future_tasks(cls, future_task_lookahead_in_seconds: int) -> list[FutureTaskModel]:
+        lookahead = time.time() + future_task_lookahead_in_seconds
+        future_tasks: list[FutureTaskModel] = (
+            cls.future_tasks_not_yet_queued().filter(FutureTaskModel.run_at_in_seconds < lookahead).all()
+        )
         return future_tasks
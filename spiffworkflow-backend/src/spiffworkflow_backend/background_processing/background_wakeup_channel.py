@@ -0,0 +1,168 @@
+import json
+import queue
+import select
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+import flask
+from flask import current_app
+from flask import has_app_context
+from sqlalchemy import text
+from sqlalchemy.event import listens_for
+from sqlalchemy.orm import Session
+
+from spiffworkflow_backend.models.db import db
+from spiffworkflow_backend.models.db import dialect_name
+
+WAKEUP_CHANNEL_NAME = "spiffworkflow_backend_wakeup"
+PENDING_WAKEUPS_SESSION_KEY = "spiffworkflow_backend_pending_wakeups"
+
+# tells the listener that notifications may have been missed so everything should be checked
+WAKEUP_TOPIC_ALL = "all"
+WAKEUP_TOPIC_MESSAGE_INSTANCE = "message_instance"
+WAKEUP_TOPIC_FUTURE_TASK = "future_task"
+WAKEUP_TOPIC_PROCESS_INSTANCE_QUEUE_PREFIX = "process_instance_queue:"
+
+# wakeups for the background processor in this process when the database cannot deliver them.
+# only filled while something listens so processes without a background processor do not collect them.
+LOCAL_WAKEUPS: queue.SimpleQueue = queue.SimpleQueue()
+LOCAL_LISTENER_IS_RUNNING = threading.Event()
+
+Wakeup = dict[str, Any]
+
+
+class BackgroundWakeupChannel:
+    """Tells the background processor that there is new work instead of making it wait for its next poll.
+
+    Wakeups are published against the current db session and only go out when that session commits so the
+    background processor never wakes up before it can see the new rows. On postgres they are sent with
+    NOTIFY in the committing transaction and received with LISTEN so any process can wake the background
+    processor. Other databases fall back to a queue in this process which only reaches a background
+    processor running in the same process. The background processor keeps polling slowly either way
+    in case a wakeup is missed.
+    """
+
+    @classmethod
+    def is_enabled(cls) -> bool:
+        return has_app_context() and bool(current_app.config["SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_WAKEUPS_ENABLED"])
+
+    @classmethod
+    def uses_postgres(cls) -> bool:
+        return dialect_name() == "postgresql"
+
+    @classmethod
+    def publish(cls, topic: str, run_at_in_seconds: int | None = None, session: Session | None = None) -> None:
+        """Wakes the background processor for the topic at run_at_in_seconds once the session commits.
+
+        Publishing the same topic more than once in a transaction only sends the earliest wakeup.
+        """
+        if not cls.is_enabled():
+            return
+        if session is None:
+            # db.session is a scoped_session which does not proxy in_transaction so use the session it manages
+            session = db.session()
+        if run_at_in_seconds is None:
+            run_at_in_seconds = round(time.time())
+        # rollbacks are only seen inside a transaction so start one now in case nothing else does before a rollback
+        if not session.in_transaction():
+            session.begin()
+        pending_wakeups: dict[str, int] = session.info.setdefault(PENDING_WAKEUPS_SESSION_KEY, {})
+        if topic not in pending_wakeups or run_at_in_seconds < pending_wakeups[topic]:
+            pending_wakeups[topic] = run_at_in_seconds
+
+    @classmethod
+    def publish_process_instance_queue(cls, status_value: str, run_at_in_seconds: int, session: Session | None = None) -> None:
+        cls.publish(f"{WAKEUP_TOPIC_PROCESS_INSTANCE_QUEUE_PREFIX}{status_value}", run_at_in_seconds, session=session)
+
+    @classmethod
+    def listen(cls, app: flask.app.Flask, on_wakeup: Callable[[Wakeup], None], stop_event: threading.Event | None = None) -> None:
+        """Calls on_wakeup for every wakeup until stop_event is set. Meant to run on its own thread."""
+        if stop_event is None:
+            stop_event = threading.Event()
+        with app.app_context():
+            uses_postgres = cls.uses_postgres()
+
+        while not stop_event.is_set():
+            try:
+                if uses_postgres:
+                    cls._listen_with_postgres(app, on_wakeup, stop_event)
+                else:
+                    cls._listen_locally(on_wakeup, stop_event)
+            except Exception as exception:
+                app.logger.exception(f"Background wakeup listener failed. Trying again in 5 seconds: {exception}")
+                stop_event.wait(5)
+
+    @classmethod
+    def _listen_locally(cls, on_wakeup: Callable[[Wakeup], None], stop_event: threading.Event) -> None:
+        LOCAL_LISTENER_IS_RUNNING.set()
+        # nothing is collected while not listening so check everything once
+        on_wakeup({"topic": WAKEUP_TOPIC_ALL, "run_at_in_seconds": round(time.time())})
+        try:
+            while not stop_event.is_set():
+                try:
+                    wakeup = LOCAL_WAKEUPS.get(timeout=1)
+                except queue.Empty:
+                    continue
+                on_wakeup(wakeup)
+        finally:
+            LOCAL_LISTENER_IS_RUNNING.clear()
+
+    @classmethod
+    def _listen_with_postgres(
+        cls, app: flask.app.Flask, on_wakeup: Callable[[Wakeup], None], stop_event: threading.Event
+    ) -> None:
+        with app.app_context():
+            pooled_connection = db.engine.raw_connection()
+        # keep the listening connection out of the pool since it stays in autocommit mode and listening
+        pooled_connection.detach()
+        connection = pooled_connection.driver_connection
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {WAKEUP_CHANNEL_NAME}")
+            # anything published while not listening was missed
+            on_wakeup({"topic": WAKEUP_TOPIC_ALL, "run_at_in_seconds": round(time.time())})
+            while not stop_event.is_set():
+                readable, _, _ = select.select([connection], [], [], 1)
+                if not readable:
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    notification = connection.notifies.pop(0)
+                    on_wakeup(json.loads(notification.payload))
+        finally:
+            pooled_connection.close()
+
+
+@listens_for(Session, "before_commit")  # type: ignore
+def notify_postgres_of_pending_wakeups(session: Session) -> None:
+    if not BackgroundWakeupChannel.is_enabled() or not BackgroundWakeupChannel.uses_postgres():
+        return
+    # commit flushes right after this anyway. flushing first picks up wakeups that are published while flushing.
+    session.flush()
+    pending_wakeups = session.info.pop(PENDING_WAKEUPS_SESSION_KEY, None)
+    if not pending_wakeups:
+        return
+    # NOTIFY is transactional so these go out when the commit does
+    for topic, run_at_in_seconds in pending_wakeups.items():
+        session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": WAKEUP_CHANNEL_NAME, "payload": json.dumps({"topic": topic, "run_at_in_seconds": run_at_in_seconds})},
+        )
+
+
+@listens_for(Session, "after_commit")  # type: ignore
+def send_pending_wakeups_locally(session: Session) -> None:
+    pending_wakeups = session.info.pop(PENDING_WAKEUPS_SESSION_KEY, None)
+    if not pending_wakeups or not LOCAL_LISTENER_IS_RUNNING.is_set():
+        return
+    for topic, run_at_in_seconds in pending_wakeups.items():
+        LOCAL_WAKEUPS.put({"topic": topic, "run_at_in_seconds": run_at_in_seconds})
+
+
+# after_rollback only runs when the database had something to roll back
+@listens_for(Session, "after_soft_rollback")  # type: ignore
+def discard_pending_wakeups(session: Session, _previous_transaction: Any) -> None:
+    session.info.pop(PENDING_WAKEUPS_SESSION_KEY, None)
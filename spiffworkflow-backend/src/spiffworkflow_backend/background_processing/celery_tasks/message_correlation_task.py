@@ -0,0 +1,21 @@
+from celery import shared_task
+from flask import current_app
+
+from spiffworkflow_backend.services.message_service import MessageService
+from spiffworkflow_backend.services.process_instance_lock_service import ProcessInstanceLockService
+
+ten_minutes = 60 * 10
+
+
+@shared_task(ignore_result=False, time_limit=ten_minutes, bind=True)
+def celery_task_correlate_message_instance_pairs(  # type: ignore
+    self, process_instance_id: int, message_instance_id_pairs: list[list[int]], execution_mode: str | None = None
+) -> dict:
+    celery_task_id = self.request.id
+    current_app.logger.info(
+        f"celery_task_correlate_message_instance_pairs[{celery_task_id}]: process_instance_id: {process_instance_id} "
+        f"message_instance_id_pairs: {message_instance_id_pairs}"
+    )
+    ProcessInstanceLockService.set_thread_local_locking_context("celery:worker")
+    MessageService.correlate_message_instance_pairs(process_instance_id, message_instance_id_pairs, execution_mode=execution_mode)
+    return {"ok": True, "process_instance_id": process_instance_id, "message_instance_id_pairs": message_instance_id_pairs}
@@ -3,6 +3,7 @@ import time
 import celery
 from flask import current_app
 
+from spiffworkflow_backend.background_processing import CELERY_TASK_MESSAGE_INSTANCE_PAIRS_CORRELATE
 from spiffworkflow_backend.background_processing import CELERY_TASK_PROCESS_INSTANCE_RUN
 from spiffworkflow_backend.exceptions.api_error import ApiError
 from spiffworkflow_backend.helpers.spiff_enum import ProcessInstanceExecutionMode
@@ -83,3 +84,19 @@ def queue_process_instance_if_appropriate(
         current_app.logger.info(f"Queueing process instance ({process_instance.id}) for celery ({async_result.task_id})")
         return True
     return False
+
+
+def queue_message_instance_pairs_for_correlation(
+    process_instance_id: int, message_instance_id_pairs: list[list[int]], execution_mode: str | None = None
+) -> None:
+    """Hands matched send and receive message instances for one receiving process instance to a celery worker."""
+    args_to_celery = {
+        "process_instance_id": process_instance_id,
+        "message_instance_id_pairs": message_instance_id_pairs,
+        "execution_mode": execution_mode,
+    }
+    async_result = celery.current_app.send_task(CELERY_TASK_MESSAGE_INSTANCE_PAIRS_CORRELATE, kwargs=args_to_celery)
+    current_app.logger.info(
+        f"Queueing {len(message_instance_id_pairs)} messages for process instance ({process_instance_id}) "
+        f"for celery ({async_result.task_id})"
+    )
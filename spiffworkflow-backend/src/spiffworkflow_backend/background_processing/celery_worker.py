@@ -7,6 +7,9 @@ import celery
 from spiffworkflow_backend import create_app
 
 # we need to import tasks from this file so they can be used elsewhere in the app
+from spiffworkflow_backend.background_processing.celery_tasks.message_correlation_task import (
+    celery_task_correlate_message_instance_pairs,  # noqa: F401
+)
 from spiffworkflow_backend.background_processing.celery_tasks.process_instance_task import (
     celery_task_process_instance_run,  # noqa: F401
 )
@@ -0,0 +1,218 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import flask
+from flask import current_app
+from prometheus_client import Counter
+from prometheus_client import Gauge
+from prometheus_client import Histogram
+
+from spiffworkflow_backend.models.process_instance import ProcessInstanceModel
+from spiffworkflow_backend.services.process_instance_lock_service import ProcessInstanceLockService
+from spiffworkflow_backend.services.process_instance_queue_service import ProcessInstanceQueueService
+from spiffworkflow_backend.services.process_instance_service import ProcessInstanceService
+
+WORKER_POOL_QUEUE_DEPTH_GAUGE = Gauge(
+    "spiffworkflow_backend_background_queue_depth",
+    "Process instances ready to be run by the background worker pool by status at the start of the last tick",
+    ["status"],
+)
+WORKER_POOL_IN_FLIGHT_GAUGE = Gauge(
+    "spiffworkflow_backend_background_worker_pool_in_flight",
+    "Jobs handed to the background worker pool that have not finished yet. Each one claims and runs a process instance",
+)
+WORKER_POOL_RUN_DURATION_HISTOGRAM = Histogram(
+    "spiffworkflow_backend_background_process_instance_run_seconds",
+    "Time a background worker spent running one process instance by status",
+    ["status"],
+)
+WORKER_POOL_DEADLINE_EXCEEDED_COUNTER = Counter(
+    "spiffworkflow_backend_background_worker_pool_deadline_exceeded",
+    "Ticks that stopped handing out process instances because they reached their deadline by status",
+    ["status"],
+)
+
+# holds the app each worker process creates for itself when the pool uses processes
+WORKER_PROCESS_APPS: dict[str, flask.app.Flask] = {}
+
+
+def claim_and_run_waiting_process_instance_in_worker(
+    process_instance_id: int, status_value: str, execution_strategy_name: str
+) -> float | None:
+    """Claims the given process instance if it is still waiting to run with the given status and runs it. Expects an app context.
+
+    Returns how long it took or None if something else already ran or claimed it.
+    """
+    start = time.perf_counter()
+    # every worker has its own locked_by so workers never use each other's locks
+    ProcessInstanceLockService.set_thread_local_locking_context("bg:worker")
+    # claiming here instead of in the scheduler keeps the process instance locked in the db until it has run
+    queue_entries = ProcessInstanceQueueService.claim_many(
+        status_value,
+        round(time.time()),
+        ProcessInstanceService.WAITING_MIN_AGE_IN_SECONDS,
+        limit=1,
+        include_process_instance_ids={process_instance_id},
+    )
+    if len(queue_entries) == 0:
+        return None
+    try:
+        process_instance = ProcessInstanceModel.query.filter_by(id=process_instance_id).first()
+        if process_instance is not None:
+            ProcessInstanceService.run_waiting_process_instance(process_instance, status_value, execution_strategy_name)
+    finally:
+        ProcessInstanceQueueService.release_claims()
+    return time.perf_counter() - start
+
+
+def initialize_worker_process() -> None:
+    # imported here since spiffworkflow_backend imports the background processing modules while it is being initialized
+    from spiffworkflow_backend import create_app
+
+    # the worker processes only run what they are given so they must not start a scheduler of their own
+    os.environ["SPIFFWORKFLOW_BACKEND_RUN_BACKGROUND_SCHEDULER_IN_CREATE_APP"] = "false"
+    WORKER_PROCESS_APPS["app"] = create_app()
+
+
+def claim_and_run_waiting_process_instance_in_worker_process(
+    process_instance_id: int, status_value: str, execution_strategy_name: str
+) -> float | None:
+    if "app" not in WORKER_PROCESS_APPS:
+        raise Exception("The worker process was not initialized with initialize_worker_process")
+    with WORKER_PROCESS_APPS["app"].app_context():
+        return claim_and_run_waiting_process_instance_in_worker(process_instance_id, status_value, execution_strategy_name)
+
+
+class ProcessInstanceWorkerPool:
+    """Runs waiting process instances concurrently for deployments that do not use celery.
+
+    Each tick lists the process instances that are ready to run in queue order and hands the pool one job per process
+    instance that no job has been handed yet. Each job claims its process instance with claim_many when it starts so
+    the process instance stays locked in the db while it runs and other schedulers skip it. A job whose process
+    instance was already claimed elsewhere does nothing. Only as many jobs as there are workers are
+    handed out at once so a tick waits for a free worker instead of piling up work. A tick stops handing out work
+    at its deadline and leaves anything still running to finish on its own, so a slow process instance only ties
+    up its own worker.
+    """
+
+    def __init__(self, app: flask.app.Flask) -> None:
+        self.app = app
+        self.size = int(app.config["SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_WORKER_POOL_SIZE"])
+        self.pool_type = app.config["SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_WORKER_POOL_TYPE"]
+        if self.pool_type not in ["thread", "process"]:
+            raise Exception(
+                "SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_WORKER_POOL_TYPE must be either 'thread' or 'process' but"
+                f" was: {self.pool_type}"
+            )
+        self.available_workers = threading.Semaphore(self.size)
+        # process instances handed to jobs that have not finished yet so a later tick does not hand them out again
+        self.in_flight_process_instance_ids: set[int] = set()
+        self.in_flight_lock = threading.Lock()
+        self.executor = self._new_executor()
+
+    @property
+    def in_flight_count(self) -> int:
+        return len(self.in_flight_process_instance_ids)
+
+    @classmethod
+    def is_enabled(cls, app: flask.app.Flask) -> bool:
+        return (
+            not app.config["SPIFFWORKFLOW_BACKEND_CELERY_ENABLED"]
+            and int(app.config["SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_WORKER_POOL_SIZE"]) > 0
+        )
+
+    @classmethod
+    def for_app(cls, app: flask.app.Flask) -> "ProcessInstanceWorkerPool":
+        worker_pool: ProcessInstanceWorkerPool | None = app.extensions.get("process_instance_worker_pool")
+        if worker_pool is None:
+            worker_pool = cls(app)
+            app.extensions["process_instance_worker_pool"] = worker_pool
+        return worker_pool
+
+    def do_waiting(self, status_value: str) -> None:
+        """Hands the pool a job for each process instance with the given status that is ready to run. Expects an app context."""
+        deadline = time.monotonic() + float(
+            current_app.config["SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_WORKER_POOL_TICK_DEADLINE_IN_SECONDS"]
+        )
+        execution_strategy_name = current_app.config["SPIFFWORKFLOW_BACKEND_ENGINE_STEP_DEFAULT_STRATEGY_BACKGROUND"]
+        ready_process_instance_ids = ProcessInstanceQueueService.peek_many(
+            status_value, round(time.time()), ProcessInstanceService.WAITING_MIN_AGE_IN_SECONDS
+        )
+        WORKER_POOL_QUEUE_DEPTH_GAUGE.labels(status_value).set(len(ready_process_instance_ids))
+
+        for process_instance_id in ready_process_instance_ids:
+            with self.in_flight_lock:
+                if process_instance_id in self.in_flight_process_instance_ids:
+                    continue
+            if not self.available_workers.acquire(timeout=max(deadline - time.monotonic(), 0)):
+                WORKER_POOL_DEADLINE_EXCEEDED_COUNTER.labels(status_value).inc()
+                current_app.logger.info(
+                    f"Worker pool {status_value}: Reached the tick deadline with process instances left to run. "
+                    "They will be picked up on the next tick."
+                )
+                return
+            self._submit(process_instance_id, status_value, execution_strategy_name)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self.executor.shutdown(wait=wait)
+
+    def _new_executor(self) -> Executor:
+        if self.pool_type == "process":
+            return ProcessPoolExecutor(
+                max_workers=self.size,
+                # fork would copy the database connections of this process into every worker
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=initialize_worker_process,
+            )
+        return ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="spiff-bg-worker")
+
+    def _run_in_worker_thread(self, process_instance_id: int, status_value: str, execution_strategy_name: str) -> float | None:
+        with self.app.app_context():
+            return claim_and_run_waiting_process_instance_in_worker(process_instance_id, status_value, execution_strategy_name)
+
+    def _submit(self, process_instance_id: int, status_value: str, execution_strategy_name: str) -> None:
+        with self.in_flight_lock:
+            self.in_flight_process_instance_ids.add(process_instance_id)
+            WORKER_POOL_IN_FLIGHT_GAUGE.set(len(self.in_flight_process_instance_ids))
+
+        function_to_run = claim_and_run_waiting_process_instance_in_worker_process
+        if self.pool_type == "thread":
+            function_to_run = self._run_in_worker_thread
+        try:
+            future = self.executor.submit(function_to_run, process_instance_id, status_value, execution_strategy_name)
+        except BrokenProcessPool:
+            # a worker process died abruptly so start over with new ones and let the next tick pick this up again
+            self._finish(process_instance_id)
+            current_app.logger.error(f"Worker pool {status_value}: Worker processes stopped unexpectedly. Restarting them.")
+            self.executor.shutdown(wait=False)
+            self.executor = self._new_executor()
+            return
+        except Exception:
+            self._finish(process_instance_id)
+            raise
+
+        def on_done(done_future: Future) -> None:
+            self._finish(process_instance_id)
+            exception = done_future.exception()
+            if exception is not None:
+                self.app.logger.error(
+                    f"Worker pool {status_value}: Error running a process instance: {exception}",
+                    exc_info=exception,
+                )
+            elif done_future.result() is not None:
+                WORKER_POOL_RUN_DURATION_HISTOGRAM.labels(status_value).observe(done_future.result())
+
+        future.add_done_callback(on_done)
+
+    def _finish(self, process_instance_id: int) -> None:
+        with self.in_flight_lock:
+            self.in_flight_process_instance_ids.discard(process_instance_id)
+            WORKER_POOL_IN_FLIGHT_GAUGE.set(len(self.in_flight_process_instance_ids))
+        self.available_workers.release()
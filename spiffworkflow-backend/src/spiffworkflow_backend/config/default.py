@@ -72,6 +72,35 @@ config_from_env("SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_ALLOW_OPTIMISTIC_CHE
 config_from_env("SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_POLLING_INTERVAL_IN_SECONDS", default=10)
 config_from_env("SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_NOT_STARTED_POLLING_INTERVAL_IN_SECONDS", default=30)
 config_from_env("SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_USER_INPUT_REQUIRED_POLLING_INTERVAL_IN_SECONDS", default=120)
+# without celery, the background scheduler locks this many queued process instances at a time with SKIP LOCKED
+# and runs them before locking more. the ones waiting their turn cannot be run by anything else, including users,
+# so keep it small.
+config_from_env("SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_DEQUEUE_BATCH_SIZE", default=1)
+# without celery, run waiting process instances on a pool of this many workers instead of one at a time in the scheduler.
+# each worker gets its own app context and locked_by. 0 runs them one at a time in the scheduler.
+config_from_env("SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_WORKER_POOL_SIZE", default=0)
+# "thread" or "process". process workers each create their own app so script engines and caches are not shared.
+config_from_env("SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_WORKER_POOL_TYPE", default="thread")
+# how long one scheduler tick waits for free workers before leaving the rest of the ready process instances to the next tick
+config_from_env("SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_WORKER_POOL_TICK_DEADLINE_IN_SECONDS", default=10)
+# wake the background scheduler as soon as process instances are queued, messages are created, or future tasks are
+# scheduled instead of waiting for the next poll. uses LISTEN/NOTIFY on postgres so web processes can wake a separate
+# scheduler process. other databases can only wake a scheduler running in the same process.
+config_from_env("SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_WAKEUPS_ENABLED", default=False)
+# with wakeups enabled on postgres, the scheduler only polls this often in case a wakeup is missed.
+# other databases keep the normal polling intervals since wakeups cannot reach a scheduler in another process.
+config_from_env("SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_WAKEUP_SAFETY_NET_POLLING_INTERVAL_IN_SECONDS", default=300)
+# queued process instances run in order of run_at_in_seconds, but each priority level (1 high, 2 normal, 3 low) counts as
+# waiting this many seconds less, so a low priority instance that has waited long enough still runs before new high ones.
+# 0 ignores priority.
+config_from_env("SPIFFWORKFLOW_BACKEND_PROCESS_INSTANCE_QUEUE_PRIORITY_AGING_IN_SECONDS", default=300)
+# each queued process instance of a process model counts as waiting this many seconds (times its priority) less than the
+# one before it, so process models with many queued instances take turns with other process models. 0 turns this off.
+config_from_env("SPIFFWORKFLOW_BACKEND_PROCESS_INSTANCE_QUEUE_FAIR_SHARE_IN_SECONDS", default=10)
+# when greater than 0, send messages are claimed and correlated in batches of this size and all messages for the same
+# receiving process instance are delivered with one load and save of that instance. with celery enabled, each receiving
+# process instance is handed to a worker. 0 correlates one send message at a time.
+config_from_env("SPIFFWORKFLOW_BACKEND_MESSAGE_CORRELATION_BATCH_SIZE", default=0)
 
 ### background with celery
 config_from_env("SPIFFWORKFLOW_BACKEND_CELERY_ENABLED", default=False)
@@ -235,6 +264,43 @@ config_from_env("SPIFFWORKFLOW_BACKEND_PROCESS_INSTANCE_FILE_DATA_FILESYSTEM_PAT
 config_from_env("SPIFFWORKFLOW_BACKEND_ALLOW_CONFISCATING_LOCK_AFTER_SECONDS", default="600")
 config_from_env("SPIFFWORKFLOW_BACKEND_MAX_INSTANCE_LOCK_DURATION_IN_SECONDS", default="300")
 
+### caching
+# max number of parsed process specs to keep in memory per process. set to 0 to disable the cache.
+config_from_env("SPIFFWORKFLOW_BACKEND_PROCESS_SPEC_CACHE_MAX_SIZE", default=100)
+# max number of process model files to keep parsed references for. entries are used until the file changes.
+config_from_env("SPIFFWORKFLOW_BACKEND_SPEC_FILE_REFERENCES_CACHE_MAX_SIZE", default=1000)
+# max number of worker processes used to parse changed process model files when rebuilding the reference cache
+# on startup and after git pulls. set to 1 to parse everything in the current process.
+config_from_env("SPIFFWORKFLOW_BACKEND_DATA_SETUP_MAX_PARSER_PROCESSES", default=4)
+# process groups and models are listed from an in memory catalog that is checked against the files on disk with one stat
+# per directory and json file. set this to trust the catalog for that many seconds without checking. changes made through
+# the api clear the catalog right away but changes made directly on disk can take this long to show up.
+config_from_env("SPIFFWORKFLOW_BACKEND_PROCESS_MODEL_CATALOG_REVALIDATE_AFTER_SECONDS", default=0)
+# max number of compiled jinja templates (instructions for end user, form schemas) to keep in memory per process.
+# set to 0 to parse and compile every template each time it is rendered.
+config_from_env("SPIFFWORKFLOW_BACKEND_JINJA_TEMPLATE_CACHE_MAX_SIZE", default=500)
+# max number of compiled permission matchers (one per distinct set of principals) to keep in memory per process.
+# set to 0 to check permissions with a database query on every request instead.
+config_from_env("SPIFFWORKFLOW_BACKEND_PERMISSION_MATCHER_CACHE_MAX_SIZE", default=1000)
+# max number of verified tokens to keep in memory per process so requests with a known token skip
+# signature verification, token validation, and the user lookup. set to 0 to verify every request.
+config_from_env("SPIFFWORKFLOW_BACKEND_VERIFIED_TOKEN_CACHE_MAX_SIZE", default=1000)
+# seconds a verified token is trusted before it is verified again. entries never outlive the exp of the token.
+config_from_env("SPIFFWORKFLOW_BACKEND_VERIFIED_TOKEN_CACHE_TTL_SECONDS", default=60)
+# max number of process model files from older git revisions to keep in memory per process. set to 0 to disable.
+config_from_env("SPIFFWORKFLOW_BACKEND_GIT_FILE_CONTENTS_CACHE_MAX_SIZE", default=500)
+# if set then files read from older git revisions are also stored in this directory so they survive restarts
+# and can be shared by processes on the same host.
+config_from_env("SPIFFWORKFLOW_BACKEND_GIT_FILE_CONTENTS_CACHE_DIR")
+# read files from older git revisions through one long running "git cat-file --batch" process per web process
+# instead of starting "git show" for each file.
+config_from_env("SPIFFWORKFLOW_BACKEND_GIT_FILE_CONTENTS_USE_CAT_FILE_BATCH", default=False)
+
+### json data
+# store task data as a delta against the data of the parent task instead of the full document.
+# this is the max number of deltas in a row before a full copy is stored again. set to 0 to always store full copies.
+config_from_env("SPIFFWORKFLOW_BACKEND_JSON_DATA_DELTA_SNAPSHOT_INTERVAL", default=0)
+
 ### other
 config_from_env(
     "SPIFFWORKFLOW_BACKEND_SYSTEM_NOTIFICATION_PROCESS_MODEL_MESSAGE_ID",
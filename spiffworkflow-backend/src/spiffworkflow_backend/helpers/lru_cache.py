@@ -0,0 +1,107 @@
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from collections.abc import Hashable
+from typing import Any
+from typing import Generic
+from typing import TypeVar
+
+from prometheus_client import Counter
+
+CacheKey = TypeVar("CacheKey", bound=Hashable)
+CacheValue = TypeVar("CacheValue")
+
+CACHE_REQUESTS_COUNTER = Counter(
+    "spiffworkflow_backend_cache_requests",
+    "Lookups against in-process caches by cache name and result (hit or miss)",
+    ["cache_name", "result"],
+)
+CACHE_EVICTIONS_COUNTER = Counter(
+    "spiffworkflow_backend_cache_evictions",
+    "Entries evicted from in-process caches because they reached their max size",
+    ["cache_name"],
+)
+
+
+class LRUCache(Generic[CacheKey, CacheValue]):
+    """A small thread-safe least-recently-used cache that keeps hit and miss counts.
+
+    Counts are kept locally so they can be inspected in tests and debug endpoints and
+    are also exported to prometheus with the cache name as a label.
+    A max_size of 0 disables the cache so every lookup is a miss.
+    """
+
+    def __init__(self, name: str, max_size: int = 128) -> None:
+        self.name = name
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[CacheKey, CacheValue] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: CacheKey, is_valid: Callable[[CacheValue], bool] | None = None) -> CacheValue | None:
+        """Returns the cached value or None.
+
+        If is_valid is given and returns False for the cached value, the entry is dropped and counted as a miss.
+        is_valid runs outside of the lock so it can do slow things like reading files.
+        """
+        with self._lock:
+            found = key in self._entries
+            value = self._entries.get(key)
+
+        if found and is_valid is not None and not is_valid(value):  # type: ignore
+            self.pop(key)
+            found = False
+
+        with self._lock:
+            if found:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                self.hits += 1
+                CACHE_REQUESTS_COUNTER.labels(cache_name=self.name, result="hit").inc()
+                return value
+            self.misses += 1
+            CACHE_REQUESTS_COUNTER.labels(cache_name=self.name, result="miss").inc()
+            return None
+
+    def set(self, key: CacheKey, value: CacheValue) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+                CACHE_EVICTIONS_COUNTER.labels(cache_name=self.name).inc()
+
+    def pop(self, key: CacheKey) -> CacheValue | None:
+        with self._lock:
+            return self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def resize(self, max_size: int) -> None:
+        with self._lock:
+            self.max_size = max_size
+            while len(self._entries) > max(max_size, 0):
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: CacheKey) -> bool:
+        return key in self._entries
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -12,6 +12,7 @@ from spiffworkflow_backend.models.db import db
 class CacheGenerationTable(SpiffEnum):
     reference_cache = "reference_cache"
     feature_flag = "feature_flag"
+    permission_assignment = "permission_assignment"
 
 
 class CacheGenerationModel(SpiffworkflowBaseDBModel):
@@ -9,6 +9,8 @@ from sqlalchemy.dialects.postgresql import insert as postgres_insert
 from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.sql import false
 
+from spiffworkflow_backend.background_processing.background_wakeup_channel import WAKEUP_TOPIC_FUTURE_TASK
+from spiffworkflow_backend.background_processing.background_wakeup_channel import BackgroundWakeupChannel
 from spiffworkflow_backend.models.db import SpiffworkflowBaseDBModel
 from spiffworkflow_backend.models.db import db
 from spiffworkflow_backend.models.task import TaskModel  # noqa: F401
@@ -61,3 +63,4 @@ class FutureTaskModel(SpiffworkflowBaseDBModel):
                 set_=new_values,
             )
         db.session.execute(on_duplicate_key_stmt)
+        BackgroundWakeupChannel.publish(WAKEUP_TOPIC_FUTURE_TASK, run_at_in_seconds)
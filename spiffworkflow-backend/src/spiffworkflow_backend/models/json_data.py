@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import copy
 import json
+from collections.abc import Iterable
 from hashlib import sha256
+from typing import NotRequired
 from typing import TypedDict
 
 from flask import current_app
@@ -19,24 +22,8 @@ class JsonDataModelNotFoundError(Exception):
 class JsonDataDict(TypedDict):
     hash: str
     data: dict
-
-
-# delta algorithm <- just to save it for when we want to try to implement it:
-#   a = {"hey": { "hey2": 2, "hey3": 3, "hey6": 7 }, "hey30": 3, "hey40": 4}
-#   b = {"hey": { "hey2": 4, "hey5": 3 }, "hey20": 2, "hey30": 3}
-#   a_keys = set(a.keys())
-#   b_keys = set(b.keys())
-#   removed = a_keys - b_keys
-#   added_keys = b_keys - a_keys
-#   keys_present_in_both = a_keys & b_keys
-#   changed = {}
-#   for key_in_both in keys_present_in_both:
-#       if a[key_in_both] != b[key_in_both]:
-#           changed[key_in_both] = b[key_in_both]
-#   added = {}
-#   for added_key in added_keys:
-#       added[added_key] = b[added_key]
-#   final_tuple = [added, removed, changed]
+    # set when data is a delta against the json data record with this hash instead of the full document
+    delta_base_hash: NotRequired[str | None]
 
 
 # to find the users of this model run:
@@ -49,6 +36,10 @@ class JsonDataModel(SpiffworkflowBaseDBModel):
     hash: str = db.Column(db.String(255), nullable=False, unique=True, primary_key=True)
     data: dict = db.Column(db.JSON, nullable=False)
 
+    # when set, data only holds the top level keys that were set or removed compared to the record with this hash.
+    # the hash is still the hash of the full document so records can be referenced the same way either way.
+    delta_base_hash: str | None = db.Column(db.String(255), nullable=True)
+
     @classmethod
     def find_object_by_hash(cls, hash: str) -> JsonDataModel:
         json_data_model: JsonDataModel | None = JsonDataModel.query.filter_by(hash=hash).first()
@@ -58,11 +49,84 @@ class JsonDataModel(SpiffworkflowBaseDBModel):
 
     @classmethod
     def find_data_dict_by_hash(cls, hash: str) -> dict:
-        return cls.find_object_by_hash(hash).data
+        data_dicts = cls.find_data_dicts_by_hashes([hash])
+        if hash not in data_dicts:
+            raise JsonDataModelNotFoundError(f"Could not find a json data model entry with hash: {hash}")
+        return data_dicts[hash]
+
+    @classmethod
+    def find_data_dicts_by_hashes(cls, hashes: Iterable[str]) -> dict[str, dict]:
+        """Returns the full data for each of the given hashes that exists.
+
+        Records stored as deltas are rebuilt from their base records which are loaded with
+        one query per level of the delta chains.
+        """
+        records_by_hash: dict[str, JsonDataModel] = {}
+        hashes_to_load = set(hashes)
+        while len(hashes_to_load) > 0:
+            json_data_records = cls.query.filter(cls.hash.in_(hashes_to_load)).all()  # type: ignore
+            for json_data_record in json_data_records:
+                records_by_hash[json_data_record.hash] = json_data_record
+            hashes_to_load = {
+                r.delta_base_hash
+                for r in json_data_records
+                if r.delta_base_hash is not None and r.delta_base_hash not in records_by_hash
+            }
+
+        data_by_hash: dict[str, dict] = {}
+        for json_data_hash in hashes:
+            if json_data_hash in records_by_hash:
+                cls._rebuild_data(json_data_hash, records_by_hash, data_by_hash)
+        return {h: data_by_hash[h] for h in hashes if h in data_by_hash}
+
+    @classmethod
+    def _rebuild_data(cls, json_data_hash: str, records_by_hash: dict[str, JsonDataModel], data_by_hash: dict[str, dict]) -> dict:
+        deltas_to_apply = []
+        current_hash = json_data_hash
+        while current_hash not in data_by_hash:
+            json_data_record = records_by_hash.get(current_hash)
+            if json_data_record is None:
+                raise JsonDataModelNotFoundError(
+                    f"Could not find the base json data model entry with hash: {current_hash} for: {json_data_hash}"
+                )
+            if json_data_record.delta_base_hash is None:
+                data_by_hash[current_hash] = json_data_record.data
+                break
+            deltas_to_apply.append(json_data_record)
+            current_hash = json_data_record.delta_base_hash
+
+        for json_data_record in reversed(deltas_to_apply):
+            data_by_hash[json_data_record.hash] = cls.apply_delta(
+                data_by_hash[json_data_record.delta_base_hash],
+                json_data_record.data,  # type: ignore
+            )
+        return data_by_hash[json_data_hash]
+
+    @classmethod
+    def delta_between(cls, base_data: dict, data: dict) -> dict:
+        """Returns the top level keys that need to be set on or removed from base_data to get data."""
+        set_keys = {}
+        for key, value in data.items():
+            if key not in base_data or type(base_data[key]) is not type(value) or base_data[key] != value:
+                set_keys[key] = value
+        removed_keys = [key for key in base_data if key not in data]
+        return {"set": set_keys, "removed": removed_keys}
+
+    @classmethod
+    def apply_delta(cls, base_data: dict, delta: dict) -> dict:
+        # copy so records built from the same base do not share nested objects
+        data = copy.deepcopy(base_data)
+        for removed_key in delta["removed"]:
+            data.pop(removed_key, None)
+        data.update(delta["set"])
+        return data
 
     @classmethod
     def insert_or_update_json_data_records(cls, json_data_hash_to_json_data_dict_mapping: dict[str, JsonDataDict]) -> None:
-        list_of_dicts = [*json_data_hash_to_json_data_dict_mapping.values()]
+        # every row in a multi row insert needs the same columns
+        list_of_dicts = [
+            {"delta_base_hash": None, **json_data_dict} for json_data_dict in json_data_hash_to_json_data_dict_mapping.values()
+        ]
         if len(list_of_dicts) > 0:
             on_duplicate_key_stmt = None
             if current_app.config["SPIFFWORKFLOW_BACKEND_DATABASE_TYPE"] == "mysql":
@@ -85,7 +149,16 @@ class JsonDataModel(SpiffworkflowBaseDBModel):
 
     @classmethod
     def json_data_dict_from_dict(cls, data: dict) -> JsonDataDict:
+        (json_data_dict, _) = cls.json_data_dict_and_size_from_dict(data)
+        return json_data_dict
+
+    @classmethod
+    def json_data_dict_and_size_from_dict(cls, data: dict) -> tuple[JsonDataDict, int]:
+        """Returns the json data dict along with the length of its json dump.
+
+        The dump is needed for the hash anyway so this lets callers track data sizes for free.
+        """
         task_data_json = json.dumps(data, sort_keys=True)
         task_data_hash: str = sha256(task_data_json.encode("utf8")).hexdigest()
         json_data_dict: JsonDataDict = {"hash": task_data_hash, "data": data}
-        return json_data_dict
+        return (json_data_dict, len(task_data_json))
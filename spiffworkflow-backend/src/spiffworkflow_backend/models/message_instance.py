@@ -11,6 +11,8 @@ from sqlalchemy.orm import Session
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm import validates
 
+from spiffworkflow_backend.background_processing.background_wakeup_channel import WAKEUP_TOPIC_MESSAGE_INSTANCE
+from spiffworkflow_backend.background_processing.background_wakeup_channel import BackgroundWakeupChannel
 from spiffworkflow_backend.models.db import SpiffworkflowBaseDBModel
 from spiffworkflow_backend.models.db import db
 from spiffworkflow_backend.models.process_instance import ProcessInstanceModel
@@ -20,6 +22,9 @@ if TYPE_CHECKING:
     from spiffworkflow_backend.models.message_instance_correlation import (  # noqa: F401,I001
         MessageInstanceCorrelationRuleModel,
     )
+    from spiffworkflow_backend.models.message_instance_correlation_key import (  # noqa: F401,I001
+        MessageInstanceCorrelationKeyModel,
+    )
 
 
 class MessageTypes(enum.Enum):
@@ -56,6 +61,9 @@ class MessageInstanceModel(SpiffworkflowBaseDBModel):
     updated_at_in_seconds: int = db.Column(db.Integer)
     created_at_in_seconds: int = db.Column(db.Integer)
     correlation_rules = relationship("MessageInstanceCorrelationRuleModel", back_populates="message_instance", cascade="delete")
+    correlation_key_records = relationship(
+        "MessageInstanceCorrelationKeyModel", back_populates="message_instance", cascade="delete"
+    )
 
     @validates("message_type")
     def validate_message_type(self, key: str, value: Any) -> Any:
@@ -152,3 +160,5 @@ def ensure_failure_cause_is_set_if_message_instance_failed(
         if isinstance(instance, MessageInstanceModel):
             if instance.status == "failed" and instance.failure_cause is None:
                 raise ValueError(f"{instance.__class__.__name__}: failure_cause must be set if status is failed")
+            if instance.status in [None, MessageStatuses.ready.value]:
+                BackgroundWakeupChannel.publish(WAKEUP_TOPIC_MESSAGE_INSTANCE, session=session)
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from hashlib import sha256
+from typing import Any
+
+from sqlalchemy import ForeignKey
+from sqlalchemy.orm import relationship
+
+from spiffworkflow_backend.models.db import SpiffworkflowBaseDBModel
+from spiffworkflow_backend.models.db import db
+from spiffworkflow_backend.models.message_instance import MessageInstanceModel
+
+
+@dataclass
+class MessageInstanceCorrelationKeyModel(SpiffworkflowBaseDBModel):
+    """The correlation keys of a receive message instance, computed once when the message instance is created.
+
+    There is one row for each correlation key of the receive message. The correlation_key_hash covers the
+    name, retrieval expression, and expected value of each correlation property the key requires so a send
+    message matches if the same hash can be built by running those retrieval expressions against its payload.
+    The correlation_properties column holds the names and retrieval expressions needed to do that and the
+    correlation_properties_hash lets the send side find the distinct sets of them it has to evaluate.
+
+    Rows without a correlation_properties_hash match send messages with exactly the same correlation_keys.
+    """
+
+    __tablename__ = "message_instance_correlation_key"
+    __table_args__ = (
+        db.Index(
+            "message_instance_correlation_key_name_hash",
+            "message_name",
+            "correlation_key_hash",
+        ),
+    )
+
+    id: int = db.Column(db.Integer, primary_key=True)
+    message_instance_id: int = db.Column(ForeignKey(MessageInstanceModel.id), nullable=False, index=True)  # type: ignore
+    message_name: str = db.Column(db.String(255), nullable=False)
+    correlation_key_hash: str = db.Column(db.String(64), nullable=False)
+    correlation_properties_hash: str | None = db.Column(db.String(64), nullable=True, index=True)
+    correlation_properties: list | None = db.Column(db.JSON)
+
+    message_instance = relationship("MessageInstanceModel", back_populates="correlation_key_records")
+
+    @classmethod
+    def hash_for(cls, value: Any) -> str:
+        """Raises a TypeError if the value cannot be serialized to json."""
+        return sha256(json.dumps(value, sort_keys=True).encode("utf8")).hexdigest()
+
+    @classmethod
+    def hash_for_identical_correlation_keys(cls, correlation_keys: dict) -> str:
+        return cls.hash_for(["correlation_keys", correlation_keys])
+
+    @classmethod
+    def hash_for_correlation_values(cls, correlation_properties: list[list[str]], correlation_values: list[Any]) -> str:
+        return cls.hash_for(
+            [
+                [name, retrieval_expression, value]
+                for (name, retrieval_expression), value in zip(correlation_properties, correlation_values, strict=True)
+            ]
+        )
+
+    @classmethod
+    def build_for_receive_message(cls, message_instance: MessageInstanceModel) -> list[MessageInstanceCorrelationKeyModel] | None:
+        """Mirrors MessageInstanceModel.correlates so these rows match the same send messages it would.
+
+        Returns None if the keys cannot be indexed in which case the message instance can still be
+        correlated by evaluating its retrieval expressions against each send message.
+        """
+        correlation_keys = message_instance.correlation_keys
+        if not isinstance(correlation_keys, dict):
+            return None
+
+        correlation_key_records = []
+        try:
+            if correlation_keys == {}:
+                # there is nothing to match on so this accepts any message with the given name
+                correlation_key_records.append(cls._build_for_expected_values(message_instance, {}))
+            else:
+                correlation_key_records.append(
+                    cls(
+                        message_instance=message_instance,
+                        message_name=message_instance.name,
+                        correlation_key_hash=cls.hash_for_identical_correlation_keys(correlation_keys),
+                    )
+                )
+                for expected_values in correlation_keys.values():
+                    correlation_key_records.append(cls._build_for_expected_values(message_instance, expected_values))
+        except (TypeError, ValueError, AttributeError):
+            return None
+        return correlation_key_records
+
+    @classmethod
+    def _build_for_expected_values(
+        cls, message_instance: MessageInstanceModel, expected_values: dict
+    ) -> MessageInstanceCorrelationKeyModel:
+        correlation_properties = sorted(
+            [correlation_rule.name, correlation_rule.retrieval_expression]
+            for correlation_rule in message_instance.correlation_rules
+            # a property without an expected value is not required for this instance to match
+            if expected_values.get(correlation_rule.name) is not None
+        )
+        correlation_values = [expected_values[name] for (name, _) in correlation_properties]
+        return cls(
+            message_instance=message_instance,
+            message_name=message_instance.name,
+            correlation_key_hash=cls.hash_for_correlation_values(correlation_properties, correlation_values),
+            correlation_properties_hash=cls.hash_for(correlation_properties),
+            correlation_properties=correlation_properties,
+        )
@@ -3,11 +3,19 @@ from dataclasses import dataclass
 from sqlalchemy import ForeignKey
 from sqlalchemy.orm import relationship
 
+from spiffworkflow_backend.helpers.spiff_enum import SpiffEnum
 from spiffworkflow_backend.models.db import SpiffworkflowBaseDBModel
 from spiffworkflow_backend.models.db import db
 from spiffworkflow_backend.models.process_instance import ProcessInstanceModel
 
 
+# lower values run first
+class ProcessInstanceQueuePriority(SpiffEnum):
+    high = 1
+    normal = 2
+    low = 3
+
+
 @dataclass
 class ProcessInstanceQueueModel(SpiffworkflowBaseDBModel):
     __tablename__ = "process_instance_queue"
@@ -22,6 +22,7 @@ PROCESS_MODEL_SUPPORTED_KEYS_FOR_DISK_SERIALIZATION = [
     "fault_or_suspend_on_exception",
     "exception_notification_addresses",
     "metadata_extraction_paths",
+    "queue_priority",
 ]
 
 
@@ -43,6 +44,8 @@ class ProcessModelInfo:
     fault_or_suspend_on_exception: str = NotificationType.fault.value
     exception_notification_addresses: list[str] = field(default_factory=list)
     metadata_extraction_paths: list[dict[str, str]] | None = None
+    # ProcessInstanceQueuePriority value new process instances of this model are queued with
+    queue_priority: int | None = None
 
     process_group: Any | None = None
     files: list[File] | None = field(default_factory=list[File])
@@ -113,6 +116,7 @@ class ProcessModelInfoSchema(Schema):
             required=False,
         )
     )
+    queue_priority = marshmallow.fields.Integer(allow_none=True)
 
     @post_load
     def make_spec(self, data: dict[str, str | bool | int | NotificationType], **_: Any) -> ProcessModelInfo:
@@ -16,6 +16,7 @@ from spiffworkflow_backend.exceptions.error import InvalidRedirectUrlError
 from spiffworkflow_backend.exceptions.error import MissingAccessTokenError
 from spiffworkflow_backend.exceptions.error import TokenExpiredError
 from spiffworkflow_backend.helpers.api_version import V1_API_PATH_PREFIX
+from spiffworkflow_backend.models.db import db
 from spiffworkflow_backend.models.group import SPIFF_NO_AUTH_GROUP
 from spiffworkflow_backend.models.group import GroupModel
 from spiffworkflow_backend.models.service_account import ServiceAccountModel
@@ -72,8 +73,18 @@ def verify_token(token: str | None = None, force_run: bool | None = False) -> di
     user_model = None
     decoded_token = None
     if token_info["token"] is not None:
-        decoded_token = _get_decoded_token(token_info["token"])
-        user_model = _get_user_model_from_token(decoded_token)
+        authentication_identifier = _get_authentication_identifier_from_request()
+        verified_token = AuthenticationService.get_verified_token(authentication_identifier, token_info["token"])
+        if verified_token is not None:
+            decoded_token = verified_token.decoded_token
+            user_model = db.session.get(UserModel, verified_token.user_id)
+        if user_model is None:
+            decoded_token = _get_decoded_token(token_info["token"])
+            user_model = _get_user_model_from_token(decoded_token)
+            if user_model is not None:
+                AuthenticationService.store_verified_token(
+                    authentication_identifier, token_info["token"], decoded_token, user_model.id
+                )
     elif token_info["api_key"] is not None:
         user_model = _get_user_model_from_api_key(token_info["api_key"])
     else:
@@ -220,6 +231,7 @@ def logout(id_token: str, authentication_identifier: str, redirect_url: str | No
     if redirect_url is None:
         redirect_url = ""
     AuthenticationService.set_user_has_logged_out()
+    _forget_verified_access_token_from_request()
 
     if backend_only:
         return redirect(redirect_url)
@@ -310,6 +322,17 @@ def _find_token_from_request(token: str | None) -> dict[str, str | None]:
     return token_info
 
 
+def _forget_verified_access_token_from_request() -> None:
+    # verified tokens are stored under the access token a request was made with and not the id token
+    access_token = None
+    if "Authorization" in request.headers:
+        access_token = request.headers["Authorization"].removeprefix("Bearer ")
+    elif "access_token" in request.cookies:
+        access_token = request.cookies["access_token"]
+    if access_token:
+        AuthenticationService.forget_verified_token(_get_authentication_identifier_from_request(), access_token)
+
+
 def _get_user_model_from_api_key(api_key: str) -> UserModel | None:
     api_key_hash = ServiceAccountModel.hash_api_key(api_key)
     service_account = ServiceAccountModel.query.filter_by(api_key_hash=api_key_hash).first()
@@ -419,8 +442,13 @@ def _get_user_from_decoded_internal_token(decoded_token: dict) -> UserModel | No
 
 
 def _get_decoded_token(token: str) -> dict:
+    authentication_identifier = _get_authentication_identifier_from_request()
+    verified_token = AuthenticationService.get_verified_token(authentication_identifier, token)
+    if verified_token is not None:
+        return verified_token.decoded_token
+
     try:
-        decoded_token: dict = AuthenticationService.parse_jwt_token(_get_authentication_identifier_from_request(), token)
+        decoded_token: dict = AuthenticationService.parse_jwt_token(authentication_identifier, token)
     except Exception as e:
         current_app.logger.warning(f"Received exception when attempting to decode token: {e.__class__.__name__}: {str(e)}")
         AuthenticationService.set_user_has_logged_out()
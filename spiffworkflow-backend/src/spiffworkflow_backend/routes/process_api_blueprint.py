@@ -85,7 +85,7 @@ def permissions_check(body: dict[str, dict[str, list[str]]]) -> flask.wrappers.R
     requests_to_check = body["requests_to_check"]
 
     user = g.user
-    permission_assignments = AuthorizationService.all_permission_assignments_for_user(user=user)
+    permission_assignment_matcher = AuthorizationService.permission_assignment_matcher_for_user(user=user)
 
     for target_uri, http_methods in requests_to_check.items():
         if target_uri not in response_dict:
@@ -94,8 +94,8 @@ def permissions_check(body: dict[str, dict[str, list[str]]]) -> flask.wrappers.R
         for http_method in http_methods:
             permission_string = AuthorizationService.get_permission_from_http_method(http_method)
             if permission_string:
-                has_permission = AuthorizationService.permission_assignments_include(
-                    permission_assignments=permission_assignments,
+                has_permission = AuthorizationService.permission_assignment_matcher_includes(
+                    permission_assignment_matcher=permission_assignment_matcher,
                     permission=permission_string,
                     target_uri=target_uri,
                 )
@@ -685,9 +685,17 @@ def _get_task_model_for_request(
         task_process_identifier = task_model.bpmn_process.bpmn_process_definition.bpmn_identifier
         process_model_with_form = process_model
 
-        refs = SpecFileService.get_references_for_process(process_model_with_form)
-        all_processes = [i.identifier for i in refs]
-        if task_process_identifier not in all_processes:
+        # the reference cache is kept up to date as process models change so this usually avoids reading any files
+        task_process_is_in_process_model = (
+            ReferenceCacheModel.basic_query()
+            .filter_by(identifier=task_process_identifier, relative_location=process_model.id, type="process")
+            .first()
+            is not None
+        )
+        if not task_process_is_in_process_model:
+            refs = SpecFileService.get_references_for_process(process_model_with_form)
+            task_process_is_in_process_model = task_process_identifier in [i.identifier for i in refs]
+        if not task_process_is_in_process_model:
             top_bpmn_process = TaskService.bpmn_process_for_called_activity_or_top_level_process(task_model)
             bpmn_file_full_path = WorkflowSpecService.bpmn_file_full_path_from_bpmn_process_identifier(
                 top_bpmn_process.bpmn_process_definition.bpmn_identifier
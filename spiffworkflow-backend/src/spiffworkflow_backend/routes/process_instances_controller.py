@@ -140,6 +140,23 @@ def process_instance_suspend(
     return Response(json.dumps({"ok": True}), status=200, mimetype="application/json")
 
 
+def process_instance_priority_set(
+    process_instance_id: int,
+    modified_process_model_identifier: str,
+    body: dict[str, Any],
+) -> flask.wrappers.Response:
+    process_instance = _find_process_instance_by_id_or_raise(process_instance_id)
+    priority = body.get("priority")
+    if not isinstance(priority, int) or isinstance(priority, bool):
+        raise ApiError(
+            error_code="missing_required_parameter",
+            message="A priority integer is required.",
+            status_code=400,
+        )
+    ProcessInstanceQueueService.set_priority(process_instance, priority)
+    return Response(json.dumps({"ok": True}), status=200, mimetype="application/json")
+
+
 def process_instance_resume(
     process_instance_id: int,
     modified_process_model_identifier: str,
@@ -34,6 +34,7 @@ from spiffworkflow_backend.services.git_service import GitCommandError
 from spiffworkflow_backend.services.git_service import GitService
 from spiffworkflow_backend.services.git_service import MissingGitConfigsError
 from spiffworkflow_backend.services.process_instance_processor import ProcessInstanceProcessor
+from spiffworkflow_backend.services.process_instance_queue_service import ProcessInstanceQueueService
 from spiffworkflow_backend.services.process_instance_report_service import ProcessInstanceReportNotFoundError
 from spiffworkflow_backend.services.process_instance_report_service import ProcessInstanceReportService
 from spiffworkflow_backend.services.process_model_service import ProcessModelService
@@ -57,8 +58,11 @@ def process_model_create(
         "metadata_extraction_paths",
         "fault_or_suspend_on_exception",
         "exception_notification_addresses",
+        "queue_priority",
     ]
     body_filtered = {include_item: body[include_item] for include_item in body_include_list if include_item in body}
+    if body_filtered.get("queue_priority") is not None:
+        ProcessInstanceQueueService.validate_priority(body_filtered["queue_priority"])  # type: ignore
 
     _get_process_group_from_modified_identifier(modified_process_group_id)
 
@@ -144,8 +148,11 @@ def process_model_update(
         "metadata_extraction_paths",
         "fault_or_suspend_on_exception",
         "exception_notification_addresses",
+        "queue_priority",
     ]
     body_filtered = {include_item: body[include_item] for include_item in body_include_list if include_item in body}
+    if body_filtered.get("queue_priority") is not None:
+        ProcessInstanceQueueService.validate_priority(body_filtered["queue_priority"])  # type: ignore
 
     process_model = _get_process_model(process_model_identifier)
 
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+import functools
 import importlib
 import os
 import pkgutil
 from abc import abstractmethod
 from collections.abc import Callable
+from contextvars import ContextVar
 from typing import Any
 
 from spiffworkflow_backend.exceptions.api_error import ApiError
@@ -17,6 +19,12 @@ from spiffworkflow_backend.services.authorization_service import AuthorizationSe
 # This is here, because after loading the application this will never change under
 # any known condition, and it is expensive to calculate it everytime.
 SCRIPT_SUB_CLASSES = None
+SCRIPT_FUNCTIONS: dict[str, ScriptFunction] | None = None
+
+# the context of the expression or script the script engine is running so the shared script functions can use it
+CURRENT_SCRIPT_ATTRIBUTES_CONTEXT: ContextVar[ScriptAttributesContext | None] = ContextVar(
+    "current_script_attributes_context", default=None
+)
 
 
 class ScriptUnauthorizedForUserError(Exception):
@@ -35,6 +43,10 @@ class InvalidArgsGivenToScriptError(Exception):
     pass
 
 
+class ScriptAttributesContextMissingError(Exception):
+    pass
+
+
 class Script:
     """Provides an abstract class that defines how scripts should work, this must be extended in all Script Tasks."""
 
@@ -84,73 +96,33 @@ class Script:
     def generate_augmented_list(
         script_attributes_context: ScriptAttributesContext,
     ) -> dict[str, Callable]:
-        """This makes a dictionary of lambda functions that are closed over the class instance that they represent.
+        """This makes a dictionary of functions bound to the given script_attributes_context.
 
         This is passed into PythonScriptParser as a list of helper functions that are
         available for running.  In general, they maintain the do_task call structure that they had, but
         they always return a value rather than updating the task data.
 
-        We may be able to remove the task for each of these calls if we are not using it other than potentially
-        updating the task data.
+        The script engine uses script_functions instead so it does not have to bind every script for every
+        expression it evaluates.
         """
+        return {
+            function_name: functools.partial(script_function.run, script_attributes_context)
+            for function_name, script_function in Script.script_functions().items()
+        }
 
-        def make_closure(
-            subclass: type[Script],
-            script_attributes_context: ScriptAttributesContext,
-        ) -> Callable:
-            """Yes - this is black magic.
-
-            Essentially, we want to build a list of all of the submodules (i.e. email, user_data_get, etc)
-            and a function that is assocated with them.
-            This basically creates an Instance of the class and returns a function that calls do_task
-            on the instance of that class.
-            the next for x in range, then grabs the name of the module and associates it with the function
-            that we created.
-            """
-            instance = subclass()
-
-            def check_script_permission() -> None:
-                if subclass.requires_privileged_permissions():
-                    script_function_name = get_script_function_name(subclass)
-                    uri = f"/can-run-privileged-script/{script_function_name}"
-                    process_instance = ProcessInstanceModel.query.filter_by(
-                        id=script_attributes_context.process_instance_id
-                    ).first()
-                    if process_instance is None:
-                        raise ProcessInstanceNotFoundError(
-                            "Could not find a process instance with id"
-                            f" '{script_attributes_context.process_instance_id}' when"
-                            f" running script '{script_function_name}'"
-                        )
-                    user = process_instance.process_initiator
-                    has_permission = AuthorizationService.user_has_permission(user=user, permission="create", target_uri=uri)
-                    if not has_permission:
-                        raise ScriptUnauthorizedForUserError(
-                            f"User {user.username} does not have access to run privileged script '{script_function_name}'"
-                        )
-
-            def run_script_if_allowed(*ar: Any, **kw: Any) -> Any:
-                check_script_permission()
-                return subclass.run(
-                    instance,
-                    script_attributes_context,
-                    *ar,
-                    **kw,
-                )
-
-            return run_script_if_allowed
-
-        def get_script_function_name(subclass: type[Script]) -> str:
-            return subclass.__module__.split(".")[-1]
+    @classmethod
+    def script_functions(cls) -> dict[str, ScriptFunction]:
+        """Script function name => callable that runs the script with CURRENT_SCRIPT_ATTRIBUTES_CONTEXT.
 
-        execlist = {}
-        subclasses = Script.get_all_subclasses()
-        for x in range(len(subclasses)):
-            subclass = subclasses[x]
-            execlist[get_script_function_name(subclass)] = make_closure(
-                subclass, script_attributes_context=script_attributes_context
-            )
-        return execlist
+        Like the subclasses, this never changes after we load up so it is only built once per process.
+        """
+        global SCRIPT_FUNCTIONS  # noqa: PLW0603, allow global for performance
+        if SCRIPT_FUNCTIONS is None:
+            SCRIPT_FUNCTIONS = {}
+            for subclass in cls.get_all_subclasses():
+                script_function = ScriptFunction(subclass)
+                SCRIPT_FUNCTIONS[script_function.function_name] = script_function
+        return SCRIPT_FUNCTIONS
 
     @classmethod
     def get_all_subclasses(cls) -> list[type[Script]]:
@@ -175,3 +147,46 @@ class Script:
             all_subclasses.extend(Script._get_all_subclasses(subclass))
 
         return all_subclasses
+
+
+class ScriptFunction:
+    """Runs one script for expressions and script tasks.
+
+    One of these is created per script per process. It does not hold on to a ScriptAttributesContext and
+    instead uses CURRENT_SCRIPT_ATTRIBUTES_CONTEXT, which the script engine sets while it evaluates an
+    expression or executes a script, so calling it runs the script for whichever task is running.
+    """
+
+    def __init__(self, script_class: type[Script]) -> None:
+        self.script_class = script_class
+        self.script = script_class()
+        self.function_name = script_class.__module__.split(".")[-1]
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        script_attributes_context = CURRENT_SCRIPT_ATTRIBUTES_CONTEXT.get()
+        if script_attributes_context is None:
+            raise ScriptAttributesContextMissingError(
+                f"Script '{self.function_name}' can only be run while the script engine is running an expression or script."
+            )
+        return self.run(script_attributes_context, *args, **kwargs)
+
+    def run(self, script_attributes_context: ScriptAttributesContext, *args: Any, **kwargs: Any) -> Any:
+        self.check_script_permission(script_attributes_context)
+        return self.script_class.run(self.script, script_attributes_context, *args, **kwargs)
+
+    def check_script_permission(self, script_attributes_context: ScriptAttributesContext) -> None:
+        if self.script_class.requires_privileged_permissions():
+            uri = f"/can-run-privileged-script/{self.function_name}"
+            process_instance = ProcessInstanceModel.query.filter_by(id=script_attributes_context.process_instance_id).first()
+            if process_instance is None:
+                raise ProcessInstanceNotFoundError(
+                    "Could not find a process instance with id"
+                    f" '{script_attributes_context.process_instance_id}' when"
+                    f" running script '{self.function_name}'"
+                )
+            user = process_instance.process_initiator
+            has_permission = AuthorizationService.user_has_permission(user=user, permission="create", target_uri=uri)
+            if not has_permission:
+                raise ScriptUnauthorizedForUserError(
+                    f"User {user.username} does not have access to run privileged script '{self.function_name}'"
+                )
@@ -3,6 +3,7 @@ import enum
 import json
 import sys
 import time
+from dataclasses import dataclass
 from hashlib import sha256
 from hmac import HMAC
 from hmac import compare_digest
@@ -43,6 +44,7 @@ from spiffworkflow_backend.exceptions.error import RefreshTokenStorageError
 from spiffworkflow_backend.exceptions.error import TokenExpiredError
 from spiffworkflow_backend.exceptions.error import TokenInvalidError
 from spiffworkflow_backend.exceptions.error import TokenNotProvidedError
+from spiffworkflow_backend.helpers.lru_cache import LRUCache
 from spiffworkflow_backend.models.db import db
 from spiffworkflow_backend.models.refresh_token import RefreshTokenModel
 from spiffworkflow_backend.services.authorization_service import AuthorizationService
@@ -86,9 +88,22 @@ class AuthenticationOptionNotFoundError(Exception):
     pass
 
 
+@dataclass
+class VerifiedToken:
+    """A token that was decoded, validated, and resolved to a user so later requests with it can skip that work."""
+
+    decoded_token: dict
+    user_id: int
+    expires_at: float
+
+
 class AuthenticationService:
     ENDPOINT_CACHE: dict[str, dict[str, str]] = {}  # We only need to find the openid endpoints once, then we can cache them.
     JSON_WEB_KEYSET_CACHE: dict[str, JWKSConfigs] = {}
+    # keyed by authentication identifier and key id. the key config is kept with the key to notice rotated keys.
+    PUBLIC_KEY_CACHE: LRUCache[tuple[str, str], tuple[JWKSKeyConfig, Any]] = LRUCache("jwks_public_key", max_size=32)
+    # keyed by authentication identifier and the sha256 of the token so raw tokens are not kept in memory
+    VERIFIED_TOKEN_CACHE: LRUCache[tuple[str, str], VerifiedToken] = LRUCache("verified_token")
 
     @classmethod
     def authentication_options_for_api(cls) -> list[AuthenticationOptionForApi]:
@@ -216,6 +231,52 @@ class AuthenticationService:
             x509_cert = load_der_x509_certificate(decoded_certificate, default_backend())
             return x509_cert.public_key()
 
+    @classmethod
+    def public_key_for_key_id(cls, authentication_identifier: str, key_id: str, json_key_configs: JWKSKeyConfig) -> Any:
+        cache_key = (authentication_identifier, key_id)
+        cached_key = cls.PUBLIC_KEY_CACHE.get(cache_key, is_valid=lambda cached: cached[0] == json_key_configs)
+        if cached_key is not None:
+            return cached_key[1]
+
+        if "x5c" not in json_key_configs:
+            public_key = cls.public_key_from_rsa_public_numbers(json_key_configs)
+        else:
+            public_key = cls.public_key_from_x5c(key_id, json_key_configs)
+        cls.PUBLIC_KEY_CACHE.set(cache_key, (json_key_configs, public_key))
+        return public_key
+
+    @classmethod
+    def verified_token_cache_key(cls, authentication_identifier: str, token: str) -> tuple[str, str]:
+        return (authentication_identifier, sha256(token.encode("utf8")).hexdigest())
+
+    @classmethod
+    def get_verified_token(cls, authentication_identifier: str, token: str) -> VerifiedToken | None:
+        cls.VERIFIED_TOKEN_CACHE.resize(current_app.config["SPIFFWORKFLOW_BACKEND_VERIFIED_TOKEN_CACHE_MAX_SIZE"])
+        return cls.VERIFIED_TOKEN_CACHE.get(
+            cls.verified_token_cache_key(authentication_identifier, token),
+            is_valid=lambda verified_token: time.time() < verified_token.expires_at,
+        )
+
+    @classmethod
+    def store_verified_token(cls, authentication_identifier: str, token: str, decoded_token: dict, user_id: int) -> None:
+        """Only call once the token has passed every check since cached tokens are trusted until they expire."""
+        now = time.time()
+        expires_at = now + current_app.config["SPIFFWORKFLOW_BACKEND_VERIFIED_TOKEN_CACHE_TTL_SECONDS"]
+        # an expired token has to go through validation again so it can be refreshed or rejected
+        if isinstance(decoded_token.get("exp"), int | float):
+            expires_at = min(expires_at, decoded_token["exp"])
+        if expires_at <= now:
+            return
+        cls.VERIFIED_TOKEN_CACHE.resize(current_app.config["SPIFFWORKFLOW_BACKEND_VERIFIED_TOKEN_CACHE_MAX_SIZE"])
+        cls.VERIFIED_TOKEN_CACHE.set(
+            cls.verified_token_cache_key(authentication_identifier, token),
+            VerifiedToken(decoded_token=decoded_token, user_id=user_id, expires_at=expires_at),
+        )
+
+    @classmethod
+    def forget_verified_token(cls, authentication_identifier: str, token: str) -> None:
+        cls.VERIFIED_TOKEN_CACHE.pop(cls.verified_token_cache_key(authentication_identifier, token))
+
     @classmethod
     def parse_jwt_token(cls, authentication_identifier: str, token: str) -> dict:
         header = jwt.get_unverified_header(token)
@@ -243,10 +304,7 @@ class AuthenticationService:
                 "leeway": current_app.config["SPIFFWORKFLOW_BACKEND_OPEN_ID_LEEWAY"],
             }
 
-            if "x5c" not in json_key_configs:
-                public_key = cls.public_key_from_rsa_public_numbers(json_key_configs)
-            else:
-                public_key = cls.public_key_from_x5c(key_id, json_key_configs)
+            public_key = cls.public_key_for_key_id(authentication_identifier, key_id, json_key_configs)
 
             # tokens generated from the cli have an aud like: [ "realm-management", "account" ]
             # while tokens generated from frontend have an aud like: "spiffworkflow-backend."
@@ -6,6 +6,7 @@ from typing import Any
 import yaml
 from flask import current_app
 from flask import g
+from flask import has_request_context
 from flask import request
 from flask import scaffold
 from sqlalchemy import and_
@@ -21,9 +22,12 @@ from spiffworkflow_backend.exceptions.error import PermissionsFileNotSetError
 from spiffworkflow_backend.exceptions.error import UserDoesNotHaveAccessToTaskError
 from spiffworkflow_backend.exceptions.error import UserNotLoggedInError
 from spiffworkflow_backend.helpers.api_version import V1_API_PATH_PREFIX
+from spiffworkflow_backend.helpers.lru_cache import LRUCache
 from spiffworkflow_backend.interfaces import AddedPermissionDict
 from spiffworkflow_backend.interfaces import GroupPermissionsDict
 from spiffworkflow_backend.interfaces import UserToGroupDict
+from spiffworkflow_backend.models.cache_generation import CacheGenerationModel
+from spiffworkflow_backend.models.cache_generation import CacheGenerationTable
 from spiffworkflow_backend.models.db import db
 from spiffworkflow_backend.models.group import SPIFF_GUEST_GROUP
 from spiffworkflow_backend.models.group import GroupModel
@@ -39,6 +43,8 @@ from spiffworkflow_backend.models.user import UserModel
 from spiffworkflow_backend.models.user_group_assignment import UserGroupAssignmentModel
 from spiffworkflow_backend.models.user_group_assignment_waiting import UserGroupAssignmentWaitingModel
 from spiffworkflow_backend.routes.openid_blueprint import openid_blueprint
+from spiffworkflow_backend.services.permission_matcher import PermissionAssignmentMatcher
+from spiffworkflow_backend.services.permission_matcher import PermissionMatcher
 from spiffworkflow_backend.services.user_service import UserService
 
 
@@ -72,6 +78,7 @@ PATH_SEGMENTS_FOR_PERMISSION_ALL = [
     {"path": "/process-data-file-download", "relevant_permissions": ["read"]},
     {"path": "/process-instance-events", "relevant_permissions": ["read"]},
     {"path": "/process-instance-migrate", "relevant_permissions": ["create"]},
+    {"path": "/process-instance-priority", "relevant_permissions": ["create"]},
     {"path": "/process-instance-suspend", "relevant_permissions": ["create"]},
     {"path": "/process-instance-terminate", "relevant_permissions": ["create"]},
     {"path": "/process-model-natural-language", "relevant_permissions": ["create"]},
@@ -89,14 +96,27 @@ PUBLIC_AUTHENTICATION_EXCLUSION_LIST = [
     "spiffworkflow_backend.routes.public_controller.message_form_submit",
 ]
 
+PERMISSION_GENERATION_ID_ENVIRON_KEY = "spiffworkflow_backend.permission_generation_id"
+
 
 class AuthorizationService:
     """Determine whether a user has permission to perform their request."""
 
+    # compiled permission matchers keyed by the permission generation they were built from and the principal ids.
+    # the generation changes whenever permissions do so other processes notice changes without expiring anything.
+    PERMISSION_MATCHER_CACHE: LRUCache[tuple[int | None, frozenset[int]], PermissionMatcher] = LRUCache("permission_matcher")
+    # same keys but for checking many uris against the assignments of one user like listings do
+    PERMISSION_ASSIGNMENT_MATCHER_CACHE: LRUCache[tuple[int | None, frozenset[int]], PermissionAssignmentMatcher] = LRUCache(
+        "permission_assignment_matcher"
+    )
+
     @classmethod
     def has_permission(cls, principals: list[PrincipalModel], permission: str, target_uri: str) -> bool:
-        principal_ids = [p.id for p in principals]
         target_uri_normalized = target_uri.removeprefix(V1_API_PATH_PREFIX)
+        if current_app.config["SPIFFWORKFLOW_BACKEND_PERMISSION_MATCHER_CACHE_MAX_SIZE"] > 0:
+            return cls.permission_matcher_for_principals(principals).has_permission(permission, target_uri_normalized)
+
+        principal_ids = [p.id for p in principals]
 
         permission_assignments = (
             PermissionAssignmentModel.query.filter(PermissionAssignmentModel.principal_id.in_(principal_ids))
@@ -129,14 +149,56 @@ class AuthorizationService:
         return all_permissions_permit
 
     @classmethod
-    def user_has_permission(cls, user: UserModel, permission: str, target_uri: str) -> bool:
-        principals = UserService.all_principals_for_user(user)
-        return cls.has_permission(principals, permission, target_uri)
+    def permission_cache_key_for_principals(cls, principals: list[PrincipalModel]) -> tuple[int | None, frozenset[int]]:
+        return (cls.permission_generation_id(), frozenset(p.id for p in principals))
 
     @classmethod
-    def all_permission_assignments_for_user(cls, user: UserModel) -> list[PermissionAssignmentModel]:
+    def permission_generation_id(cls) -> int | None:
+        # a request can check many permissions so only look up the generation once per request.
+        # this is kept in the request environ since g lives as long as the app context which can outlive a request.
+        if has_request_context() and PERMISSION_GENERATION_ID_ENVIRON_KEY in request.environ:
+            permission_generation_id: int | None = request.environ[PERMISSION_GENERATION_ID_ENVIRON_KEY]
+            return permission_generation_id
+        cache_generation = CacheGenerationModel.newest_generation_for_table(CacheGenerationTable.permission_assignment.value)
+        permission_generation_id = cache_generation.id if cache_generation else None
+        if has_request_context():
+            request.environ[PERMISSION_GENERATION_ID_ENVIRON_KEY] = permission_generation_id
+        return permission_generation_id
+
+    @classmethod
+    def permission_matcher_for_principals(cls, principals: list[PrincipalModel]) -> PermissionMatcher:
+        cache_key = cls.permission_cache_key_for_principals(principals)
+        cls.PERMISSION_MATCHER_CACHE.resize(current_app.config["SPIFFWORKFLOW_BACKEND_PERMISSION_MATCHER_CACHE_MAX_SIZE"])
+        permission_matcher = cls.PERMISSION_MATCHER_CACHE.get(cache_key)
+        if permission_matcher is None:
+            permission_assignments = cls.permission_assignments_for_principal_ids(list(cache_key[1]))
+            # LIKE is case insensitive on mysql and sqlite while = is only case insensitive on mysql
+            database_type = current_app.config["SPIFFWORKFLOW_BACKEND_DATABASE_TYPE"]
+            permission_matcher = PermissionMatcher.from_permission_assignments(
+                permission_assignments,
+                like_is_case_sensitive=database_type == "postgres",
+                equals_is_case_sensitive=database_type != "mysql",
+            )
+            cls.PERMISSION_MATCHER_CACHE.set(cache_key, permission_matcher)
+        return permission_matcher
+
+    @classmethod
+    def permission_assignment_matcher_for_user(cls, user: UserModel) -> PermissionAssignmentMatcher:
+        """Compiles the permission assignments of the user once so many uris can be checked against them."""
         principals = UserService.all_principals_for_user(user)
-        principal_ids = [p.id for p in principals]
+        cache_key = cls.permission_cache_key_for_principals(principals)
+        cls.PERMISSION_ASSIGNMENT_MATCHER_CACHE.resize(
+            current_app.config["SPIFFWORKFLOW_BACKEND_PERMISSION_MATCHER_CACHE_MAX_SIZE"]
+        )
+        permission_assignment_matcher = cls.PERMISSION_ASSIGNMENT_MATCHER_CACHE.get(cache_key)
+        if permission_assignment_matcher is None:
+            permission_assignments = cls.permission_assignments_for_principal_ids(list(cache_key[1]))
+            permission_assignment_matcher = PermissionAssignmentMatcher.from_permission_assignments(permission_assignments)
+            cls.PERMISSION_ASSIGNMENT_MATCHER_CACHE.set(cache_key, permission_assignment_matcher)
+        return permission_assignment_matcher
+
+    @classmethod
+    def permission_assignments_for_principal_ids(cls, principal_ids: list[int]) -> list[PermissionAssignmentModel]:
         permission_assignments: list[PermissionAssignmentModel] = (
             PermissionAssignmentModel.query.filter(PermissionAssignmentModel.principal_id.in_(principal_ids))
             .options(db.joinedload(PermissionAssignmentModel.permission_target))
@@ -144,12 +206,54 @@ class AuthorizationService:
         )
         return permission_assignments
 
+    @classmethod
+    def bump_permission_generation(cls) -> None:
+        """Call after changing permission assignments so cached permission matchers in every process stop being used."""
+        cache_generation = CacheGenerationModel(cache_table=CacheGenerationTable.permission_assignment.value)
+        db.session.add(cache_generation)
+        db.session.flush()
+        # only the newest generation is ever read so there is no need to keep the others around
+        CacheGenerationModel.query.filter(
+            CacheGenerationModel.cache_table == CacheGenerationTable.permission_assignment.value,
+            CacheGenerationModel.id < cache_generation.id,
+        ).delete()
+        db.session.commit()
+        cls.clear_permission_matcher_cache()
+
+    @classmethod
+    def clear_permission_matcher_cache(cls) -> None:
+        cls.PERMISSION_MATCHER_CACHE.clear()
+        cls.PERMISSION_ASSIGNMENT_MATCHER_CACHE.clear()
+        if has_request_context():
+            request.environ.pop(PERMISSION_GENERATION_ID_ENVIRON_KEY, None)
+
+    @classmethod
+    def user_has_permission(cls, user: UserModel, permission: str, target_uri: str) -> bool:
+        principals = UserService.all_principals_for_user(user)
+        return cls.has_permission(principals, permission, target_uri)
+
+    @classmethod
+    def all_permission_assignments_for_user(cls, user: UserModel) -> list[PermissionAssignmentModel]:
+        principals = UserService.all_principals_for_user(user)
+        return cls.permission_assignments_for_principal_ids([p.id for p in principals])
+
+    @classmethod
+    def normalize_uri_for_permission_assignments(cls, target_uri: str) -> str:
+        uri_with_percent = re.sub(r"\*", "%", target_uri)
+        return uri_with_percent.removeprefix(V1_API_PATH_PREFIX)
+
+    @classmethod
+    def permission_assignment_matcher_includes(
+        cls, permission_assignment_matcher: PermissionAssignmentMatcher, permission: str, target_uri: str
+    ) -> bool:
+        """Same as permission_assignments_include but with the assignments already compiled."""
+        return permission_assignment_matcher.includes(permission, cls.normalize_uri_for_permission_assignments(target_uri))
+
     @classmethod
     def permission_assignments_include(
         cls, permission_assignments: list[PermissionAssignmentModel], permission: str, target_uri: str
     ) -> bool:
-        uri_with_percent = re.sub(r"\*", "%", target_uri)
-        target_uri_normalized = uri_with_percent.removeprefix(V1_API_PATH_PREFIX)
+        target_uri_normalized = cls.normalize_uri_for_permission_assignments(target_uri)
 
         matching_permission_assignments = []
         for permission_assignment in permission_assignments:
@@ -190,6 +294,7 @@ class AuthorizationService:
         for group in GroupModel.query.all():
             db.session.delete(group)
         db.session.commit()
+        cls.bump_permission_generation()
 
     # if you have access to PG:hey:%, you should be able to see PG hey, obviously.
     # if you have access to PG:hey:yo:%, you should ALSO be able to see PG hey, because that allows you to navigate to hey:yo.
@@ -233,6 +338,7 @@ class AuthorizationService:
     def import_permissions_from_yaml_file(cls, user_model: UserModel | None = None) -> AddedPermissionDict:
         group_permissions = cls.parse_permissions_yaml_into_group_info()
         result = cls.add_permissions_from_group_permissions(group_permissions, user_model)
+        cls.bump_permission_generation()
         return result
 
     @classmethod
@@ -268,10 +374,12 @@ class AuthorizationService:
             )
             db.session.add(permission_assignment)
             db.session.commit()
+            cls.bump_permission_generation()
         elif permission_assignment.grant_type != grant_type:
             permission_assignment.grant_type = grant_type
             db.session.add(permission_assignment)
             db.session.commit()
+            cls.bump_permission_generation()
         return permission_assignment
 
     @classmethod
@@ -650,7 +758,7 @@ class AuthorizationService:
     def set_support_permissions(cls) -> list[PermissionToAssign]:
         """Just like elevated permissions minus access to secrets."""
         permissions_to_assign = cls.set_basic_permissions()
-        for process_instance_action in ["migrate", "resume", "terminate", "suspend", "reset"]:
+        for process_instance_action in ["migrate", "priority", "resume", "terminate", "suspend", "reset"]:
             permissions_to_assign.append(
                 PermissionToAssign(permission="create", target_uri=f"/process-instance-{process_instance_action}/*")
             )
@@ -998,3 +1106,4 @@ class AuthorizationService:
             initial_waiting_group_assignments,
             group_permissions_only=group_permissions_only,
         )
+        cls.bump_permission_generation()
@@ -1,4 +1,7 @@
+import concurrent.futures
+import copy
 import os
+from hashlib import sha256
 from typing import Any
 
 from flask import current_app
@@ -10,15 +13,42 @@ from spiffworkflow_backend.models.json_data_store import JSONDataStoreModel
 from spiffworkflow_backend.models.kkv_data_store import KKVDataStoreModel
 from spiffworkflow_backend.models.message_model import MessageModel
 from spiffworkflow_backend.models.process_group import ProcessGroup
+from spiffworkflow_backend.models.process_model import ProcessModelInfo
+from spiffworkflow_backend.models.reference_cache import Reference
 from spiffworkflow_backend.models.reference_cache import ReferenceCacheModel
 from spiffworkflow_backend.services.file_system_service import FileSystemService
 from spiffworkflow_backend.services.message_definition_service import MessageDefinitionService
 from spiffworkflow_backend.services.process_model_service import ProcessModelService
 from spiffworkflow_backend.services.reference_cache_service import ReferenceCacheService
 from spiffworkflow_backend.services.spec_file_service import SpecFileService
+from spiffworkflow_backend.services.workflow_spec_service import WorkflowSpecService
+
+
+def parse_references_for_file(
+    process_model: ProcessModelInfo, file_name: str, full_file_path: str
+) -> tuple[str | None, list[Reference], str | None]:
+    """Returns the content hash, references, and error for a file.
+
+    This can run in a worker process so it must not use the app or the database and it returns errors
+    instead of raising since exceptions from the parser are not always picklable.
+    """
+    try:
+        with open(full_file_path, "rb") as f:
+            file_contents = f.read()
+        references = SpecFileService.get_references_for_file_contents(process_model, file_name, file_contents)
+        return (sha256(file_contents).hexdigest(), references, None)
+    except Exception as ex:
+        return (None, [], str(ex))
 
 
 class DataSetupService:
+    # starting worker processes costs more than it saves when only a few files changed
+    PARALLEL_PARSE_MIN_FILE_COUNT = 50
+
+    # keyed like SpecFileService.REFERENCES_CACHE but not bounded by its size so every file in a large
+    # process models directory can be reused. it only ever holds the files found by the last walk.
+    REFERENCES_BY_FILE: dict[tuple[str, str, str | None], tuple[tuple[int, int, int], str, list[Reference]]] = {}
+
     @classmethod
     def run_setup(cls) -> list:
         return cls.save_all_process_models()
@@ -32,6 +62,10 @@ class DataSetupService:
         """
         current_app.logger.debug("DataSetupService.save_all_process_models() start")
 
+        # this runs on startup and after git pulls so any files on disk may have changed
+        WorkflowSpecService.clear_spec_cache()
+        ProcessModelService.clear_process_model_catalog()
+
         failing_process_models = []
         files = FileSystemService.walk_files_from_root_path(True, None)
         reference_objects: dict[str, ReferenceCacheModel] = {}
@@ -39,33 +73,14 @@ class DataSetupService:
         all_message_models: dict[tuple[str, str], MessageModel] = {}
         references = []
 
+        # process models are parsed together after the walk so the files can be parsed in parallel.
+        # the other items are kept in walk order since later reference cache objects replace earlier ones.
+        items_in_walk_order: list[ProcessModelInfo | ReferenceCacheModel] = []
         for file in files:
             if FileSystemService.is_process_model_json_file(file):
                 process_model = ProcessModelService.get_process_model_from_path(file)
                 current_app.logger.debug(f"Process Model: {process_model.display_name}")
-                try:
-                    # FIXME: get_references_for_file_contents is erroring out for elements in the list
-                    refs = SpecFileService.get_references_for_process(process_model)
-                    for ref in refs:
-                        try:
-                            reference_cache = ReferenceCacheModel.from_spec_reference(ref)
-                            ReferenceCacheService.add_unique_reference_cache_object(reference_objects, reference_cache)
-                            db.session.commit()
-                            references.append(ref)
-                        except Exception as ex:
-                            failing_process_models.append(
-                                (
-                                    f"{ref.relative_location}/{ref.file_name}",
-                                    repr(ex),
-                                )
-                            )
-                except Exception as ex2:
-                    failing_process_models.append(
-                        (
-                            f"{process_model.id}",
-                            str(ex2),
-                        )
-                    )
+                items_in_walk_order.append(process_model)
             elif FileSystemService.is_data_store_json_file(file):
                 relative_location = FileSystemService.relative_location(file)
                 file_name = os.path.basename(file)
@@ -79,7 +94,7 @@ class DataSetupService:
                     None,
                     False,
                 )
-                ReferenceCacheService.add_unique_reference_cache_object(reference_objects, reference_cache)
+                items_in_walk_order.append(reference_cache)
             elif FileSystemService.is_process_group_json_file(file):
                 try:
                     process_group = ProcessModelService.find_or_create_process_group(os.path.dirname(file))
@@ -89,6 +104,28 @@ class DataSetupService:
                     current_app.logger.debug(f"Failed to load process group from file @ '{file}'")
                     continue
 
+        references_by_process_model_id, process_model_errors = cls._get_references_for_process_models(
+            [item for item in items_in_walk_order if isinstance(item, ProcessModelInfo)]
+        )
+        for item in items_in_walk_order:
+            if isinstance(item, ReferenceCacheModel):
+                ReferenceCacheService.add_unique_reference_cache_object(reference_objects, item)
+            elif item.id in process_model_errors:
+                failing_process_models.append((f"{item.id}", process_model_errors[item.id]))
+            else:
+                for ref in references_by_process_model_id[item.id]:
+                    try:
+                        reference_cache = ReferenceCacheModel.from_spec_reference(ref)
+                        ReferenceCacheService.add_unique_reference_cache_object(reference_objects, reference_cache)
+                        references.append(ref)
+                    except Exception as ex:
+                        failing_process_models.append(
+                            (
+                                f"{ref.relative_location}/{ref.file_name}",
+                                repr(ex),
+                            )
+                        )
+
         current_app.logger.debug("DataSetupService.save_all_process_models() end")
         ReferenceCacheService.add_new_generation(reference_objects)
         cls._sync_data_store_models_with_specifications(all_data_store_specifications)
@@ -97,10 +134,10 @@ class DataSetupService:
         MessageDefinitionService.save_all_message_models(all_message_models)
         db.session.commit()
 
+        # the caller and message trigger caches for all references go in one transaction
         for ref in references:
             try:
                 SpecFileService.update_caches_except_process(ref)
-                db.session.commit()
             except Exception as ex:
                 failing_process_models.append(
                     (
@@ -108,9 +145,88 @@ class DataSetupService:
                         repr(ex),
                     )
                 )
+        db.session.commit()
 
         return failing_process_models
 
+    @classmethod
+    def _get_references_for_process_models(
+        cls, process_models: list[ProcessModelInfo]
+    ) -> tuple[dict[str, list[Reference]], dict[str, str]]:
+        """Returns the references of each process model by id and the error for each process model that failed.
+
+        Only files that changed since the last walk by this process are parsed again.
+        """
+        references_by_file: dict[tuple[str, str], list[Reference]] = {}
+        references_for_walk: dict[tuple[str, str, str | None], tuple[tuple[int, int, int], str, list[Reference]]] = {}
+        file_names_by_process_model_id: dict[str, list[str]] = {}
+        files_to_parse: list[tuple[ProcessModelInfo, str, str, tuple[int, int, int]]] = []
+        process_model_errors: dict[str, str] = {}
+
+        for process_model in process_models:
+            try:
+                file_names = [file.name for file in SpecFileService.get_files(process_model)]
+                for file_name in file_names:
+                    full_file_path = SpecFileService.full_file_path(process_model, file_name)
+                    file_fingerprint = SpecFileService.file_fingerprint(full_file_path)
+                    cache_key = (full_file_path, process_model.id, process_model.primary_process_id)
+                    cached = cls._unchanged_references_for_file(full_file_path, file_fingerprint, cache_key)
+                    if cached is None:
+                        files_to_parse.append((process_model, file_name, full_file_path, file_fingerprint))
+                    else:
+                        references_for_walk[cache_key] = cached
+                        references_by_file[(process_model.id, file_name)] = copy.deepcopy(cached[2])
+                file_names_by_process_model_id[process_model.id] = file_names
+            except Exception as ex:
+                process_model_errors[process_model.id] = str(ex)
+
+        parse_arguments = [(file_to_parse[0], file_to_parse[1], file_to_parse[2]) for file_to_parse in files_to_parse]
+        max_workers = int(current_app.config["SPIFFWORKFLOW_BACKEND_DATA_SETUP_MAX_PARSER_PROCESSES"])
+        current_app.logger.debug(f"DataSetupService: parsing {len(parse_arguments)} changed files")
+        if max_workers > 1 and len(parse_arguments) >= cls.PARALLEL_PARSE_MIN_FILE_COUNT:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+                parse_results = list(executor.map(parse_references_for_file, *zip(*parse_arguments, strict=True), chunksize=10))
+        else:
+            parse_results = [parse_references_for_file(*arguments) for arguments in parse_arguments]
+
+        for (process_model, file_name, full_file_path, file_fingerprint), (content_hash, references, error) in zip(
+            files_to_parse, parse_results, strict=True
+        ):
+            if error is not None or content_hash is None:
+                process_model_errors.setdefault(process_model.id, str(error))
+                continue
+            cache_key = (full_file_path, process_model.id, process_model.primary_process_id)
+            references_for_walk[cache_key] = (file_fingerprint, content_hash, copy.deepcopy(references))
+            SpecFileService.set_cached_references_for_file(
+                full_file_path, process_model, file_fingerprint, content_hash, references
+            )
+            references_by_file[(process_model.id, file_name)] = references
+        # replacing the index drops files that were deleted or moved since the last walk
+        cls.REFERENCES_BY_FILE = references_for_walk
+
+        references_by_process_model_id: dict[str, list[Reference]] = {}
+        for process_model_id, file_names in file_names_by_process_model_id.items():
+            if process_model_id not in process_model_errors:
+                references_by_process_model_id[process_model_id] = [
+                    ref for file_name in file_names for ref in references_by_file[(process_model_id, file_name)]
+                ]
+        return (references_by_process_model_id, process_model_errors)
+
+    @classmethod
+    def _unchanged_references_for_file(
+        cls, full_file_path: str, file_fingerprint: tuple[int, int, int], cache_key: tuple[str, str, str | None]
+    ) -> tuple[tuple[int, int, int], str, list[Reference]] | None:
+        cached = cls.REFERENCES_BY_FILE.get(cache_key)
+        if cached is None:
+            return None
+        if cached[0] == file_fingerprint:
+            return cached
+        # files are often rewritten with the same contents, for example by a git pull or checkout
+        with open(full_file_path, "rb") as f:
+            if sha256(f.read()).hexdigest() != cached[1]:
+                return None
+        return (file_fingerprint, cached[1], cached[2])
+
     @classmethod
     def _collect_data_store_specifications(
         cls, process_group: ProcessGroup, file_name: str, all_data_store_specifications: dict[tuple[str, str, str], Any]
@@ -2,13 +2,16 @@ import os
 import re
 import shutil
 import subprocess  # noqa we need the subprocess module to safely run the git commands
+import threading
 import uuid
+from hashlib import sha256
 
 from flask import current_app
 from flask import g
 from security import safe_command  # type: ignore
 
 from spiffworkflow_backend.config import ConfigurationError
+from spiffworkflow_backend.helpers.lru_cache import LRUCache
 from spiffworkflow_backend.models.process_model import ProcessModelInfo
 from spiffworkflow_backend.services.data_setup_service import DataSetupService
 from spiffworkflow_backend.services.file_system_service import FileSystemService
@@ -31,19 +34,158 @@ class GitCommandError(Exception):
     pass
 
 
+class GitCatFileBatchReader:
+    """Reads objects through one long running "git cat-file --batch" process instead of starting git for each one."""
+
+    def __init__(self, repo_directory: str) -> None:
+        self.repo_directory = repo_directory
+        self.process: subprocess.Popen[bytes] | None = None
+        self.lock = threading.Lock()
+
+    def read(self, object_name: str) -> bytes:
+        if "\n" in object_name:
+            raise GitCommandError(f"Cannot read object with a newline in its name: {object_name}")
+        with self.lock:
+            try:
+                return self._read(object_name)
+            except (BrokenPipeError, OSError, ValueError):
+                # the process went away. start a new one and try once more.
+                self.close()
+                return self._read(object_name)
+
+    def close(self) -> None:
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+
+    def _read(self, object_name: str) -> bytes:
+        if self.process is None or self.process.poll() is not None:
+            self.process = safe_command.run(
+                subprocess.Popen,
+                ["git", "-C", self.repo_directory, "cat-file", "--batch"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        process = self.process
+        if process is None or process.stdin is None or process.stdout is None:
+            raise GitCommandError(f"Could not start git cat-file in {self.repo_directory}")
+
+        process.stdin.write(f"{object_name}\n".encode())
+        process.stdin.flush()
+        header = process.stdout.readline().decode("utf-8")
+        if header == "":
+            raise BrokenPipeError(f"git cat-file exited while reading {object_name}")
+        header_parts = header.split()
+        if len(header_parts) != 3:
+            # git reports unknown objects as "<object_name> missing" or "<object_name> ambiguous"
+            raise GitCommandError(f"Failed to read {object_name} with git cat-file: {header.strip()}")
+        contents = process.stdout.read(int(header_parts[2]))
+        # each object is followed by a newline
+        process.stdout.read(1)
+        return contents
+
+
 # TOOD: check for the existence of git and configs on bootup if publishing is enabled
 class GitService:
+    # keyed by repo directory and short_rev. each revision is kept with the head fingerprint it was read at.
+    CURRENT_REVISION_CACHE: dict[tuple[str, bool], tuple[tuple, str]] = {}
+    # keyed by repo directory, revision, and file path. files at a given commit never change.
+    FILE_CONTENTS_CACHE: LRUCache[tuple[str, str, str], str] = LRUCache("git_file_contents")
+    # full commit ids of the short ids stored on process instances keyed by repo directory and short id
+    COMMIT_ID_CACHE: LRUCache[tuple[str, str], str] = LRUCache("git_commit_ids")
+    CAT_FILE_BATCH_READERS: dict[str, GitCatFileBatchReader] = {}
+
     @classmethod
     def get_current_revision(cls, short_rev: bool = True) -> str:
         bpmn_spec_absolute_dir = current_app.config["SPIFFWORKFLOW_BACKEND_BPMN_SPEC_ABSOLUTE_DIR"]
 
+        # reading a few files is much cheaper than starting git so only run rev-parse when HEAD may have moved
+        cache_key = (bpmn_spec_absolute_dir, short_rev)
+        head_fingerprint = cls.head_fingerprint(bpmn_spec_absolute_dir)
+        if head_fingerprint is not None and cache_key in cls.CURRENT_REVISION_CACHE:
+            cached_fingerprint, cached_revision = cls.CURRENT_REVISION_CACHE[cache_key]
+            if cached_fingerprint == head_fingerprint:
+                return cached_revision
+
         git_command = ["rev-parse"]
         if short_rev:
             git_command.append("--short")
         git_command.append("HEAD")
 
         # The value includes a carriage return character at the end, so we don't grab the last character
-        return cls.run_shell_command_to_get_stdout(git_command, context_directory=bpmn_spec_absolute_dir)
+        revision = cls.run_shell_command_to_get_stdout(git_command, context_directory=bpmn_spec_absolute_dir)
+        if head_fingerprint is not None:
+            cls.CURRENT_REVISION_CACHE[cache_key] = (head_fingerprint, revision)
+        return revision
+
+    @classmethod
+    def clear_current_revision_cache(cls) -> None:
+        cls.CURRENT_REVISION_CACHE.clear()
+
+    @classmethod
+    def head_fingerprint(cls, directory: str | None) -> tuple | None:
+        """Returns something that changes whenever HEAD or the ref it points to changes.
+
+        This covers HEAD, the ref file, and packed-refs of the enclosing git dir. Returns None if the git
+        dir cannot be found, in which case the revision is not cached.
+        """
+        git_dir = cls.find_git_dir(directory)
+        if git_dir is None:
+            return None
+
+        head_path = os.path.join(git_dir, "HEAD")
+        try:
+            with open(head_path) as f:
+                head = f.read().strip()
+        except OSError:
+            return None
+
+        # linked worktrees keep their own HEAD but share refs with the main git dir
+        common_git_dir = git_dir
+        commondir_path = os.path.join(git_dir, "commondir")
+        if os.path.isfile(commondir_path):
+            with open(commondir_path) as f:
+                common_git_dir = os.path.normpath(os.path.join(git_dir, f.read().strip()))
+
+        paths_to_check = [head_path, os.path.join(common_git_dir, "packed-refs")]
+        if head.startswith("ref:"):
+            ref = head.removeprefix("ref:").strip()
+            paths_to_check.append(os.path.join(git_dir, ref))
+            if common_git_dir != git_dir:
+                paths_to_check.append(os.path.join(common_git_dir, ref))
+
+        fingerprint: list = [head]
+        for path in paths_to_check:
+            try:
+                stat_result = os.stat(path)
+                # git replaces refs by renaming a new file over them so the inode changes along with the mtime
+                fingerprint.append((path, stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size))
+            except FileNotFoundError:
+                fingerprint.append((path, None))
+        return tuple(fingerprint)
+
+    @classmethod
+    def find_git_dir(cls, directory: str | None) -> str | None:
+        if directory is None:
+            return None
+        current_directory = os.path.abspath(directory)
+        while True:
+            dot_git_path = os.path.join(current_directory, ".git")
+            if os.path.isdir(dot_git_path):
+                return dot_git_path
+            # worktrees and submodules have a .git file pointing at the real git dir
+            if os.path.isfile(dot_git_path):
+                with open(dot_git_path) as f:
+                    contents = f.read().strip()
+                if not contents.startswith("gitdir:"):
+                    return None
+                return os.path.normpath(os.path.join(current_directory, contents.removeprefix("gitdir:").strip()))
+            parent_directory = os.path.dirname(current_directory)
+            if parent_directory == current_directory:
+                return None
+            current_directory = parent_directory
 
     @classmethod
     def get_instance_file_contents_for_revision(
@@ -54,11 +196,81 @@ class GitService:
     ) -> str:
         bpmn_spec_absolute_dir = current_app.config["SPIFFWORKFLOW_BACKEND_BPMN_SPEC_ABSOLUTE_DIR"]
         process_model_relative_path = FileSystemService.process_model_relative_path(process_model)
-        shell_command = [
-            "show",
-            f"{revision}:{process_model_relative_path}/{file_name}",
-        ]
-        return cls.run_shell_command_to_get_stdout(shell_command, context_directory=bpmn_spec_absolute_dir)
+        file_path = f"{process_model_relative_path}/{file_name}"
+
+        # branch names and other refs can move and short ids can become ambiguous so cache by full commit id
+        commit_id = cls._commit_id_for_revision(bpmn_spec_absolute_dir, revision)
+        cache_key = (bpmn_spec_absolute_dir, commit_id, file_path)
+        cls.FILE_CONTENTS_CACHE.resize(current_app.config["SPIFFWORKFLOW_BACKEND_GIT_FILE_CONTENTS_CACHE_MAX_SIZE"])
+        cached_file_contents = cls.FILE_CONTENTS_CACHE.get(cache_key)
+        if cached_file_contents is None:
+            cached_file_contents = cls._get_file_contents_from_cache_dir(cache_key)
+            if cached_file_contents is not None:
+                cls.FILE_CONTENTS_CACHE.set(cache_key, cached_file_contents)
+        if cached_file_contents is not None:
+            return cached_file_contents
+
+        if current_app.config["SPIFFWORKFLOW_BACKEND_GIT_FILE_CONTENTS_USE_CAT_FILE_BATCH"]:
+            if bpmn_spec_absolute_dir not in cls.CAT_FILE_BATCH_READERS:
+                cls.CAT_FILE_BATCH_READERS[bpmn_spec_absolute_dir] = GitCatFileBatchReader(bpmn_spec_absolute_dir)
+            file_contents_bytes = cls.CAT_FILE_BATCH_READERS[bpmn_spec_absolute_dir].read(f"{commit_id}:{file_path}")
+            # match the output of git show as read by run_shell_command_to_get_stdout
+            file_contents = file_contents_bytes.decode("utf-8").strip()
+        else:
+            shell_command = [
+                "show",
+                f"{commit_id}:{file_path}",
+            ]
+            file_contents = cls.run_shell_command_to_get_stdout(shell_command, context_directory=bpmn_spec_absolute_dir)
+
+        cls.FILE_CONTENTS_CACHE.set(cache_key, file_contents)
+        cls._add_file_contents_to_cache_dir(cache_key, file_contents)
+        return file_contents
+
+    @classmethod
+    def _commit_id_for_revision(cls, bpmn_spec_absolute_dir: str, revision: str) -> str:
+        if re.fullmatch(r"[0-9a-f]{40}|[0-9a-f]{64}", revision) is not None:
+            return revision
+        cache_key = (bpmn_spec_absolute_dir, revision)
+        cls.COMMIT_ID_CACHE.resize(current_app.config["SPIFFWORKFLOW_BACKEND_GIT_FILE_CONTENTS_CACHE_MAX_SIZE"])
+        commit_id = cls.COMMIT_ID_CACHE.get(cache_key)
+        if commit_id is not None:
+            return commit_id
+        commit_id = cls.run_shell_command_to_get_stdout(
+            ["rev-parse", "--verify", "--end-of-options", f"{revision}^{{commit}}"], context_directory=bpmn_spec_absolute_dir
+        )
+        # a short id that found a commit can only become ambiguous later and never point at another commit.
+        # refs can move so they are resolved every time.
+        if commit_id.startswith(revision):
+            cls.COMMIT_ID_CACHE.set(cache_key, commit_id)
+        return commit_id
+
+    @classmethod
+    def _file_contents_cache_path(cls, cache_key: tuple[str, str, str]) -> str | None:
+        cache_dir = current_app.config["SPIFFWORKFLOW_BACKEND_GIT_FILE_CONTENTS_CACHE_DIR"]
+        if cache_dir is None:
+            return None
+        return os.path.join(cache_dir, sha256(":".join(cache_key).encode("utf-8")).hexdigest())
+
+    @classmethod
+    def _get_file_contents_from_cache_dir(cls, cache_key: tuple[str, str, str]) -> str | None:
+        cache_path = cls._file_contents_cache_path(cache_key)
+        if cache_path is None or not os.path.isfile(cache_path):
+            return None
+        with open(cache_path, encoding="utf-8") as f:
+            return f.read()
+
+    @classmethod
+    def _add_file_contents_to_cache_dir(cls, cache_key: tuple[str, str, str], file_contents: str) -> None:
+        cache_path = cls._file_contents_cache_path(cache_key)
+        if cache_path is None:
+            return
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        # write to a temp file first so other processes never read a partially written file
+        temp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(file_contents)
+        os.replace(temp_path, cache_path)
 
     @classmethod
     def get_file_contents_for_revision_if_git_revision(
@@ -111,7 +323,10 @@ class GitService:
             message,
             branch_name_to_use,
         ]
-        return cls.run_shell_command_to_get_stdout(shell_command, prepend_with_git=False)
+        try:
+            return cls.run_shell_command_to_get_stdout(shell_command, prepend_with_git=False)
+        finally:
+            cls.clear_current_revision_cache()
 
     @classmethod
     def check_for_basic_configs(cls, raise_on_missing: bool = True) -> bool:
@@ -244,9 +459,12 @@ class GitService:
         if ref != f"refs/heads/{git_branch}":
             return False
 
-        cls.run_shell_command(
-            ["pull", "--rebase"], context_directory=current_app.config["SPIFFWORKFLOW_BACKEND_BPMN_SPEC_ABSOLUTE_DIR"]
-        )
+        try:
+            cls.run_shell_command(
+                ["pull", "--rebase"], context_directory=current_app.config["SPIFFWORKFLOW_BACKEND_BPMN_SPEC_ABSOLUTE_DIR"]
+            )
+        finally:
+            cls.clear_current_revision_cache()
         DataSetupService.save_all_process_models()
         return True
 
@@ -1,12 +1,15 @@
+import hashlib
 import re
 from sys import exc_info
 
 import jinja2
+from flask import current_app
 from jinja2 import TemplateSyntaxError
 from SpiffWorkflow.bpmn.exceptions import WorkflowTaskException  # type: ignore
 from SpiffWorkflow.task import Task as SpiffTask  # type: ignore
 
 from spiffworkflow_backend.exceptions.api_error import ApiError
+from spiffworkflow_backend.helpers.lru_cache import LRUCache
 from spiffworkflow_backend.models.task import TaskModel  # noqa: F401
 from spiffworkflow_backend.models.task_instructions_for_end_user import TaskInstructionsForEndUserModel
 from spiffworkflow_backend.services.task_service import TaskModelError
@@ -44,6 +47,30 @@ class JinjaHelpers:
 
 
 class JinjaService:
+    # one environment for every render so the helper filters are only registered once
+    JINJA_ENVIRONMENT: jinja2.Environment | None = None
+    # sha256 of the template source => template compiled by JINJA_ENVIRONMENT
+    COMPILED_TEMPLATE_CACHE: LRUCache[str, jinja2.Template] = LRUCache("jinja_template")
+
+    @classmethod
+    def jinja_environment(cls) -> jinja2.Environment:
+        if cls.JINJA_ENVIRONMENT is None:
+            jinja_environment = jinja2.Environment(autoescape=True, lstrip_blocks=True, trim_blocks=True)
+            jinja_environment.filters.update(JinjaHelpers.get_helper_mapping())
+            cls.JINJA_ENVIRONMENT = jinja_environment
+        return cls.JINJA_ENVIRONMENT
+
+    @classmethod
+    def compiled_template(cls, unprocessed_template: str) -> jinja2.Template:
+        """Parsing and compiling is most of the cost of a render and the same instructions get rendered over and over."""
+        cache_key = hashlib.sha256(unprocessed_template.encode("utf-8")).hexdigest()
+        cls.COMPILED_TEMPLATE_CACHE.resize(current_app.config["SPIFFWORKFLOW_BACKEND_JINJA_TEMPLATE_CACHE_MAX_SIZE"])
+        template = cls.COMPILED_TEMPLATE_CACHE.get(cache_key)
+        if template is None:
+            template = cls.jinja_environment().from_string(unprocessed_template)
+            cls.COMPILED_TEMPLATE_CACHE.set(cache_key, template)
+        return template
+
     @classmethod
     def render_instructions_for_end_user(
         cls, task: TaskModel | SpiffTask | None = None, extensions: dict | None = None, task_data: dict | None = None
@@ -67,10 +94,8 @@ class JinjaService:
     def render_jinja_template(
         cls, unprocessed_template: str, task: TaskModel | SpiffTask | None = None, task_data: dict | None = None
     ) -> str:
-        jinja_environment = jinja2.Environment(autoescape=True, lstrip_blocks=True, trim_blocks=True)
-        jinja_environment.filters.update(JinjaHelpers.get_helper_mapping())
         try:
-            template = jinja_environment.from_string(unprocessed_template)
+            template = cls.compiled_template(unprocessed_template)
             if task_data is not None:
                 data = task_data
             elif isinstance(task, TaskModel):
@@ -1,3 +1,4 @@
+import time
 from typing import Any
 
 from flask import current_app
@@ -7,7 +8,11 @@ from SpiffWorkflow.bpmn.specs.event_definitions.message import CorrelationProper
 from SpiffWorkflow.bpmn.specs.mixins import StartEventMixin  # type: ignore
 from SpiffWorkflow.exceptions import SpiffWorkflowException  # type: ignore
 from SpiffWorkflow.spiff.specs.event_definitions import MessageEventDefinition  # type: ignore
+from sqlalchemy import func
 
+from spiffworkflow_backend.background_processing.celery_tasks.process_instance_task_producer import (
+    queue_message_instance_pairs_for_correlation,
+)
 from spiffworkflow_backend.background_processing.celery_tasks.process_instance_task_producer import (
     queue_process_instance_if_appropriate,
 )
@@ -18,6 +23,7 @@ from spiffworkflow_backend.models.db import db
 from spiffworkflow_backend.models.message_instance import MessageInstanceModel
 from spiffworkflow_backend.models.message_instance import MessageStatuses
 from spiffworkflow_backend.models.message_instance import MessageTypes
+from spiffworkflow_backend.models.message_instance_correlation_key import MessageInstanceCorrelationKeyModel
 from spiffworkflow_backend.models.message_triggerable_process_model import MessageTriggerableProcessModel
 from spiffworkflow_backend.models.process_instance import ProcessInstanceModel
 from spiffworkflow_backend.models.user import UserModel
@@ -40,31 +46,26 @@ class MessageService:
         cls,
         message_instance_send: MessageInstanceModel,
         execution_mode: str | None = None,
+        already_claimed: bool = False,
     ) -> MessageInstanceModel | None:
         """Connects the given send message to a 'receive' message if possible.
 
         :param message_instance_send:
+        :param already_claimed: the send message was already marked as running by claim_ready_send_messages.
         :return: the message instance that received this message.
         """
-        # Thread safe via db locking - don't try to progress the same send message over multiple instances
-        if message_instance_send.status != MessageStatuses.ready.value:
-            return None
-        message_instance_send.status = MessageStatuses.running.value
-        db.session.add(message_instance_send)
-        db.session.commit()
+        if not already_claimed:
+            # Thread safe via db locking - don't try to progress the same send message over multiple instances
+            if message_instance_send.status != MessageStatuses.ready.value:
+                return None
+            message_instance_send.status = MessageStatuses.running.value
+            db.session.add(message_instance_send)
+            db.session.commit()
 
-        # Find available messages that might match
-        available_receive_messages = MessageInstanceModel.query.filter_by(
-            name=message_instance_send.name,
-            status=MessageStatuses.ready.value,
-            message_type=MessageTypes.receive.value,
-        ).all()
         message_instance_receive: MessageInstanceModel | None = None
         processor_receive = None
         try:
-            for message_instance in available_receive_messages:
-                if message_instance.correlates(message_instance_send, CustomBpmnScriptEngine()):
-                    message_instance_receive = message_instance
+            message_instance_receive = cls.find_receive_message_for_send_message(message_instance_send)
             message_triggerable_process_model = None
             receiving_process_instance = None
             if message_instance_receive is None:
@@ -170,12 +171,129 @@ class MessageService:
                 exception.add_note("The process instance encountered an error and failed after starting.")
             raise exception
 
+    @classmethod
+    def find_receive_message_for_send_message(cls, message_instance_send: MessageInstanceModel) -> MessageInstanceModel | None:
+        """Finds the ready receive message that correlates with the given send message.
+
+        Receive messages store their correlation keys when they are created so this only needs to evaluate
+        each distinct retrieval expression once against the send payload and then look up matching keys.
+        Receive messages without stored keys, like ones created before keys were stored, are checked by
+        evaluating their expressions and get their keys stored so the next lookup can use them.
+        If multiple receive messages match, the newest one wins.
+        """
+        script_engine = CustomBpmnScriptEngine()
+        candidate_hashes = cls._correlation_key_hashes_for_send_message(message_instance_send, script_engine)
+
+        message_instance_receive: MessageInstanceModel | None = None
+        if len(candidate_hashes) > 0:
+            message_instance_receive = (
+                MessageInstanceModel.query.join(
+                    MessageInstanceCorrelationKeyModel,
+                    MessageInstanceCorrelationKeyModel.message_instance_id == MessageInstanceModel.id,
+                )
+                .filter(
+                    MessageInstanceCorrelationKeyModel.message_name == message_instance_send.name,
+                    MessageInstanceCorrelationKeyModel.correlation_key_hash.in_(candidate_hashes),  # type: ignore
+                    MessageInstanceModel.status == MessageStatuses.ready.value,
+                    MessageInstanceModel.message_type == MessageTypes.receive.value,
+                )
+                .order_by(MessageInstanceModel.id.desc())  # type: ignore
+                .first()
+            )
+
+        unindexed_receive_messages = (
+            MessageInstanceModel.query.filter_by(
+                name=message_instance_send.name,
+                status=MessageStatuses.ready.value,
+                message_type=MessageTypes.receive.value,
+            )
+            .filter(~MessageInstanceModel.correlation_key_records.any())  # type: ignore
+            .order_by(MessageInstanceModel.id)  # type: ignore
+            .all()
+        )
+        for message_instance in unindexed_receive_messages:
+            for correlation_key_record in MessageInstanceCorrelationKeyModel.build_for_receive_message(message_instance) or []:
+                db.session.add(correlation_key_record)
+            if message_instance.correlates(message_instance_send, script_engine):
+                if message_instance_receive is None or message_instance.id > message_instance_receive.id:
+                    message_instance_receive = message_instance
+
+        return message_instance_receive
+
+    @classmethod
+    def _correlation_key_hashes_for_send_message(
+        cls, message_instance_send: MessageInstanceModel, script_engine: CustomBpmnScriptEngine
+    ) -> set[str]:
+        candidate_hashes: set[str] = set()
+        if isinstance(message_instance_send.correlation_keys, dict) and message_instance_send.correlation_keys != {}:
+            try:
+                candidate_hashes.add(
+                    MessageInstanceCorrelationKeyModel.hash_for_identical_correlation_keys(message_instance_send.correlation_keys)
+                )
+            except (TypeError, ValueError):
+                pass
+
+        # find one example of each distinct set of correlation properties that waiting receive messages use
+        correlation_key_ids_by_properties = (
+            db.session.query(func.min(MessageInstanceCorrelationKeyModel.id))
+            .join(MessageInstanceModel, MessageInstanceModel.id == MessageInstanceCorrelationKeyModel.message_instance_id)
+            .filter(
+                MessageInstanceCorrelationKeyModel.message_name == message_instance_send.name,
+                MessageInstanceCorrelationKeyModel.correlation_properties_hash.isnot(None),  # type: ignore
+                MessageInstanceModel.status == MessageStatuses.ready.value,
+                MessageInstanceModel.message_type == MessageTypes.receive.value,
+            )
+            .group_by(MessageInstanceCorrelationKeyModel.correlation_properties_hash)
+            .all()
+        )
+        correlation_key_records = MessageInstanceCorrelationKeyModel.query.filter(
+            MessageInstanceCorrelationKeyModel.id.in_([row[0] for row in correlation_key_ids_by_properties])  # type: ignore
+        ).all()
+
+        evaluated_expressions: dict[str, Any] = {}
+        failed_expressions: set[str] = set()
+        for correlation_key_record in correlation_key_records:
+            correlation_properties = correlation_key_record.correlation_properties or []
+            correlation_values = []
+            for _name, retrieval_expression in correlation_properties:
+                if retrieval_expression not in evaluated_expressions and retrieval_expression not in failed_expressions:
+                    try:
+                        evaluated_expressions[retrieval_expression] = script_engine.environment.evaluate(
+                            retrieval_expression, message_instance_send.payload
+                        )
+                    except Exception as e:
+                        # the failure of a payload evaluation may not mean that matches for these
+                        # message instances can't happen with other messages.  So don't error up.
+                        current_app.logger.warning(
+                            "Error evaluating correlation key when comparing send and receive messages. "
+                            + f"Mesage name: '{message_instance_send.name}'. Send mesage id: '{message_instance_send.id}'. "
+                            + f"Expression {retrieval_expression} failed with the error: "
+                            + str(e)
+                        )
+                        failed_expressions.add(retrieval_expression)
+                if retrieval_expression in failed_expressions:
+                    break
+                correlation_values.append(evaluated_expressions[retrieval_expression])
+            else:
+                try:
+                    candidate_hashes.add(
+                        MessageInstanceCorrelationKeyModel.hash_for_correlation_values(correlation_properties, correlation_values)
+                    )
+                except (TypeError, ValueError):
+                    pass
+        return candidate_hashes
+
     @classmethod
     def correlate_all_message_instances(
         cls,
         execution_mode: str | None = None,
     ) -> None:
         """Look at ALL the Send and Receive Messages and attempt to find correlations."""
+        batch_size = current_app.config["SPIFFWORKFLOW_BACKEND_MESSAGE_CORRELATION_BATCH_SIZE"]
+        if batch_size > 0:
+            cls.correlate_message_instances_in_batches(batch_size, execution_mode=execution_mode)
+            return
+
         message_instances_send = MessageInstanceModel.query.filter_by(message_type="send", status="ready").all()
 
         for message_instance_send in message_instances_send:
@@ -185,6 +303,203 @@ class MessageService:
             )
             cls.correlate_send_message(message_instance_send, execution_mode=execution_mode)
 
+    @classmethod
+    def correlate_message_instances_in_batches(cls, batch_size: int, execution_mode: str | None = None) -> None:
+        """Claims ready send messages in batches and delivers them grouped by receiving process instance.
+
+        Each receiving process instance is loaded and saved once for all of the messages in a batch
+        instead of once per message. With celery enabled, each of those groups is handed to a worker.
+        Send messages without a waiting receive message go through correlate_send_message since they
+        may need to start a process instance with a message start event.
+        """
+        claimed_send_ids: set[int] = set()
+        while True:
+            message_instances_send = cls.claim_ready_send_messages(batch_size, exclude_ids=claimed_send_ids)
+            if len(message_instances_send) == 0:
+                break
+            claimed_send_ids.update(m.id for m in message_instances_send)
+
+            message_instance_id_pairs_by_process_instance: dict[int, list[list[int]]] = {}
+            unmatched_message_instances_send = []
+            try:
+                for message_instance_send in message_instances_send:
+                    message_instance_receive = cls.find_receive_message_for_send_message(message_instance_send)
+                    if message_instance_receive is None or message_instance_receive.process_instance_id is None:
+                        unmatched_message_instances_send.append(message_instance_send)
+                        continue
+                    # mark it as running right away so the next send in the batch cannot match it as well
+                    message_instance_receive.status = MessageStatuses.running.value
+                    db.session.add(message_instance_receive)
+                    message_instance_id_pairs_by_process_instance.setdefault(
+                        message_instance_receive.process_instance_id, []
+                    ).append([message_instance_send.id, message_instance_receive.id])
+                db.session.commit()
+            except Exception:
+                # nothing was handed off yet so let the next run try all of them again
+                db.session.rollback()
+                cls._reset_running_message_instances_to_ready([m.id for m in message_instances_send])
+                raise
+
+            for process_instance_id, message_instance_id_pairs in message_instance_id_pairs_by_process_instance.items():
+                if current_app.config["SPIFFWORKFLOW_BACKEND_CELERY_ENABLED"]:
+                    try:
+                        queue_message_instance_pairs_for_correlation(
+                            process_instance_id, message_instance_id_pairs, execution_mode=execution_mode
+                        )
+                    except Exception as exception:
+                        # nothing will pick these up if they stay running so let the next run try again
+                        cls._reset_running_message_instances_to_ready(
+                            [message_instance_id for pair in message_instance_id_pairs for message_instance_id in pair]
+                        )
+                        current_app.logger.exception(
+                            f"Error queueing messages {message_instance_id_pairs} for process instance {process_instance_id}. "
+                            f"They will be tried again. {exception.__class__.__name__}: {str(exception)}"
+                        )
+                    continue
+                try:
+                    cls.correlate_message_instance_pairs(
+                        process_instance_id, message_instance_id_pairs, execution_mode=execution_mode
+                    )
+                except Exception as exception:
+                    current_app.logger.exception(
+                        f"Error correlating messages {message_instance_id_pairs} for process instance {process_instance_id}. "
+                        f"{exception.__class__.__name__}: {str(exception)}"
+                    )
+
+            for message_instance_send in unmatched_message_instances_send:
+                current_app.logger.info(
+                    f"Processor waiting send messages: Processing message id {message_instance_send.id}. "
+                    f"Name: '{message_instance_send.name}'"
+                )
+                # still claimed so no other worker can pick it up in the meantime.
+                # correlate_send_message puts it back to ready if it cannot be delivered yet.
+                try:
+                    cls.correlate_send_message(message_instance_send, execution_mode=execution_mode, already_claimed=True)
+                except Exception as exception:
+                    current_app.logger.exception(
+                        f"Error correlating send message {message_instance_send.id}. "
+                        f"{exception.__class__.__name__}: {str(exception)}"
+                    )
+
+            if len(message_instances_send) < batch_size:
+                break
+
+    @classmethod
+    def _reset_running_message_instances_to_ready(cls, message_instance_ids: list[int]) -> None:
+        MessageInstanceModel.query.filter(
+            MessageInstanceModel.id.in_(message_instance_ids),  # type: ignore
+            MessageInstanceModel.status == MessageStatuses.running.value,
+        ).update({"status": MessageStatuses.ready.value}, synchronize_session=False)
+        db.session.commit()
+
+    @classmethod
+    def claim_ready_send_messages(cls, batch_size: int, exclude_ids: set[int] | None = None) -> list[MessageInstanceModel]:
+        """Marks up to batch_size ready send messages as running and returns them.
+
+        The rows are selected with SKIP LOCKED so concurrent claimers each get their own set of messages.
+        The select and update happen in one transaction since mysql cannot update a table from a subquery on itself.
+        """
+        query = db.session.query(MessageInstanceModel.id).filter(
+            MessageInstanceModel.message_type == MessageTypes.send.value,
+            MessageInstanceModel.status == MessageStatuses.ready.value,
+        )
+        if exclude_ids:
+            query = query.filter(MessageInstanceModel.id.not_in(exclude_ids))  # type: ignore
+        message_instance_ids = [
+            row[0]
+            for row in query.order_by(MessageInstanceModel.id).limit(batch_size).with_for_update(skip_locked=True).all()  # type: ignore
+        ]
+        if len(message_instance_ids) == 0:
+            db.session.commit()
+            return []
+
+        MessageInstanceModel.query.filter(
+            MessageInstanceModel.id.in_(message_instance_ids),  # type: ignore
+            MessageInstanceModel.status == MessageStatuses.ready.value,
+        ).update(
+            {"status": MessageStatuses.running.value, "updated_at_in_seconds": round(time.time())},
+            synchronize_session=False,
+        )
+        db.session.commit()
+        message_instances: list[MessageInstanceModel] = (
+            MessageInstanceModel.query.filter(
+                MessageInstanceModel.id.in_(message_instance_ids),  # type: ignore
+                MessageInstanceModel.status == MessageStatuses.running.value,
+            )
+            .order_by(MessageInstanceModel.id)  # type: ignore
+            .all()
+        )
+        return message_instances
+
+    @classmethod
+    def correlate_message_instance_pairs(
+        cls, process_instance_id: int, message_instance_id_pairs: list[list[int]], execution_mode: str | None = None
+    ) -> None:
+        """Delivers already matched send and receive messages to their receiving process instance with a single save.
+
+        Both messages of each pair are expected to be marked as running by the caller.
+        """
+        message_instance_ids = [message_instance_id for pair in message_instance_id_pairs for message_instance_id in pair]
+        message_instances_by_id = {
+            m.id: m
+            for m in MessageInstanceModel.query.filter(MessageInstanceModel.id.in_(message_instance_ids)).all()  # type: ignore
+        }
+        message_instance_pairs = [
+            (message_instances_by_id[send_id], message_instances_by_id[receive_id])
+            for send_id, receive_id in message_instance_id_pairs
+            if send_id in message_instances_by_id and receive_id in message_instances_by_id
+        ]
+        if len(message_instance_pairs) == 0:
+            return
+
+        receiving_process_instance = ProcessInstanceModel.query.filter_by(id=process_instance_id).first()
+        if receiving_process_instance is None or not receiving_process_instance.can_receive_message():
+            cls._set_status_on_message_instance_pairs(message_instance_pairs, MessageStatuses.ready.value)
+            db.session.commit()
+            return
+
+        try:
+            with ProcessInstanceQueueService.dequeued(receiving_process_instance):
+                processor_receive = ProcessInstanceProcessor(receiving_process_instance)
+                for message_instance_send, message_instance_receive in message_instance_pairs:
+                    processor_receive.bpmn_process_instance.send_event(
+                        cls.bpmn_event_for_message_instances(message_instance_receive, message_instance_send)
+                    )
+                    message_instance_receive.counterpart_id = message_instance_send.id
+                    message_instance_send.counterpart_id = message_instance_receive.id
+                cls._set_status_on_message_instance_pairs(message_instance_pairs, MessageStatuses.completed.value)
+                cls.run_engine_steps_after_receiving_messages(
+                    processor_receive, receiving_process_instance, execution_mode=execution_mode, save=True
+                )
+                db.session.commit()
+        except ProcessInstanceIsAlreadyLockedError:
+            cls._set_status_on_message_instance_pairs(message_instance_pairs, MessageStatuses.ready.value)
+            db.session.commit()
+            return
+        except Exception as exception:
+            cls._set_status_on_message_instance_pairs(
+                message_instance_pairs, MessageStatuses.failed.value, failure_cause=str(exception)
+            )
+            db.session.commit()
+            raise exception
+
+        if should_queue_process_instance(receiving_process_instance, execution_mode=execution_mode):
+            queue_process_instance_if_appropriate(receiving_process_instance, execution_mode=execution_mode)
+
+    @classmethod
+    def _set_status_on_message_instance_pairs(
+        cls,
+        message_instance_pairs: list[tuple[MessageInstanceModel, MessageInstanceModel]],
+        status: str,
+        failure_cause: str | None = None,
+    ) -> None:
+        for message_instance_pair in message_instance_pairs:
+            for message_instance in message_instance_pair:
+                message_instance.status = status
+                if failure_cause is not None:
+                    message_instance.failure_cause = failure_cause
+                db.session.add(message_instance)
+
     @classmethod
     def start_process_with_message(
         cls,
@@ -226,6 +541,25 @@ class MessageService:
         execution_mode: str | None = None,
         processor_receive: ProcessInstanceProcessor | None = None,
     ) -> None:
+        bpmn_event = MessageService.bpmn_event_for_message_instances(message_instance_receive, message_instance_send)
+        processor_receive_to_use = processor_receive
+        save_engine_steps = False
+        if processor_receive_to_use is None:
+            processor_receive_to_use = ProcessInstanceProcessor(receiving_process_instance)
+            save_engine_steps = True
+        processor_receive_to_use.bpmn_process_instance.send_event(bpmn_event)
+        MessageService.run_engine_steps_after_receiving_messages(
+            processor_receive_to_use, receiving_process_instance, execution_mode=execution_mode, save=save_engine_steps
+        )
+        message_instance_receive.status = MessageStatuses.completed.value
+        db.session.add(message_instance_receive)
+        if save_engine_steps:
+            db.session.commit()
+
+    @staticmethod
+    def bpmn_event_for_message_instances(
+        message_instance_receive: MessageInstanceModel, message_instance_send: MessageInstanceModel
+    ) -> BpmnEvent:
         correlation_properties = []
         for cr in message_instance_receive.correlation_rules:
             correlation_properties.append(
@@ -242,36 +576,28 @@ class MessageService:
         correlations = bpmn_message.calculate_correlations(
             CustomBpmnScriptEngine(), bpmn_message.correlation_properties, message_instance_send.payload
         )
-        bpmn_event = BpmnEvent(
+        return BpmnEvent(
             event_definition=bpmn_message,
             payload=message_instance_send.payload,
             correlations=correlations,
         )
-        processor_receive_to_use = processor_receive
-        save_engine_steps = False
-        if processor_receive_to_use is None:
-            processor_receive_to_use = ProcessInstanceProcessor(receiving_process_instance)
-            save_engine_steps = True
-        processor_receive_to_use.bpmn_process_instance.send_event(bpmn_event)
-        execution_strategy_name = None
 
+    @staticmethod
+    def run_engine_steps_after_receiving_messages(
+        processor_receive: ProcessInstanceProcessor,
+        receiving_process_instance: ProcessInstanceModel,
+        execution_mode: str | None = None,
+        save: bool = False,
+    ) -> None:
         if should_queue_process_instance(receiving_process_instance, execution_mode=execution_mode):
             # even if we are queueing, we ran a "send_event" call up above, and it updated some tasks.
             # we need to serialize these task updates to the db. do_engine_steps with save does that.
-            processor_receive_to_use.do_engine_steps(
-                save=save_engine_steps, execution_strategy_name="run_current_ready_tasks", needs_dequeue=save_engine_steps
-            )
+            processor_receive.do_engine_steps(save=save, execution_strategy_name="run_current_ready_tasks", needs_dequeue=save)
         elif not ProcessInstanceTmpService.is_enqueued_to_run_in_the_future(receiving_process_instance):
             execution_strategy_name = None
             if execution_mode == ProcessInstanceExecutionMode.synchronous.value:
                 execution_strategy_name = "greedy"
-            processor_receive_to_use.do_engine_steps(
-                save=save_engine_steps, execution_strategy_name=execution_strategy_name, needs_dequeue=save_engine_steps
-            )
-        message_instance_receive.status = MessageStatuses.completed.value
-        db.session.add(message_instance_receive)
-        if save_engine_steps:
-            db.session.commit()
+            processor_receive.do_engine_steps(save=save, execution_strategy_name=execution_strategy_name, needs_dequeue=save)
 
     @classmethod
     def find_message_triggerable_process_model(cls, modified_message_name: str) -> MessageTriggerableProcessModel:
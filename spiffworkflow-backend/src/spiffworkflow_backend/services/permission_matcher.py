@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import bisect
+
+from spiffworkflow_backend.models.permission_assignment import PermissionAssignmentModel
+
+
+class PermissionTargetTrieNode:
+    __slots__ = ("children", "any_character_child", "any_sequence_child", "is_any_sequence", "grant_types")
+
+    def __init__(self, is_any_sequence: bool = False) -> None:
+        self.children: dict[str, PermissionTargetTrieNode] = {}
+        self.any_character_child: PermissionTargetTrieNode | None = None
+        self.any_sequence_child: PermissionTargetTrieNode | None = None
+        # a node reached through "%" can consume any number of characters before moving on
+        self.is_any_sequence = is_any_sequence
+        self.grant_types: set[str] = set()
+
+
+class PermissionMatcher:
+    """Answers permission checks for a set of principals without going to the database.
+
+    This mirrors the query AuthorizationService used to run for every request. Permission target uris are
+    sql LIKE patterns so they are compiled into a trie per permission where "%" matches any sequence of
+    characters and "_" matches any single character. A target also matches the uri left after removing
+    its "/%" and ":%" wildcards so a wildcard permission on a path includes the path itself.
+
+    LIKE and = are case insensitive on some databases so the matcher lowercases uris to match those.
+    """
+
+    def __init__(self, like_is_case_sensitive: bool = True, equals_is_case_sensitive: bool = True) -> None:
+        self.like_is_case_sensitive = like_is_case_sensitive
+        self.equals_is_case_sensitive = equals_is_case_sensitive
+        self.trie_roots: dict[str, PermissionTargetTrieNode] = {}
+        self.base_uri_grant_types: dict[str, dict[str, set[str]]] = {}
+
+    @classmethod
+    def from_permission_assignments(
+        cls,
+        permission_assignments: list[PermissionAssignmentModel],
+        like_is_case_sensitive: bool = True,
+        equals_is_case_sensitive: bool = True,
+    ) -> PermissionMatcher:
+        permission_matcher = cls(like_is_case_sensitive=like_is_case_sensitive, equals_is_case_sensitive=equals_is_case_sensitive)
+        for permission_assignment in permission_assignments:
+            permission_matcher.add_target(
+                permission_assignment.permission,
+                permission_assignment.permission_target.uri,
+                permission_assignment.grant_type,
+            )
+        return permission_matcher
+
+    def add_target(self, permission: str, target_uri: str, grant_type: str) -> None:
+        node = self.trie_roots.setdefault(permission, PermissionTargetTrieNode())
+        for character in target_uri if self.like_is_case_sensitive else target_uri.lower():
+            if character == "%":
+                # consecutive wildcards match the same things as one
+                if not node.is_any_sequence:
+                    if node.any_sequence_child is None:
+                        node.any_sequence_child = PermissionTargetTrieNode(is_any_sequence=True)
+                    node = node.any_sequence_child
+            elif character == "_":
+                if node.any_character_child is None:
+                    node.any_character_child = PermissionTargetTrieNode()
+                node = node.any_character_child
+            else:
+                node = node.children.setdefault(character, PermissionTargetTrieNode())
+        node.grant_types.add(grant_type)
+
+        base_uri = target_uri.replace("/%", "").replace(":%", "")
+        if not self.equals_is_case_sensitive:
+            base_uri = base_uri.lower()
+        self.base_uri_grant_types.setdefault(permission, {}).setdefault(base_uri, set()).add(grant_type)
+
+    def grant_types_for(self, permission: str, uri: str) -> set[str]:
+        grant_types: set[str] = set()
+        base_uri = uri if self.equals_is_case_sensitive else uri.lower()
+        grant_types.update(self.base_uri_grant_types.get(permission, {}).get(base_uri, set()))
+
+        root = self.trie_roots.get(permission)
+        if root is None:
+            return grant_types
+
+        nodes = self._with_empty_sequences({root})
+        for character in uri if self.like_is_case_sensitive else uri.lower():
+            next_nodes = set()
+            for node in nodes:
+                if character in node.children:
+                    next_nodes.add(node.children[character])
+                if node.any_character_child is not None:
+                    next_nodes.add(node.any_character_child)
+                if node.is_any_sequence:
+                    next_nodes.add(node)
+            if len(next_nodes) == 0:
+                return grant_types
+            nodes = self._with_empty_sequences(next_nodes)
+
+        for node in nodes:
+            grant_types.update(node.grant_types)
+        return grant_types
+
+    def has_permission(self, permission: str, uri: str) -> bool:
+        grant_types = self.grant_types_for(permission, uri)
+        if len(grant_types) == 0:
+            return False
+
+        for grant_type in grant_types:
+            if grant_type not in ["permit", "deny"]:
+                raise Exception(f"Unknown grant type: {grant_type}")
+        return "deny" not in grant_types
+
+    @classmethod
+    def _with_empty_sequences(cls, nodes: set[PermissionTargetTrieNode]) -> set[PermissionTargetTrieNode]:
+        """Adds the nodes reachable by letting "%" match nothing."""
+        nodes_to_check = list(nodes)
+        while len(nodes_to_check) > 0:
+            node = nodes_to_check.pop()
+            if node.any_sequence_child is not None and node.any_sequence_child not in nodes:
+                nodes.add(node.any_sequence_child)
+                nodes_to_check.append(node.any_sequence_child)
+        return nodes
+
+
+class PermissionAssignmentMatcher:
+    """Answers AuthorizationService.permission_assignments_include for many uris against one list of assignments.
+
+    permission_assignments_include looks at every assignment for every uri it checks. This indexes the assignments
+    by permission once instead. Targets ending in "%" match any uri starting with the rest of the target and the
+    target without its trailing "%", ":" and "/" while other targets only match themselves, so checking a uri
+    only looks up the uri and its prefixes.
+    """
+
+    def __init__(self) -> None:
+        self.exact_grant_types: dict[str, dict[str, set[str]]] = {}
+        self.prefix_grant_types: dict[str, dict[str, set[str]]] = {}
+        self.longest_prefix_length: dict[str, int] = {}
+        # sorted so finding targets that start with a string is a bisect
+        self.sorted_target_uris: dict[str, dict[str, list[str]]] = {}
+
+    @classmethod
+    def from_permission_assignments(cls, permission_assignments: list[PermissionAssignmentModel]) -> PermissionAssignmentMatcher:
+        permission_assignment_matcher = cls()
+        for permission_assignment in permission_assignments:
+            permission_assignment_matcher.add_target(
+                permission_assignment.permission,
+                permission_assignment.permission_target.uri,
+                permission_assignment.grant_type,
+            )
+        for target_uris_by_grant_type in permission_assignment_matcher.sorted_target_uris.values():
+            for target_uris in target_uris_by_grant_type.values():
+                target_uris.sort()
+        return permission_assignment_matcher
+
+    def add_target(self, permission: str, target_uri: str, grant_type: str) -> None:
+        exact_uri = target_uri
+        if target_uri.endswith("%"):
+            prefix = target_uri.removesuffix("%")
+            self.prefix_grant_types.setdefault(permission, {}).setdefault(prefix, set()).add(grant_type)
+            self.longest_prefix_length[permission] = max(self.longest_prefix_length.get(permission, 0), len(prefix))
+            exact_uri = prefix.removesuffix(":").removesuffix("/")
+        self.exact_grant_types.setdefault(permission, {}).setdefault(exact_uri, set()).add(grant_type)
+        self.sorted_target_uris.setdefault(permission, {}).setdefault(grant_type, []).append(target_uri)
+
+    def grant_types_for(self, permission: str, uri: str) -> set[str]:
+        grant_types = set(self.exact_grant_types.get(permission, {}).get(uri, set()))
+        prefix_grant_types = self.prefix_grant_types.get(permission)
+        if prefix_grant_types:
+            for prefix_length in range(min(len(uri), self.longest_prefix_length[permission]) + 1):
+                grant_types.update(prefix_grant_types.get(uri[:prefix_length], set()))
+        return grant_types
+
+    def includes(self, permission: str, uri: str) -> bool:
+        """Same as has_permissions_and_all_permissions_permit on the assignments matching the uri."""
+        grant_types = self.grant_types_for(permission, uri)
+        return len(grant_types) > 0 and "deny" not in grant_types
+
+    def has_target_starting_with(self, permission: str, grant_type: str, uri_prefix: str) -> bool:
+        target_uris = self.sorted_target_uris.get(permission, {}).get(grant_type, [])
+        index = bisect.bisect_left(target_uris, uri_prefix)
+        return index < len(target_uris) and target_uris[index].startswith(uri_prefix)
@@ -41,6 +41,8 @@ class ProcessInstanceLockService:
             "uuid": current_app.config["PROCESS_UUID"],
             "thread_id": threading.get_ident(),
             "locks": {},
+            # queue entries locked in the db by claim_many that have not been dequeued yet
+            "claims": {},
         }
 
     @classmethod
@@ -72,6 +74,23 @@ class ProcessInstanceLockService:
         ctx = cls.get_thread_local_locking_context()
         return ctx["locks"].pop(process_instance_id, None)  # type: ignore
 
+    @classmethod
+    def claim(cls, process_instance_id: int, queue_entry: ProcessInstanceQueueModel) -> None:
+        ctx = cls.get_thread_local_locking_context()
+        ctx["claims"][process_instance_id] = queue_entry
+
+    @classmethod
+    def pop_claim(cls, process_instance_id: int) -> ProcessInstanceQueueModel | None:
+        ctx = cls.get_thread_local_locking_context()
+        return ctx["claims"].pop(process_instance_id, None)  # type: ignore
+
+    @classmethod
+    def pop_all_claims(cls) -> list[ProcessInstanceQueueModel]:
+        ctx = cls.get_thread_local_locking_context()
+        queue_entries = list(ctx["claims"].values())
+        ctx["claims"] = {}
+        return queue_entries
+
     @classmethod
     def has_lock(cls, process_instance_id: int) -> bool:
         ctx = cls.get_thread_local_locking_context()
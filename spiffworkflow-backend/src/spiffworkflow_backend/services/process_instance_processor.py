@@ -85,6 +85,7 @@ from spiffworkflow_backend.models.task import TaskModel
 from spiffworkflow_backend.models.task import TaskNotFoundError
 from spiffworkflow_backend.models.task_definition import TaskDefinitionModel
 from spiffworkflow_backend.models.user import UserModel
+from spiffworkflow_backend.scripts.script import CURRENT_SCRIPT_ATTRIBUTES_CONTEXT
 from spiffworkflow_backend.scripts.script import Script
 from spiffworkflow_backend.services.file_system_service import FileSystemService
 from spiffworkflow_backend.services.jinja_service import JinjaHelpers
@@ -95,6 +96,7 @@ from spiffworkflow_backend.services.process_model_service import ProcessModelSer
 from spiffworkflow_backend.services.service_task_service import CustomServiceTask
 from spiffworkflow_backend.services.service_task_service import ServiceTaskDelegate
 from spiffworkflow_backend.services.task_service import StartAndEndTimes
+from spiffworkflow_backend.services.task_service import TaskDataSizeTracker
 from spiffworkflow_backend.services.task_service import TaskService
 from spiffworkflow_backend.services.user_service import UserService
 from spiffworkflow_backend.services.workflow_execution_service import ExecutionStrategy
@@ -344,7 +346,7 @@ class CustomBpmnScriptEngine(PythonScriptEngine):  # type: ignore
         environment = CustomScriptEngineEnvironment.create(default_globals)
         super().__init__(environment=environment)
 
-    def __get_augment_methods(self, task: SpiffTask | None) -> dict[str, Callable]:
+    def __get_script_attributes_context(self, task: SpiffTask | None) -> ScriptAttributesContext:
         tld = current_app.config.get("THREAD_LOCAL_DATA")
         process_model_identifier = None
         process_instance_id = None
@@ -353,20 +355,24 @@ class CustomBpmnScriptEngine(PythonScriptEngine):  # type: ignore
                 process_model_identifier = tld.process_model_identifier
             if hasattr(tld, "process_instance_id"):
                 process_instance_id = tld.process_instance_id
-        script_attributes_context = ScriptAttributesContext(
+        return ScriptAttributesContext(
             task=task,
             environment_identifier=current_app.config["ENV_IDENTIFIER"],
             process_instance_id=process_instance_id,
             process_model_identifier=process_model_identifier,
         )
-        return Script.generate_augmented_list(script_attributes_context)
 
-    def evaluate(self, task: SpiffTask, expression: str, external_context: dict[str, Any] | None = None) -> Any:
-        """Evaluate the given expression, within the context of the given task and return the result."""
-        methods = self.__get_augment_methods(task)
+    def __get_augment_methods(self, external_context: dict[str, Any] | None) -> dict[str, Callable]:
+        # the script functions are shared so copy them before adding anything
+        methods: dict[str, Callable] = dict(Script.script_functions())
         if external_context:
             methods.update(external_context)
+        return methods
 
+    def evaluate(self, task: SpiffTask, expression: str, external_context: dict[str, Any] | None = None) -> Any:
+        """Evaluate the given expression, within the context of the given task and return the result."""
+        methods = self.__get_augment_methods(external_context)
+        script_attributes_context_token = CURRENT_SCRIPT_ATTRIBUTES_CONTEXT.set(self.__get_script_attributes_context(task))
         try:
             return super().evaluate(task, expression, external_context=methods)
         except Exception as exception:
@@ -380,13 +386,14 @@ class CustomBpmnScriptEngine(PythonScriptEngine):  # type: ignore
                     task=task,
                     exception=exception,
                 ) from exception
+        finally:
+            CURRENT_SCRIPT_ATTRIBUTES_CONTEXT.reset(script_attributes_context_token)
 
     def execute(self, task: SpiffTask, script: str, external_context: Any = None) -> bool:
+        script_attributes_context_token = CURRENT_SCRIPT_ATTRIBUTES_CONTEXT.set(self.__get_script_attributes_context(task))
         try:
             # reset failing task just in case
-            methods = self.__get_augment_methods(task)
-            if external_context:
-                methods.update(external_context)
+            methods = self.__get_augment_methods(external_context)
 
             # do not run script if it is blank
             if script:
@@ -396,6 +403,8 @@ class CustomBpmnScriptEngine(PythonScriptEngine):  # type: ignore
             raise e
         except Exception as e:
             raise self.create_task_exec_exception(task, script, e) from e
+        finally:
+            CURRENT_SCRIPT_ATTRIBUTES_CONTEXT.reset(script_attributes_context_token)
 
     def call_service(
         self,
@@ -462,6 +471,11 @@ class ProcessInstanceProcessor:
         self.task_model_mapping: dict[str, TaskModel] = {}
         self.bpmn_subprocess_mapping: dict[str, BpmnProcessModel] = {}
 
+        # sizes of the data of finished tasks as they get saved so the task data size limit can be enforced
+        # without dumping all of the task data on every run. built on the first run so loading an instance
+        # just to read it does not have to measure all of its task data.
+        self.task_data_size_tracker: TaskDataSizeTracker | None = None
+
         # this caches the bpmn_process_definition_identifier and task_identifier back to the bpmn_process_id
         # intthe database. This is to cut down on database queries while adding new tasks to the database.
         # Structure:
@@ -703,33 +717,18 @@ class ProcessInstanceProcessor:
     def _get_bpmn_process_dict(
         cls,
         bpmn_process: BpmnProcessModel,
-        task_model_mapping: dict[str, TaskModel],
-        get_tasks: bool = False,
-        include_task_data_for_completed_tasks: bool = False,
+        json_data_mappings: dict[str, dict],
     ) -> dict:
-        json_data = JsonDataModel.query.filter_by(hash=bpmn_process.json_data_hash).first()
-        bpmn_process_dict = {"data": json_data.data, "tasks": {}}
+        bpmn_process_dict = {"data": json_data_mappings[bpmn_process.json_data_hash], "tasks": {}}
         bpmn_process_dict.update(bpmn_process.properties_json)
-        if get_tasks:
-            tasks = TaskModel.query.filter_by(bpmn_process_id=bpmn_process.id).all()
-            cls._get_tasks_dict(
-                tasks,
-                bpmn_process_dict,
-                include_task_data_for_completed_tasks=include_task_data_for_completed_tasks,
-                task_model_mapping=task_model_mapping,
-            )
         return bpmn_process_dict
 
     @classmethod
-    def _get_tasks_dict(
+    def _task_guids_to_rehydrate(
         cls,
         tasks: list[TaskModel],
-        spiff_bpmn_process_dict: dict,
-        task_model_mapping: dict[str, TaskModel],
-        bpmn_subprocess_id_to_guid_mappings: dict | None = None,
         include_task_data_for_completed_tasks: bool = False,
-    ) -> None:
-        json_data_hashes = set()
+    ) -> set[str]:
         states_to_exclude_from_rehydration: list[str] = []
         if not include_task_data_for_completed_tasks:
             # load CANCELLED task data for Gateways since they are marked as CANCELLED
@@ -741,7 +740,6 @@ class ProcessInstanceProcessor:
         for task in tasks:
             parent_guid = task.parent_guid()
             if task.state not in states_to_exclude_from_rehydration:
-                json_data_hashes.add(task.json_data_hash)
                 task_guids_to_add.add(task.guid)
 
                 # load parent task data to avoid certain issues that can arise from parallel branches
@@ -749,7 +747,6 @@ class ProcessInstanceProcessor:
                     parent_guid in task_list_by_hash
                     and task_list_by_hash[parent_guid].state in states_to_exclude_from_rehydration
                 ):
-                    json_data_hashes.add(task_list_by_hash[parent_guid].json_data_hash)
                     task_guids_to_add.add(parent_guid)
             elif (
                 parent_guid in task_list_by_hash
@@ -757,13 +754,19 @@ class ProcessInstanceProcessor:
                 and task_list_by_hash[parent_guid] not in states_to_exclude_from_rehydration
             ):
                 # make sure we add task data for multi-instance tasks as well
-                json_data_hashes.add(task.json_data_hash)
                 task_guids_to_add.add(task.guid)
+        return task_guids_to_add
 
-        json_data_records = JsonDataModel.query.filter(JsonDataModel.hash.in_(json_data_hashes)).all()  # type: ignore
-        json_data_mappings = {}
-        for json_data_record in json_data_records:
-            json_data_mappings[json_data_record.hash] = json_data_record.data
+    @classmethod
+    def _get_tasks_dict(
+        cls,
+        tasks: list[TaskModel],
+        spiff_bpmn_process_dict: dict,
+        task_model_mapping: dict[str, TaskModel],
+        task_guids_to_add: set[str],
+        json_data_mappings: dict[str, dict],
+        bpmn_subprocess_id_to_guid_mappings: dict | None = None,
+    ) -> None:
         for task in tasks:
             tasks_dict = spiff_bpmn_process_dict["tasks"]
             if bpmn_subprocess_id_to_guid_mappings:
@@ -810,14 +813,7 @@ class ProcessInstanceProcessor:
             )
 
             if bpmn_process is not None:
-                single_bpmn_process_dict = cls._get_bpmn_process_dict(
-                    bpmn_process,
-                    get_tasks=True,
-                    include_task_data_for_completed_tasks=include_task_data_for_completed_tasks,
-                    task_model_mapping=task_model_mapping,
-                )
-                spiff_bpmn_process_dict.update(single_bpmn_process_dict)
-
+                # everything is loaded with a fixed number of queries no matter how many subprocesses there are
                 bpmn_subprocesses_query = BpmnProcessModel.query.filter_by(top_level_process_id=bpmn_process.id)
                 if not include_completed_subprocesses:
                     bpmn_subprocesses_query = bpmn_subprocesses_query.join(
@@ -825,27 +821,60 @@ class ProcessInstanceProcessor:
                     ).filter(
                         TaskModel.state.not_in(["COMPLETED", "ERROR", "CANCELLED"])  # type: ignore
                     )
-                bpmn_subprocesses = bpmn_subprocesses_query.all()
+                bpmn_subprocesses = []
                 bpmn_subprocess_id_to_guid_mappings = {}
-                for bpmn_subprocess in bpmn_subprocesses:
+                for bpmn_subprocess in bpmn_subprocesses_query.all():
                     subprocess_identifier = bpmn_subprocess.bpmn_process_definition.bpmn_identifier
                     if subprocess_identifier not in spiff_bpmn_process_dict["subprocess_specs"]:
                         current_app.logger.info(f"Deferring subprocess spec: '{subprocess_identifier}'")
                         continue
+                    bpmn_subprocesses.append(bpmn_subprocess)
                     bpmn_subprocess_id_to_guid_mappings[bpmn_subprocess.id] = bpmn_subprocess.guid
-                    single_bpmn_process_dict = cls._get_bpmn_process_dict(bpmn_subprocess, task_model_mapping=task_model_mapping)
-                    spiff_bpmn_process_dict["subprocesses"][bpmn_subprocess.guid] = single_bpmn_process_dict
                     bpmn_subprocess_mapping[bpmn_subprocess.guid] = bpmn_subprocess
 
+                bpmn_process_json_data_mappings = JsonDataModel.find_data_dicts_by_hashes(
+                    {bp.json_data_hash for bp in [bpmn_process, *bpmn_subprocesses]}
+                )
+                spiff_bpmn_process_dict.update(cls._get_bpmn_process_dict(bpmn_process, bpmn_process_json_data_mappings))
+                for bpmn_subprocess in bpmn_subprocesses:
+                    spiff_bpmn_process_dict["subprocesses"][bpmn_subprocess.guid] = cls._get_bpmn_process_dict(
+                        bpmn_subprocess, bpmn_process_json_data_mappings
+                    )
+
                 tasks = TaskModel.query.filter(
-                    TaskModel.bpmn_process_id.in_(bpmn_subprocess_id_to_guid_mappings.keys())  # type: ignore
+                    TaskModel.bpmn_process_id.in_([bpmn_process.id, *bpmn_subprocess_id_to_guid_mappings.keys()])  # type: ignore
                 ).all()
+                top_level_tasks = [t for t in tasks if t.bpmn_process_id == bpmn_process.id]
+                subprocess_tasks = [t for t in tasks if t.bpmn_process_id != bpmn_process.id]
+
+                # the tasks of each level are looked at on their own like they were when they were queried separately
+                top_level_task_guids_to_add = cls._task_guids_to_rehydrate(
+                    top_level_tasks, include_task_data_for_completed_tasks=include_task_data_for_completed_tasks
+                )
+                subprocess_task_guids_to_add = cls._task_guids_to_rehydrate(
+                    subprocess_tasks, include_task_data_for_completed_tasks=include_task_data_for_completed_tasks
+                )
+                task_json_data_mappings = JsonDataModel.find_data_dicts_by_hashes(
+                    {
+                        t.json_data_hash
+                        for t in tasks
+                        if t.guid in top_level_task_guids_to_add or t.guid in subprocess_task_guids_to_add
+                    }
+                )
                 cls._get_tasks_dict(
-                    tasks,
+                    top_level_tasks,
+                    spiff_bpmn_process_dict,
+                    task_model_mapping=task_model_mapping,
+                    task_guids_to_add=top_level_task_guids_to_add,
+                    json_data_mappings=task_json_data_mappings,
+                )
+                cls._get_tasks_dict(
+                    subprocess_tasks,
                     spiff_bpmn_process_dict,
-                    bpmn_subprocess_id_to_guid_mappings=bpmn_subprocess_id_to_guid_mappings,
-                    include_task_data_for_completed_tasks=include_task_data_for_completed_tasks,
                     task_model_mapping=task_model_mapping,
+                    task_guids_to_add=subprocess_task_guids_to_add,
+                    json_data_mappings=task_json_data_mappings,
+                    bpmn_subprocess_id_to_guid_mappings=bpmn_subprocess_id_to_guid_mappings,
                 )
 
         return spiff_bpmn_process_dict
@@ -1451,11 +1480,20 @@ class ProcessInstanceProcessor:
         should_schedule_waiting_timer_events: bool = True,
         needs_dequeue: bool = True,
     ) -> TaskRunnability:
-        self._add_bpmn_process_definitions(
-            self.serialize(),
-            bpmn_definition_to_task_definitions_mappings=self.bpmn_definition_to_task_definitions_mappings,
-            process_instance_model=self.process_instance_model,
-        )
+        # definitions only need to be stored once so avoid serializing anything for instances that already have them.
+        # serializing the whole workflow here used to be the most expensive part of each run for large instances.
+        if not self.process_instance_model.spiffworkflow_fully_initialized():
+            self._add_bpmn_process_definitions(
+                self.serialize_bpmn_process_specs(),
+                bpmn_definition_to_task_definitions_mappings=self.bpmn_definition_to_task_definitions_mappings,
+                process_instance_model=self.process_instance_model,
+            )
+        self._script_engine.environment.preserve_state(self.bpmn_process_instance)
+
+        if self.task_data_size_tracker is None:
+            # tasks saved in earlier runs count toward the limit too
+            self.task_data_size_tracker = TaskDataSizeTracker()
+            self.task_data_size_tracker.add_finished_tasks(self.bpmn_process_instance.get_tasks(state=TaskState.FINISHED_MASK))
 
         task_model_delegate = TaskModelSavingDelegate(
             serializer=self._serializer,
@@ -1463,7 +1501,9 @@ class ProcessInstanceProcessor:
             bpmn_definition_to_task_definitions_mappings=self.bpmn_definition_to_task_definitions_mappings,
             bpmn_subprocess_mapping=self.bpmn_subprocess_mapping,
             task_model_mapping=self.task_model_mapping,
+            task_data_size_tracker=self.task_data_size_tracker,
         )
+        task_model_delegate.check_task_data_size()
 
         if execution_strategy is None:
             if execution_strategy_name is None:
@@ -1517,10 +1557,7 @@ class ProcessInstanceProcessor:
 
     def check_task_data_size(self) -> None:
         task_data_len = self.get_task_data_size(self.bpmn_process_instance)
-
-        # Not sure what the number here should be but this now matches the mysql
-        # max_allowed_packet variable on dev - 1073741824
-        task_data_limit = 1024**3
+        task_data_limit = TaskDataSizeTracker.TASK_DATA_SIZE_LIMIT
 
         if task_data_len > task_data_limit:
             raise (
@@ -1530,6 +1567,13 @@ class ProcessInstanceProcessor:
                 )
             )
 
+    def serialize_bpmn_process_specs(self) -> dict:
+        """Serializes only the specs of the workflow since that is all that is needed to store definitions."""
+        return {
+            "spec": self._serializer.to_dict(self.bpmn_process_instance.spec),
+            "subprocess_specs": self._serializer.to_dict(self.bpmn_process_instance.subprocess_specs),
+        }
+
     def serialize(self, serialize_script_engine_state: bool = True) -> dict:
         self.check_task_data_size()
 
@@ -2,11 +2,18 @@ import contextlib
 import time
 from collections.abc import Generator
 
+from flask import current_app
+from sqlalchemy import case
+from sqlalchemy import func
+
+from spiffworkflow_backend.background_processing.background_wakeup_channel import BackgroundWakeupChannel
+from spiffworkflow_backend.exceptions.api_error import ApiError
 from spiffworkflow_backend.models.db import db
 from spiffworkflow_backend.models.process_instance import ProcessInstanceCannotBeRunError
 from spiffworkflow_backend.models.process_instance import ProcessInstanceModel
 from spiffworkflow_backend.models.process_instance_event import ProcessInstanceEventType
 from spiffworkflow_backend.models.process_instance_queue import ProcessInstanceQueueModel
+from spiffworkflow_backend.models.process_instance_queue import ProcessInstanceQueuePriority
 from spiffworkflow_backend.services.error_handling_service import ErrorHandlingService
 from spiffworkflow_backend.services.process_instance_lock_service import ExpectedLockNotFoundError
 from spiffworkflow_backend.services.process_instance_lock_service import ProcessInstanceLockService
@@ -23,22 +30,62 @@ class ProcessInstanceIsAlreadyLockedError(Exception):
 
 
 class ProcessInstanceQueueService:
+    # how many extra entries claim_many ranks so it can skip the ones other claimers are locking at the same time
+    CLAIM_CANDIDATES_FOR_CONCURRENT_CLAIMERS = 50
+
     @classmethod
     def _configure_and_save_queue_entry(
         cls, process_instance: ProcessInstanceModel, queue_entry: ProcessInstanceQueueModel
     ) -> None:
-        queue_entry.priority = 2
+        if queue_entry.priority is None:
+            queue_entry.priority = ProcessInstanceQueuePriority.normal.value
         queue_entry.status = process_instance.status
         queue_entry.locked_by = None
         queue_entry.locked_at_in_seconds = None
 
         db.session.add(queue_entry)
+        BackgroundWakeupChannel.publish_process_instance_queue(queue_entry.status, queue_entry.run_at_in_seconds)
 
     @classmethod
-    def enqueue_new_process_instance(cls, process_instance: ProcessInstanceModel, run_at_in_seconds: int) -> None:
-        queue_entry = ProcessInstanceQueueModel(process_instance=process_instance, run_at_in_seconds=run_at_in_seconds)
+    def enqueue_new_process_instance(
+        cls, process_instance: ProcessInstanceModel, run_at_in_seconds: int, priority: int | None = None
+    ) -> None:
+        if priority is not None:
+            cls.validate_priority(priority)
+        queue_entry = ProcessInstanceQueueModel(
+            process_instance=process_instance, run_at_in_seconds=run_at_in_seconds, priority=priority
+        )
         cls._configure_and_save_queue_entry(process_instance, queue_entry)
 
+    @classmethod
+    def validate_priority(cls, priority: int) -> None:
+        # bools are ints so true would otherwise pass as high priority
+        if isinstance(priority, bool) or priority not in ProcessInstanceQueuePriority.list():
+            raise ApiError(
+                error_code="invalid_queue_priority",
+                message=f"Queue priority must be one of {ProcessInstanceQueuePriority.list()} but was: {priority}",
+                status_code=400,
+            )
+
+    @classmethod
+    def set_priority(cls, process_instance: ProcessInstanceModel, priority: int) -> None:
+        """Changes the priority the process instance is picked up from the queue with. It is kept across enqueues."""
+        cls.validate_priority(priority)
+        updated_count = (
+            db.session.query(ProcessInstanceQueueModel)
+            .filter(
+                ProcessInstanceQueueModel.process_instance_id == process_instance.id,
+            )
+            .update({"priority": priority})
+        )
+        if updated_count == 0:
+            raise ApiError(
+                error_code="process_instance_not_queued",
+                message=f"Process instance {process_instance.id} is not in the queue so its priority cannot be set.",
+                status_code=400,
+            )
+        db.session.commit()
+
     @classmethod
     def _enqueue(cls, process_instance: ProcessInstanceModel) -> None:
         queue_entry_id = ProcessInstanceLockService.unlock(process_instance.id)
@@ -53,6 +100,12 @@ class ProcessInstanceQueueService:
 
     @classmethod
     def _dequeue(cls, process_instance: ProcessInstanceModel) -> None:
+        # claim_many already locked it in the db for us
+        claimed_queue_entry = ProcessInstanceLockService.pop_claim(process_instance.id)
+        if claimed_queue_entry is not None:
+            ProcessInstanceLockService.lock(process_instance.id, claimed_queue_entry)
+            return
+
         locked_by = ProcessInstanceLockService.locked_by()
         current_time = round(time.time())
 
@@ -152,6 +205,114 @@ class ProcessInstanceQueueService:
         else:
             yield
 
+    @classmethod
+    def claim_many(
+        cls,
+        status_value: str,
+        run_at_in_seconds_threshold: int,
+        min_age_in_seconds: int = 0,
+        limit: int = 1,
+        exclude_process_instance_ids: set[int] | None = None,
+        include_process_instance_ids: set[int] | None = None,
+    ) -> list[ProcessInstanceQueueModel]:
+        """Locks up to limit unlocked queue entries with the given status for this locked_by and returns them.
+
+        Entries are picked and returned in the order of queue_entry_ids_in_run_order. The rows are locked in that order
+        with SKIP LOCKED and a LIMIT so concurrent claimers each lock the next entries nobody else has instead of
+        all going for the same ones. The select and update happen in one transaction since mysql cannot update a
+        table from a subquery on itself. The returned entries are owned by this locked_by and dequeued
+        without going back to the db. Call release_claim or release_claims for any that do not end up being dequeued.
+        Keep limit small since nothing else can run a claimed process instance until it is released.
+        Pass include_process_instance_ids to only claim from those process instances.
+        """
+        # rank more candidates than needed since other claimers may be locking some of the top ones right now
+        candidate_queue_entry_ids = [
+            queue_entry_id
+            for queue_entry_id, _process_instance_id in cls.queue_entry_ids_in_run_order(
+                status_value,
+                run_at_in_seconds_threshold,
+                min_age_in_seconds=min_age_in_seconds,
+                limit=limit + cls.CLAIM_CANDIDATES_FOR_CONCURRENT_CLAIMERS,
+                exclude_process_instance_ids=exclude_process_instance_ids,
+                include_process_instance_ids=include_process_instance_ids,
+            )
+        ]
+        queue_entry_ids: list[int] = []
+        if len(candidate_queue_entry_ids) > 0:
+            run_order = {queue_entry_id: index for index, queue_entry_id in enumerate(candidate_queue_entry_ids)}
+            queue_entry_ids = [
+                row[0]
+                for row in db.session.query(ProcessInstanceQueueModel.id)
+                .filter(
+                    ProcessInstanceQueueModel.id.in_(candidate_queue_entry_ids),  # type: ignore
+                    ProcessInstanceQueueModel.locked_by.is_(None),  # type: ignore
+                )
+                .order_by(case(run_order, value=ProcessInstanceQueueModel.id))
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+                .all()
+            ]
+        if len(queue_entry_ids) == 0:
+            db.session.commit()
+            return []
+
+        locked_by = ProcessInstanceLockService.locked_by()
+        db.session.query(ProcessInstanceQueueModel).filter(
+            ProcessInstanceQueueModel.id.in_(queue_entry_ids),  # type: ignore
+            ProcessInstanceQueueModel.locked_by.is_(None),  # type: ignore
+        ).update(
+            {
+                "locked_by": locked_by,
+                "locked_at_in_seconds": round(time.time()),
+            },
+            synchronize_session=False,
+        )
+        db.session.commit()
+
+        # without SKIP LOCKED (sqlite) another claimer could have won some of the rows
+        queue_entries: list[ProcessInstanceQueueModel] = (
+            db.session.query(ProcessInstanceQueueModel)
+            .filter(
+                ProcessInstanceQueueModel.id.in_(queue_entry_ids),  # type: ignore
+                ProcessInstanceQueueModel.locked_by == locked_by,
+            )
+            .populate_existing()
+            .all()
+        )
+        run_order = {queue_entry_id: index for index, queue_entry_id in enumerate(queue_entry_ids)}
+        queue_entries.sort(key=lambda queue_entry: run_order[queue_entry.id])
+        for queue_entry in queue_entries:
+            ProcessInstanceLockService.claim(queue_entry.process_instance_id, queue_entry)
+        return queue_entries
+
+    @classmethod
+    def release_claim(cls, process_instance_id: int) -> None:
+        """Unlocks the queue entry claim_many claimed for the process instance if it was never dequeued."""
+        queue_entry = ProcessInstanceLockService.pop_claim(process_instance_id)
+        if queue_entry is not None:
+            cls._release_queue_entries([queue_entry])
+
+    @classmethod
+    def release_claims(cls) -> None:
+        """Unlocks the queue entries from claim_many that were never dequeued."""
+        cls._release_queue_entries(ProcessInstanceLockService.pop_all_claims())
+
+    @classmethod
+    def _release_queue_entries(cls, queue_entries: list[ProcessInstanceQueueModel]) -> None:
+        if len(queue_entries) == 0:
+            return
+        db.session.query(ProcessInstanceQueueModel).filter(
+            ProcessInstanceQueueModel.id.in_([queue_entry.id for queue_entry in queue_entries]),  # type: ignore
+            ProcessInstanceQueueModel.locked_by == ProcessInstanceLockService.locked_by(),
+        ).update(
+            {
+                "locked_by": None,
+                "locked_at_in_seconds": None,
+            },
+            synchronize_session=False,
+        )
+        db.session.commit()
+
     @classmethod
     def entries_with_status(
         cls,
@@ -172,6 +333,62 @@ class ProcessInstanceQueueService:
             .all()
         )
 
+    @classmethod
+    def queue_entry_ids_in_run_order(
+        cls,
+        status_value: str,
+        run_at_in_seconds_threshold: int,
+        min_age_in_seconds: int = 0,
+        limit: int | None = None,
+        exclude_process_instance_ids: set[int] | None = None,
+        include_process_instance_ids: set[int] | None = None,
+    ) -> list[tuple[int, int]]:
+        """Returns (queue entry id, process instance id) for unlocked entries in the order they should run.
+
+        Entries are ordered by a score in seconds so priority, aging, and fair sharing fit in one ORDER BY:
+          * the score starts at run_at_in_seconds so entries that have been runnable longer go first.
+          * each priority level adds SPIFFWORKFLOW_BACKEND_PROCESS_INSTANCE_QUEUE_PRIORITY_AGING_IN_SECONDS so an entry
+            that has been waiting that much longer ranks with entries of the next better priority.
+          * the nth waiting entry of a process model adds n * SPIFFWORKFLOW_BACKEND_PROCESS_INSTANCE_QUEUE_FAIR_SHARE_IN_SECONDS
+            times its priority so a process model with many entries takes turns with the others instead of drowning
+            them out, and higher priority entries get more turns.
+        """
+        aging_in_seconds = max(
+            int(current_app.config["SPIFFWORKFLOW_BACKEND_PROCESS_INSTANCE_QUEUE_PRIORITY_AGING_IN_SECONDS"]), 1
+        )
+        fair_share_in_seconds = int(current_app.config["SPIFFWORKFLOW_BACKEND_PROCESS_INSTANCE_QUEUE_FAIR_SHARE_IN_SECONDS"])
+        priority = func.coalesce(ProcessInstanceQueueModel.priority, ProcessInstanceQueuePriority.normal.value)
+        priority_score = priority * aging_in_seconds + ProcessInstanceQueueModel.run_at_in_seconds
+        position_in_process_model = func.row_number().over(
+            partition_by=ProcessInstanceModel.process_model_identifier,
+            order_by=(priority_score, ProcessInstanceQueueModel.id),
+        )
+        query = (
+            db.session.query(
+                ProcessInstanceQueueModel.id.label("queue_entry_id"),
+                ProcessInstanceQueueModel.process_instance_id.label("process_instance_id"),
+                (priority_score + (position_in_process_model - 1) * priority * fair_share_in_seconds).label("score"),
+            )
+            .join(ProcessInstanceModel, ProcessInstanceModel.id == ProcessInstanceQueueModel.process_instance_id)
+            .filter(
+                ProcessInstanceQueueModel.status == status_value,
+                ProcessInstanceQueueModel.updated_at_in_seconds <= round(time.time()) - min_age_in_seconds,
+                ProcessInstanceQueueModel.locked_by.is_(None),  # type: ignore
+                ProcessInstanceQueueModel.run_at_in_seconds <= run_at_in_seconds_threshold,
+            )
+        )
+        if exclude_process_instance_ids:
+            query = query.filter(ProcessInstanceQueueModel.process_instance_id.not_in(exclude_process_instance_ids))  # type: ignore
+        if include_process_instance_ids is not None:
+            query = query.filter(ProcessInstanceQueueModel.process_instance_id.in_(include_process_instance_ids))  # type: ignore
+        scored_entries = query.subquery()
+        ordered_query = db.session.query(scored_entries.c.queue_entry_id, scored_entries.c.process_instance_id).order_by(
+            scored_entries.c.score, scored_entries.c.queue_entry_id
+        )
+        if limit is not None:
+            ordered_query = ordered_query.limit(limit)
+        return [(row[0], row[1]) for row in ordered_query.all()]
+
     @classmethod
     def peek_many(
         cls,
@@ -179,6 +396,10 @@ class ProcessInstanceQueueService:
         run_at_in_seconds_threshold: int,
         min_age_in_seconds: int = 0,
     ) -> list[int]:
-        queue_entries = cls.entries_with_status(status_value, None, run_at_in_seconds_threshold, min_age_in_seconds)
-        ids_with_status = [entry.process_instance_id for entry in queue_entries]
-        return ids_with_status
+        """Returns the ids of unlocked process instances with the given status in the order they should run."""
+        return [
+            process_instance_id
+            for _queue_entry_id, process_instance_id in cls.queue_entry_ids_in_run_order(
+                status_value, run_at_in_seconds_threshold, min_age_in_seconds=min_age_in_seconds
+            )
+        ]
@@ -84,6 +84,8 @@ FileDataGenerator = Generator[tuple[dict | list, str | int, str], None, None]
 class ProcessInstanceService:
     FILE_DATA_DIGEST_PREFIX = "spifffiledatadigest+"
     TASK_STATE_LOCKED = "locked"
+    # to avoid conflicts with the interstitial page, we wait 60 seconds before processing in the background
+    WAITING_MIN_AGE_IN_SECONDS = 60
 
     @staticmethod
     def user_has_started_instance(process_model_identifier: str) -> bool:
@@ -157,7 +159,9 @@ class ProcessInstanceService:
             start_configuration = cls.next_start_event_configuration(process_instance_model)
         _, delay_in_seconds, _ = start_configuration
         run_at_in_seconds = round(time.time()) + delay_in_seconds
-        ProcessInstanceQueueService.enqueue_new_process_instance(process_instance_model, run_at_in_seconds)
+        ProcessInstanceQueueService.enqueue_new_process_instance(
+            process_instance_model, run_at_in_seconds, priority=process_model.queue_priority
+        )
         return (process_instance_model, start_configuration)
 
     @classmethod
@@ -485,36 +489,78 @@ class ProcessInstanceService:
     @classmethod
     def do_waiting(cls, status_value: str) -> None:
         run_at_in_seconds_threshold = round(time.time())
-        min_age_in_seconds = 60  # to avoid conflicts with the interstitial page, we wait 60 seconds before processing
-        process_instance_ids_to_check = ProcessInstanceQueueService.peek_many(
-            status_value, run_at_in_seconds_threshold, min_age_in_seconds
-        )
-        if len(process_instance_ids_to_check) == 0:
+        min_age_in_seconds = cls.WAITING_MIN_AGE_IN_SECONDS
+        execution_strategy_name = current_app.config["SPIFFWORKFLOW_BACKEND_ENGINE_STEP_DEFAULT_STRATEGY_BACKGROUND"]
+
+        if current_app.config["SPIFFWORKFLOW_BACKEND_CELERY_ENABLED"]:
+            # celery workers lock the process instances themselves so only hand them off from here
+            process_instance_ids_to_check = ProcessInstanceQueueService.peek_many(
+                status_value, run_at_in_seconds_threshold, min_age_in_seconds
+            )
+            if len(process_instance_ids_to_check) == 0:
+                return
+            for process_instance in cls.process_instances_with_ids(process_instance_ids_to_check):
+                cls.run_waiting_process_instance(process_instance, status_value, execution_strategy_name)
             return
 
-        records = (
+        batch_size = current_app.config["SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_DEQUEUE_BATCH_SIZE"]
+        checked_process_instance_ids: set[int] = set()
+        while True:
+            queue_entries = ProcessInstanceQueueService.claim_many(
+                status_value,
+                run_at_in_seconds_threshold,
+                min_age_in_seconds,
+                limit=batch_size,
+                exclude_process_instance_ids=checked_process_instance_ids,
+            )
+            if len(queue_entries) == 0:
+                return
+            try:
+                process_instance_ids = [queue_entry.process_instance_id for queue_entry in queue_entries]
+                checked_process_instance_ids.update(process_instance_ids)
+                for process_instance in cls.process_instances_with_ids(process_instance_ids):
+                    try:
+                        cls.run_waiting_process_instance(process_instance, status_value, execution_strategy_name)
+                    finally:
+                        # do not keep it locked while the rest of the batch runs
+                        ProcessInstanceQueueService.release_claim(process_instance.id)
+            finally:
+                ProcessInstanceQueueService.release_claims()
+            if len(queue_entries) < batch_size:
+                return
+
+    @classmethod
+    def process_instances_with_ids(cls, process_instance_ids: list[int]) -> list[ProcessInstanceModel]:
+        process_instances: list[ProcessInstanceModel] = (
             db.session.query(ProcessInstanceModel)
-            .filter(ProcessInstanceModel.id.in_(process_instance_ids_to_check))  # type: ignore
+            .filter(ProcessInstanceModel.id.in_(process_instance_ids))  # type: ignore
             .all()
         )
-        execution_strategy_name = current_app.config["SPIFFWORKFLOW_BACKEND_ENGINE_STEP_DEFAULT_STRATEGY_BACKGROUND"]
-        for process_instance in records:
-            current_app.logger.info(f"Processor {status_value}: Processing process_instance {process_instance.id}")
-            try:
-                if not queue_process_instance_if_appropriate(process_instance):
-                    cls.run_process_instance_with_processor(
-                        process_instance, status_value=status_value, execution_strategy_name=execution_strategy_name
-                    )
-            except ProcessInstanceIsAlreadyLockedError:
-                # we will try again later
-                continue
-            except Exception as exception:
-                db.session.rollback()  # in case the above left the database with a bad transaction
-                new_exception = Exception(
-                    f"Error running {status_value} task for process_instance {process_instance.id}"
-                    + f"({process_instance.process_model_identifier}). {exception.__class__.__name__}: {str(exception)}"
+        # keep the order the queue picked them in
+        run_order = {process_instance_id: index for index, process_instance_id in enumerate(process_instance_ids)}
+        process_instances.sort(key=lambda process_instance: run_order[process_instance.id])
+        return process_instances
+
+    @classmethod
+    def run_waiting_process_instance(
+        cls, process_instance: ProcessInstanceModel, status_value: str, execution_strategy_name: str
+    ) -> None:
+        current_app.logger.info(f"Processor {status_value}: Processing process_instance {process_instance.id}")
+        try:
+            if not queue_process_instance_if_appropriate(process_instance):
+                cls.run_process_instance_with_processor(
+                    process_instance, status_value=status_value, execution_strategy_name=execution_strategy_name
                 )
-                current_app.logger.exception(new_exception, stack_info=True)
+        except ProcessInstanceIsAlreadyLockedError:
+            # we will try again later
+            return
+        except Exception as exception:
+            db.session.rollback()  # in case the above left the database with a bad transaction
+            new_exception = Exception(
+                f"Error running {status_value} task for process_instance {process_instance.id}"
+                + f"({process_instance.process_model_identifier}). {exception.__class__.__name__}: {str(exception)}"
+            )
+            current_app.logger.exception(new_exception, stack_info=True)
 
     @classmethod
     def run_process_instance_with_processor(
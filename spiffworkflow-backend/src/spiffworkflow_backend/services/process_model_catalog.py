@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from json import JSONDecodeError
+from typing import Any
+
+from spiffworkflow_backend.exceptions.api_error import ApiError
+
+PROCESS_GROUP_JSON_FILE = "process_group.json"
+PROCESS_MODEL_JSON_FILE = "process_model.json"
+
+StatSignature = tuple[int, int, int] | None
+
+
+class ProcessModelCatalog:
+    """An in memory index of the process groups and process models under a directory.
+
+    Building it walks the directory once and reads every process_group.json and process_model.json file.
+    After that it is reused until one of the directories or json files it read has a different stat.
+    Adding or removing anything in a directory changes the mtime of that directory so checking a catalog
+    only costs one stat per directory and json file instead of walking and reading everything again.
+    """
+
+    def __init__(self, root_path: str) -> None:
+        self.root_path = root_path
+        # json file path => contents of the json file
+        self.json_data: dict[str, dict[str, Any]] = {}
+        # directory path => names of the directories in it
+        self.subdirectories: dict[str, list[str]] = {}
+        # every process_model.json file in walk order
+        self.process_model_json_paths: list[str] = []
+        # directory or json file path => stat signature of it when the catalog was built
+        self.stat_signatures: dict[str, StatSignature] = {}
+        self.verified_at = 0.0
+
+    @classmethod
+    def build(cls, root_path: str) -> ProcessModelCatalog:
+        catalog = cls(root_path)
+        # the root may not exist yet so remember that too
+        catalog.stat_signatures[root_path] = cls.stat_signature(root_path)
+        for directory, subdirectories, file_names in os.walk(root_path):
+            subdirectories[:] = [subdirectory for subdirectory in subdirectories if subdirectory != ".git"]
+            catalog.stat_signatures[directory] = cls.stat_signature(directory)
+            catalog.subdirectories[directory] = sorted(subdirectories)
+            for file_name in file_names:
+                if file_name not in [PROCESS_GROUP_JSON_FILE, PROCESS_MODEL_JSON_FILE]:
+                    continue
+                json_file_path = os.path.join(directory, file_name)
+                # stat before reading so a file that changes while it is read makes the catalog stale
+                catalog.stat_signatures[json_file_path] = cls.stat_signature(json_file_path)
+                catalog.json_data[json_file_path] = cls.read_json_file(json_file_path)
+                if file_name == PROCESS_MODEL_JSON_FILE:
+                    catalog.process_model_json_paths.append(json_file_path)
+        catalog.verified_at = time.time()
+        return catalog
+
+    @classmethod
+    def stat_signature(cls, path: str) -> StatSignature:
+        try:
+            stat_result = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size)
+
+    @classmethod
+    def read_json_file(cls, json_file_path: str) -> dict[str, Any]:
+        with open(json_file_path) as f:
+            try:
+                data: dict[str, Any] = json.load(f)
+            except JSONDecodeError as jde:
+                raise ApiError(
+                    error_code="process_model_json_file_corrupted",
+                    message=f"The process_model json file {json_file_path} is corrupted.",
+                ) from jde
+        return data
+
+    def is_current(self, revalidate_after_seconds: float = 0) -> bool:
+        if revalidate_after_seconds > 0 and time.time() - self.verified_at < revalidate_after_seconds:
+            return True
+        for path, stat_signature in self.stat_signatures.items():
+            if self.stat_signature(path) != stat_signature:
+                return False
+        self.verified_at = time.time()
+        return True
+
+    def process_model_json_paths_in(self, directory: str, recursive: bool) -> list[str]:
+        """Mirrors the walk ProcessModelService.get_process_models used to do.
+
+        Without recursive that walk only looked in the directory itself and in the directories directly under it.
+        """
+        directory = os.path.abspath(directory)
+        json_paths = []
+        for json_file_path in self.process_model_json_paths:
+            model_directory = os.path.dirname(json_file_path)
+            if model_directory == directory or os.path.dirname(model_directory) == directory:
+                json_paths.append(json_file_path)
+            elif recursive and model_directory.startswith(f"{directory}{os.sep}"):
+                json_paths.append(json_file_path)
+        return json_paths
+
+    def process_group_json_data(self, directory: str) -> dict[str, Any] | None:
+        return self.json_data.get(os.path.join(directory, PROCESS_GROUP_JSON_FILE))
+
+    def process_model_json_data(self, directory: str) -> dict[str, Any] | None:
+        return self.json_data.get(os.path.join(directory, PROCESS_MODEL_JSON_FILE))
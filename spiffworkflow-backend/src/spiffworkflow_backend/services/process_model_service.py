@@ -28,6 +28,8 @@ from spiffworkflow_backend.models.task import TaskModel  # noqa: F401
 from spiffworkflow_backend.models.user import UserModel
 from spiffworkflow_backend.services.authorization_service import AuthorizationService
 from spiffworkflow_backend.services.file_system_service import FileSystemService
+from spiffworkflow_backend.services.permission_matcher import PermissionAssignmentMatcher
+from spiffworkflow_backend.services.process_model_catalog import ProcessModelCatalog
 from spiffworkflow_backend.services.user_service import UserService
 
 T = TypeVar("T")
@@ -47,6 +49,27 @@ class ProcessModelService(FileSystemService):
     GROUP_SCHEMA = ProcessGroupSchema()
     PROCESS_MODEL_SCHEMA = ProcessModelInfoSchema()
 
+    # metadata is extracted after every completed task so keep the extraction paths of each process model around.
+    # process_model_json_file_path => (stat signature of the file, [(metadata key, path split into segments)])
+    METADATA_EXTRACTION_PATHS_CACHE: dict[str, tuple[tuple[int, int, int], list[tuple[str, list[str]]]]] = {}
+
+    # root path => catalog of the process groups and models in it. used to list them without reading every json file.
+    PROCESS_MODEL_CATALOGS: dict[str, ProcessModelCatalog] = {}
+
+    @classmethod
+    def process_model_catalog(cls) -> ProcessModelCatalog:
+        root_path = FileSystemService.root_path()
+        catalog = cls.PROCESS_MODEL_CATALOGS.get(root_path)
+        revalidate_after_seconds = current_app.config["SPIFFWORKFLOW_BACKEND_PROCESS_MODEL_CATALOG_REVALIDATE_AFTER_SECONDS"]
+        if catalog is None or not catalog.is_current(revalidate_after_seconds=float(revalidate_after_seconds)):
+            catalog = ProcessModelCatalog.build(root_path)
+            cls.PROCESS_MODEL_CATALOGS[root_path] = catalog
+        return catalog
+
+    @classmethod
+    def clear_process_model_catalog(cls) -> None:
+        cls.PROCESS_MODEL_CATALOGS.clear()
+
     @classmethod
     def path_to_id(cls, path: str) -> str:
         """Replace the os path separator for the standard id separator."""
@@ -145,18 +168,45 @@ class ProcessModelService(FileSystemService):
         #   metadata_extraction_process_model_version
         #     process_model_version_id
         #     metadata_extraction_id
-        process_model_info = cls.get_process_model(process_model_identifier)
-        metadata_extraction_paths = process_model_info.metadata_extraction_paths
-        if metadata_extraction_paths is None:
-            return {}
-        if len(metadata_extraction_paths) <= 0:
-            return {}
+        metadata_extraction_paths = cls.metadata_extraction_paths_for_process_model(process_model_identifier)
+        return cls.extract_metadata_from_paths(metadata_extraction_paths, current_data)
+
+    @classmethod
+    def metadata_extraction_paths_for_process_model(cls, process_model_identifier: str) -> list[tuple[str, list[str]]]:
+        """Returns the metadata extraction paths of a process model with each path already split into its segments.
 
+        These are cached per process_model.json file and only read again if a stat of the file shows it changed.
+        """
+        json_file_path = os.path.abspath(
+            os.path.join(FileSystemService.root_path(), process_model_identifier, cls.PROCESS_MODEL_JSON_FILE)
+        )
+        file_signature = None
+        try:
+            stat_result = os.stat(json_file_path)
+            file_signature = (stat_result.st_mtime_ns, stat_result.st_ino, stat_result.st_size)
+        except OSError:
+            pass
+
+        if file_signature is not None:
+            cached_paths = cls.METADATA_EXTRACTION_PATHS_CACHE.get(json_file_path)
+            if cached_paths is not None and cached_paths[0] == file_signature:
+                return cached_paths[1]
+
+        process_model_info = cls.get_process_model(process_model_identifier)
+        metadata_extraction_paths = [
+            (metadata_extraction_path["key"], metadata_extraction_path["path"].split("."))
+            for metadata_extraction_path in process_model_info.metadata_extraction_paths or []
+        ]
+        if file_signature is not None:
+            cls.METADATA_EXTRACTION_PATHS_CACHE[json_file_path] = (file_signature, metadata_extraction_paths)
+        return metadata_extraction_paths
+
+    @classmethod
+    def extract_metadata_from_paths(
+        cls, metadata_extraction_paths: list[tuple[str, list[str]]], current_data: dict[str, Any]
+    ) -> dict[str, Any]:
         current_metadata = {}
-        for metadata_extraction_path in metadata_extraction_paths:
-            key = metadata_extraction_path["key"]
-            path = metadata_extraction_path["path"]
-            path_segments = path.split(".")
+        for key, path_segments in metadata_extraction_paths:
             data_for_key: dict[str, Any] | None = current_data
             for path_segment in path_segments:
                 if path_segment in (data_for_key or {}):
@@ -172,11 +222,13 @@ class ProcessModelService(FileSystemService):
         process_model_path = os.path.abspath(os.path.join(FileSystemService.root_path(), process_model.id_for_file_path()))
         os.makedirs(process_model_path, exist_ok=True)
         json_path = os.path.abspath(os.path.join(process_model_path, cls.PROCESS_MODEL_JSON_FILE))
+        cls.METADATA_EXTRACTION_PATHS_CACHE.pop(json_path, None)
         json_data = cls.PROCESS_MODEL_SCHEMA.dump(process_model)
         for key in list(json_data.keys()):
             if key not in PROCESS_MODEL_SUPPORTED_KEYS_FOR_DISK_SERIALIZATION:
                 del json_data[key]
         cls.write_json_file(json_path, json_data)
+        cls.clear_process_model_catalog()
 
     @classmethod
     def process_model_delete(cls, process_model_id: str) -> None:
@@ -188,6 +240,7 @@ class ProcessModelService(FileSystemService):
         process_model = cls.get_process_model(process_model_id)
         path = cls.process_model_full_path(process_model)
         shutil.rmtree(path)
+        cls.clear_process_model_catalog()
 
     @classmethod
     def process_model_move(cls, original_process_model_id: str, new_location: str) -> ProcessModelInfo:
@@ -197,6 +250,7 @@ class ProcessModelService(FileSystemService):
         new_relative_path = os.path.join(new_location, model_id)
         new_model_path = os.path.abspath(os.path.join(FileSystemService.root_path(), new_relative_path))
         shutil.move(original_model_path, new_model_path)
+        cls.clear_process_model_catalog()
         new_process_model = cls.get_process_model(new_relative_path)
         return new_process_model
 
@@ -248,14 +302,11 @@ class ProcessModelService(FileSystemService):
         if recursive is None:
             recursive = False
 
-        process_model_files = FileSystemService.walk_files(
-            root_path,
-            FileSystemService.standard_directory_predicate(recursive),
-            FileSystemService.is_process_model_json_file,
-        )
-
-        for file in process_model_files:
-            process_model = cls.get_process_model_from_path(file)
+        catalog = cls.process_model_catalog()
+        for json_file_path in catalog.process_model_json_paths_in(root_path, recursive):
+            process_model = cls.__process_model_from_json_data(
+                os.path.dirname(json_file_path), copy.deepcopy(catalog.json_data[json_file_path])
+            )
 
             if include_files:
                 process_model.files = cls.get_process_model_files(process_model)
@@ -309,12 +360,13 @@ class ProcessModelService(FileSystemService):
         if filter_runnable_by_user:
             process_models = cls.filter_by_runnable(process_models, reference_cache_processes)
 
+        permitted_process_model_identifier_set = set(permitted_process_model_identifiers)
         permitted_process_models = []
         for process_model in process_models:
             process_model_identifier = process_model.id
             if filter_runnable_as_extension:
                 process_model_identifier = process_model.id.replace(f"{extension_prefix}/", "")
-            if process_model_identifier in permitted_process_model_identifiers:
+            if process_model_identifier in permitted_process_model_identifier_set:
                 permitted_process_models.append(process_model)
 
         return permitted_process_models
@@ -323,9 +375,10 @@ class ProcessModelService(FileSystemService):
     def embellish_with_is_executable_property(
         cls, process_models: list[ProcessModelInfo], reference_cache_processes: list[ReferenceCacheModel]
     ) -> list[ProcessModelInfo]:
+        reference_cache_processes_by_location = cls.reference_cache_processes_by_location(reference_cache_processes)
         for process_model in process_models:
-            matching_reference_cache_process = cls.find_reference_cache_process_for_process_model(
-                reference_cache_processes, process_model
+            matching_reference_cache_process = reference_cache_processes_by_location.get(
+                (process_model.id, process_model.primary_process_id, process_model.primary_file_name)
             )
             if (
                 matching_reference_cache_process
@@ -355,17 +408,20 @@ class ProcessModelService(FileSystemService):
         return runnable_process_models
 
     @classmethod
-    def find_reference_cache_process_for_process_model(
-        cls, reference_cache_processes: list[ReferenceCacheModel], process_model: ProcessModelInfo
-    ) -> ReferenceCacheModel | None:
+    def reference_cache_processes_by_location(
+        cls, reference_cache_processes: list[ReferenceCacheModel]
+    ) -> dict[tuple[str, str, str], ReferenceCacheModel]:
+        """Keys the processes by (relative_location, identifier, file_name) to look them up for each process model."""
+        reference_cache_processes_by_location: dict[tuple[str, str, str], ReferenceCacheModel] = {}
         for reference_cache_process in reference_cache_processes:
-            if (
-                reference_cache_process.identifier == process_model.primary_process_id
-                and reference_cache_process.file_name == process_model.primary_file_name
-                and reference_cache_process.relative_location == process_model.id
-            ):
-                return reference_cache_process
-        return None
+            location = (
+                reference_cache_process.relative_location,
+                reference_cache_process.identifier,
+                reference_cache_process.file_name,
+            )
+            # the first match wins like it did when this was a search through the list
+            reference_cache_processes_by_location.setdefault(location, reference_cache_process)
+        return reference_cache_processes_by_location
 
     @classmethod
     def process_model_identifiers_with_permission_for_user(
@@ -383,14 +439,14 @@ class ProcessModelService(FileSystemService):
         if has_permission:
             return process_model_identifiers
 
-        permission_assignments = AuthorizationService.all_permission_assignments_for_user(user=user)
+        permission_assignment_matcher = AuthorizationService.permission_assignment_matcher_for_user(user=user)
 
         permitted_process_model_identifiers = []
         for process_model_identifier in process_model_identifiers:
             modified_process_model_id = ProcessModelInfo.modify_process_identifier_for_path_param(process_model_identifier)
             uri = f"{permission_base_uri}/{modified_process_model_id}"
-            has_permission = AuthorizationService.permission_assignments_include(
-                permission_assignments=permission_assignments,
+            has_permission = AuthorizationService.permission_assignment_matcher_includes(
+                permission_assignment_matcher=permission_assignment_matcher,
                 permission=permission_to_check,
                 target_uri=uri,
             )
@@ -495,35 +551,32 @@ class ProcessModelService(FileSystemService):
 
     @classmethod
     def get_process_groups_user_has_permissions_to(
-        cls, process_groups: list[ProcessGroup], permission_assignments: list, permission_to_check: str, permission_base_uri: str
+        cls,
+        process_groups: list[ProcessGroup],
+        permission_assignment_matcher: PermissionAssignmentMatcher,
+        permission_to_check: str,
+        permission_base_uri: str,
     ) -> list[ProcessGroup]:
         new_process_group_list = []
         denied_parent_ids: set[str] = set()
         for process_group in process_groups:
             modified_process_group_id = ProcessModelInfo.modify_process_identifier_for_path_param(process_group.id)
             target_uri = f"{permission_base_uri}/{modified_process_group_id}"
-            has_permission = AuthorizationService.permission_assignments_include(
-                permission_assignments=permission_assignments,
+            has_permission = AuthorizationService.permission_assignment_matcher_includes(
+                permission_assignment_matcher=permission_assignment_matcher,
                 permission=permission_to_check,
                 target_uri=target_uri,
             )
             if not has_permission:
-                for pa in permission_assignments:
-                    if (
-                        pa.permission == permission_to_check
-                        and pa.grant_type == PermitDeny.deny.value
-                        and AuthorizationService.target_uri_matches_actual_uri(pa.permission_target.uri, target_uri)
-                    ):
-                        denied_parent_ids.add(f"{process_group.id}")
-                    elif (
-                        pa.permission == permission_to_check
-                        and pa.grant_type == PermitDeny.permit.value
-                        and (
-                            pa.permission_target.uri.startswith(f"{target_uri}:")
-                            or pa.permission_target.uri.startswith(f"/process-models/{modified_process_group_id}:")
-                        )
-                    ):
-                        has_permission = True
+                if PermitDeny.deny.value in permission_assignment_matcher.grant_types_for(permission_to_check, target_uri):
+                    denied_parent_ids.add(f"{process_group.id}")
+                # permission to something inside the group means the group has to be listed to get to it
+                if permission_assignment_matcher.has_target_starting_with(
+                    permission_to_check, PermitDeny.permit.value, f"{target_uri}:"
+                ) or permission_assignment_matcher.has_target_starting_with(
+                    permission_to_check, PermitDeny.permit.value, f"/process-models/{modified_process_group_id}:"
+                ):
+                    has_permission = True
             if has_permission:
                 new_process_group_list.append(process_group)
 
@@ -538,7 +591,7 @@ class ProcessModelService(FileSystemService):
                 permitted_process_groups.append(process_group)
                 permitted_subgroups = cls.get_process_groups_user_has_permissions_to(
                     process_groups=process_group.process_groups,
-                    permission_assignments=permission_assignments,
+                    permission_assignment_matcher=permission_assignment_matcher,
                     permission_to_check=permission_to_check,
                     permission_base_uri=permission_base_uri,
                 )
@@ -571,11 +624,11 @@ class ProcessModelService(FileSystemService):
         if has_permission_to_all_groups:
             return process_groups
 
-        permission_assignments = AuthorizationService.all_permission_assignments_for_user(user=user)
+        permission_assignment_matcher = AuthorizationService.permission_assignment_matcher_for_user(user=user)
 
         permitted_process_groups = cls.get_process_groups_user_has_permissions_to(
             process_groups=process_groups,
-            permission_assignments=permission_assignments,
+            permission_assignment_matcher=permission_assignment_matcher,
             permission_to_check=permission_to_check,
             permission_base_uri=permission_base_uri,
         )
@@ -616,6 +669,7 @@ class ProcessModelService(FileSystemService):
             if key not in PROCESS_GROUP_SUPPORTED_KEYS_FOR_DISK_SERIALIZATION:
                 del serialized_process_group[key]
         cls.write_json_file(json_path, serialized_process_group)
+        cls.clear_process_model_catalog()
         return process_group
 
     @classmethod
@@ -625,6 +679,7 @@ class ProcessModelService(FileSystemService):
         new_root = os.path.join(FileSystemService.root_path(), new_location)
         new_group_path = os.path.abspath(os.path.join(FileSystemService.root_path(), new_root, original_group_id))
         destination = shutil.move(original_group_path, new_group_path)
+        cls.clear_process_model_catalog()
         new_process_group = cls.get_process_group(destination)
         return new_process_group
 
@@ -658,6 +713,7 @@ class ProcessModelService(FileSystemService):
                     f" {problem_models}"
                 )
             shutil.rmtree(path)
+            cls.clear_process_model_catalog()
 
     @classmethod
     def __scan_process_groups(cls, process_group_id: str | None = None) -> list[ProcessGroup]:
@@ -668,6 +724,16 @@ class ProcessModelService(FileSystemService):
         else:
             scan_path = FileSystemService.root_path()
 
+        catalog = cls.process_model_catalog()
+        scan_path = os.path.abspath(scan_path)
+        if scan_path in catalog.subdirectories:
+            process_groups = []
+            for directory_name in catalog.subdirectories[scan_path]:
+                directory_path = os.path.join(scan_path, directory_name)
+                if catalog.process_group_json_data(directory_path) is not None:
+                    process_groups.append(cls.__process_group_from_catalog(catalog, directory_path))
+            return process_groups
+
         with os.scandir(scan_path) as directory_items:
             process_groups = []
             for item in directory_items:
@@ -677,6 +743,33 @@ class ProcessModelService(FileSystemService):
                     process_groups.append(scanned_process_group)
             return process_groups
 
+    @classmethod
+    def __process_group_from_catalog(cls, catalog: ProcessModelCatalog, dir_path: str) -> ProcessGroup:
+        """Builds the same process group find_or_create_process_group would for an existing group."""
+        data = copy.deepcopy(catalog.process_group_json_data(dir_path)) or {}
+        relative_path = os.path.relpath(dir_path, FileSystemService.root_path())
+        data["id"] = cls.path_to_id(relative_path)
+        process_group = ProcessGroup(**cls.restrict_dict(data))
+        process_group.process_models = []
+        process_group.process_groups = []
+
+        for directory_name in catalog.subdirectories.get(dir_path, []):
+            nested_path = os.path.join(dir_path, directory_name)
+            if nested_path not in catalog.subdirectories:
+                # the walk does not follow symlinks so read those from disk
+                if cls.is_process_group(nested_path):
+                    process_group.process_groups.append(cls.find_or_create_process_group(nested_path))
+                elif cls.is_process_model(nested_path):
+                    process_group.process_models.append(cls.__scan_process_model(nested_path, directory_name))
+            elif catalog.process_group_json_data(nested_path) is not None:
+                process_group.process_groups.append(cls.__process_group_from_catalog(catalog, nested_path))
+            elif (process_model_data := catalog.process_model_json_data(nested_path)) is not None:
+                process_model = cls.__process_model_from_json_data(nested_path, copy.deepcopy(process_model_data))
+                process_group.process_models.append(process_model)
+        process_group.process_models.sort()
+        process_group.process_groups.sort()
+        return process_group
+
     @classmethod
     def restrict_dict(cls, data: dict[str, Any]) -> dict[str, Any]:
         allowed_keys = ProcessGroup.get_valid_properties()
@@ -761,17 +854,7 @@ class ProcessModelService(FileSystemService):
                         error_code="process_model_json_file_corrupted",
                         message=f"The process_model json file {json_file_path} is corrupted.",
                     ) from jde
-                if "process_group_id" in data:
-                    data.pop("process_group_id")
-                # we don't save `id` in the json file, so we add it back in here.
-                relative_path = os.path.relpath(path, FileSystemService.root_path())
-                data["id"] = cls.path_to_id(relative_path)
-                process_model_info = ProcessModelInfo(**data)
-                if process_model_info is None:
-                    raise ApiError(
-                        error_code="process_model_could_not_be_loaded_from_disk",
-                        message=f"We could not load the process_model from disk with data: {data}",
-                    )
+                process_model_info = cls.__process_model_from_json_data(path, data)
         else:
             if name is None:
                 raise ApiError(
@@ -788,3 +871,18 @@ class ProcessModelService(FileSystemService):
             # we don't store `id` in the json files, so we add it in here
             process_model_info.id = name
         return process_model_info
+
+    @classmethod
+    def __process_model_from_json_data(cls, path: str, data: dict[str, Any]) -> ProcessModelInfo:
+        if "process_group_id" in data:
+            data.pop("process_group_id")
+        # we don't save `id` in the json file, so we add it back in here.
+        relative_path = os.path.relpath(path, FileSystemService.root_path())
+        data["id"] = cls.path_to_id(relative_path)
+        process_model_info = ProcessModelInfo(**data)
+        if process_model_info is None:
+            raise ApiError(
+                error_code="process_model_could_not_be_loaded_from_disk",
+                message=f"We could not load the process_model from disk with data: {data}",
+            )
+        return process_model_info
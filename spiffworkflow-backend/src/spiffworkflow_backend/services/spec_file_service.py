@@ -1,14 +1,18 @@
 from __future__ import annotations
 
+import copy
 import os
 import shutil
 from datetime import datetime
+from hashlib import sha256
 from typing import TYPE_CHECKING
 
+from flask import current_app
 from lxml import etree  # type: ignore
 from SpiffWorkflow.bpmn.parser.BpmnParser import BpmnValidator  # type: ignore
 
 from spiffworkflow_backend.exceptions.error import NotAuthorizedError
+from spiffworkflow_backend.helpers.lru_cache import LRUCache
 from spiffworkflow_backend.models.db import db
 from spiffworkflow_backend.models.file import File
 from spiffworkflow_backend.models.file import FileType
@@ -35,6 +39,12 @@ class SpecFileService(FileSystemService):
      The files are stored in a directory whose path is determined by the category and spec names.
     """
 
+    # keyed by file path, process model id, and primary process id since those are used to build the references.
+    # each entry keeps the stat and content hash of the file it was parsed from so changed files get parsed again.
+    REFERENCES_CACHE: LRUCache[tuple[str, str, str | None], tuple[tuple[int, int, int], str, list[Reference]]] = LRUCache(
+        "spec_file_references"
+    )
+
     @staticmethod
     def reference_map(references: list[Reference]) -> dict[str, Reference]:
         """Creates a dict with provided references organized by id."""
@@ -56,9 +66,58 @@ class SpecFileService(FileSystemService):
     @classmethod
     def get_references_for_file(cls, file: File, process_model_info: ProcessModelInfo) -> list[Reference]:
         full_file_path = cls.full_file_path(process_model_info, file.name)
+        # stat before reading so a file that changes while it is read is never cached as unchanged
+        file_fingerprint = cls.file_fingerprint(full_file_path)
+        references = cls.get_cached_references_for_file(full_file_path, process_model_info, file_fingerprint)
+        if references is not None:
+            return references
+
         with open(full_file_path, "rb") as f:
             file_contents = f.read()
-        return cls.get_references_for_file_contents(process_model_info, file.name, file_contents)
+        references = cls.get_references_for_file_contents(process_model_info, file.name, file_contents)
+        cls.set_cached_references_for_file(
+            full_file_path, process_model_info, file_fingerprint, sha256(file_contents).hexdigest(), references
+        )
+        return references
+
+    @classmethod
+    def file_fingerprint(cls, full_file_path: str) -> tuple[int, int, int]:
+        stat_result = os.stat(full_file_path)
+        return (stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size)
+
+    @classmethod
+    def get_cached_references_for_file(
+        cls, full_file_path: str, process_model_info: ProcessModelInfo, file_fingerprint: tuple[int, int, int]
+    ) -> list[Reference] | None:
+        def file_is_unchanged(cached: tuple[tuple[int, int, int], str, list[Reference]]) -> bool:
+            if cached[0] == file_fingerprint:
+                return True
+            # files are often rewritten with the same contents, for example by a git pull or checkout
+            with open(full_file_path, "rb") as f:
+                return sha256(f.read()).hexdigest() == cached[1]
+
+        cache_key = (full_file_path, process_model_info.id, process_model_info.primary_process_id)
+        cls.REFERENCES_CACHE.resize(current_app.config["SPIFFWORKFLOW_BACKEND_SPEC_FILE_REFERENCES_CACHE_MAX_SIZE"])
+        cached = cls.REFERENCES_CACHE.get(cache_key, is_valid=file_is_unchanged)
+        if cached is None:
+            return None
+        if cached[0] != file_fingerprint:
+            cls.REFERENCES_CACHE.set(cache_key, (file_fingerprint, cached[1], cached[2]))
+        # callers are free to change the references they get back
+        return copy.deepcopy(cached[2])
+
+    @classmethod
+    def set_cached_references_for_file(
+        cls,
+        full_file_path: str,
+        process_model_info: ProcessModelInfo,
+        file_fingerprint: tuple[int, int, int],
+        content_hash: str,
+        references: list[Reference],
+    ) -> None:
+        cache_key = (full_file_path, process_model_info.id, process_model_info.primary_process_id)
+        cls.REFERENCES_CACHE.resize(current_app.config["SPIFFWORKFLOW_BACKEND_SPEC_FILE_REFERENCES_CACHE_MAX_SIZE"])
+        cls.REFERENCES_CACHE.set(cache_key, (file_fingerprint, content_hash, copy.deepcopy(references)))
 
     # This is designed to isolate xml parsing, which is a security issue, and make it as safe as possible.
     # S320 indicates that xml parsing with lxml is unsafe. To mitigate this, we add options to the parser
@@ -259,6 +318,12 @@ class SpecFileService(FileSystemService):
     def clear_caches_for_item(
         file_name: str | None = None, process_model_info: ProcessModelInfo | None = None, process_group_id: str | None = None
     ) -> None:
+        # importing here to avoid circular imports since the workflow spec service uses this service to read files.
+        from spiffworkflow_backend.services.workflow_spec_service import WorkflowSpecService
+
+        # specs can pull in files from other process models through call activities so clear all of them
+        WorkflowSpecService.clear_spec_cache()
+
         reference_cache_query = ReferenceCacheModel.basic_query()
 
         if process_group_id is not None:
@@ -1,10 +1,12 @@
 import copy
 import json
 import time
+from collections.abc import Iterable
 from hashlib import sha256
 from typing import TypedDict
 from uuid import UUID
 
+from flask import current_app
 from SpiffWorkflow.bpmn.serializer.workflow import BpmnWorkflowSerializer  # type: ignore
 from SpiffWorkflow.bpmn.workflow import BpmnWorkflow  # type: ignore
 from SpiffWorkflow.exceptions import WorkflowException  # type: ignore
@@ -103,7 +105,93 @@ class TaskModelError(Exception):
         return task_trace
 
 
+class TaskDataSizeTracker:
+    """Keeps the json size of the data of each finished task so the total can be checked as tasks change.
+
+    Sizes are recorded when the TaskService serializes task data for saving so the whole
+    workflow does not need to be dumped on every run just to enforce the limit. The processor
+    seeds it with the finished tasks it loaded the first time it runs the instance so tasks saved
+    in earlier runs still count.
+    """
+
+    # Not sure what the number here should be but this now matches the mysql
+    # max_allowed_packet variable on dev - 1073741824
+    TASK_DATA_SIZE_LIMIT = 1024**3
+
+    def __init__(self) -> None:
+        self.task_data_sizes: dict[str, int] = {}
+        self.total_size = 0
+
+    def set_task_data_size(self, task_guid: str, task_data_size: int) -> None:
+        self.total_size += task_data_size - self.task_data_sizes.get(task_guid, 0)
+        self.task_data_sizes[task_guid] = task_data_size
+
+    def add_finished_tasks(self, spiff_tasks: list[SpiffTask]) -> None:
+        for spiff_task in spiff_tasks:
+            if spiff_task.has_state(TaskState.FINISHED_MASK) and len(spiff_task.data) > 0:
+                try:
+                    task_data_size = len(json.dumps(spiff_task.data, sort_keys=True))
+                except TypeError:
+                    # data that cannot be dumped cannot be saved either so it is caught when the task is saved
+                    continue
+                self.set_task_data_size(str(spiff_task.id), task_data_size)
+
+    def remove_task(self, task_guid: str) -> None:
+        self.total_size -= self.task_data_sizes.pop(task_guid, 0)
+
+    def limit_exceeded(self) -> bool:
+        return self.total_size > self.TASK_DATA_SIZE_LIMIT
+
+
+class TaskChangeTracker:
+    """Tells which spiff tasks still match the task models they were loaded from or last saved to.
+
+    Used to avoid serializing and saving tasks that did not change. The task models already hold what is in
+    the database so nothing is recorded when an instance is loaded, and the data of a task is only hashed once
+    everything cheaper to compare matches. Only tasks in SKIPPABLE_STATES are skipped since things like
+    multi-instance bookkeeping and error details can change on STARTED and ERROR tasks without a state change.
+    """
+
+    SKIPPABLE_STATES = (
+        TaskState.WAITING | TaskState.CANCELLED | TaskState.READY | TaskState.MAYBE | TaskState.LIKELY | TaskState.FUTURE
+    )
+
+    def __init__(self, task_model_mapping: dict[str, TaskModel], python_env_data_hash: str) -> None:
+        self.task_model_mapping = task_model_mapping
+        # every task is saved with the python env of the whole workflow so a task saved with an older one has changed
+        self.python_env_data_hash = python_env_data_hash
+
+    @classmethod
+    def data_hash(cls, spiff_task: SpiffTask) -> str | None:
+        # scripts and the api can change task data in place so the contents have to be compared
+        try:
+            return sha256(json.dumps(spiff_task.data, sort_keys=True).encode("utf8")).hexdigest()
+        except (TypeError, ValueError):
+            # data the serializer has to convert first is always saved
+            return None
+
+    def task_unchanged(self, spiff_task: SpiffTask) -> bool:
+        if not spiff_task.has_state(self.SKIPPABLE_STATES):
+            return False
+        task_model = self.task_model_mapping.get(str(spiff_task.id))
+        if task_model is None or task_model.python_env_data_hash != self.python_env_data_hash:
+            return False
+        properties_json = task_model.properties_json
+        if (
+            properties_json.get("state") != spiff_task.state
+            or properties_json.get("last_state_change") != spiff_task.last_state_change
+            or properties_json.get("triggered") != spiff_task.triggered
+            or properties_json.get("children") != [str(child.id) for child in spiff_task.children]
+            or properties_json.get("internal_data") != spiff_task.internal_data
+        ):
+            return False
+        return task_model.json_data_hash == self.data_hash(spiff_task)
+
+
 class TaskService:
+    # keeps IN clauses at a size every supported database handles well
+    TASK_MODEL_PREFETCH_CHUNK_SIZE = 1000
+
     def __init__(
         self,
         process_instance: ProcessInstanceModel,
@@ -113,12 +201,14 @@ class TaskService:
         force_update_definitions: bool = False,
         task_model_mapping: dict[str, TaskModel] | None = None,
         bpmn_subprocess_mapping: dict[str, BpmnProcessModel] | None = None,
+        task_data_size_tracker: TaskDataSizeTracker | None = None,
     ) -> None:
         self.process_instance = process_instance
         self.bpmn_definition_to_task_definitions_mappings = bpmn_definition_to_task_definitions_mappings
         self.serializer = serializer
         self.task_model_mapping = task_model_mapping or {}
         self.bpmn_subprocess_mapping = bpmn_subprocess_mapping or {}
+        self.task_data_size_tracker = task_data_size_tracker or TaskDataSizeTracker()
 
         self.bpmn_subprocess_id_mapping: dict[int, BpmnProcessModel] = {}
         for _, bs in self.bpmn_subprocess_mapping.items():
@@ -132,13 +222,29 @@ class TaskService:
         self.force_update_definitions = force_update_definitions
 
         self.bpmn_processes: dict[str, BpmnProcessModel] = {}
+        # workflows whose data still needs to be hashed onto the bpmn process with the same key in bpmn_processes.
+        # hashing waits until the objects are saved so it happens once per workflow no matter how many of its tasks changed.
+        self.bpmn_process_workflows_with_pending_data: dict[str, BpmnWorkflow] = {}
         self.task_models: dict[str, TaskModel] = {}
         self.json_data_dicts: dict[str, JsonDataDict] = {}
         self.process_instance_events: dict[str, ProcessInstanceEventModel] = {}
 
+        # task models loaded in bulk with prefetch_task_models and the guids it found to not exist yet
+        # so find_or_create_task_model_from_spiff_task does not have to query for them one at a time.
+        self.prefetched_task_models: dict[str, TaskModel] = {}
+        self.new_task_guids: set[str] = set()
+
+        # task data is stored as a delta against the data of the parent task when both are saved by this service.
+        # this maps task guids to the json data hash, data, and delta chain depth of the data stored for them.
+        self.json_data_delta_snapshot_interval: int = current_app.config[
+            "SPIFFWORKFLOW_BACKEND_JSON_DATA_DELTA_SNAPSHOT_INTERVAL"
+        ]
+        self.stored_task_data: dict[str, tuple[str, dict, int]] = {}
+
         self.run_started_at: float | None = run_started_at
 
     def save_objects_to_database(self, save_process_instance_events: bool = True) -> None:
+        self.update_pending_task_data_on_bpmn_processes()
         db.session.bulk_save_objects(self.bpmn_processes.values())
         db.session.bulk_save_objects(self.task_models.values())
         if save_process_instance_events:
@@ -216,9 +322,6 @@ class TaskService:
         bpmn_process = new_bpmn_process or task_model.bpmn_process or self.bpmn_subprocess_id_mapping[task_model.bpmn_process_id]
 
         self.update_task_model(task_model, spiff_task)
-        bpmn_process_json_data = self.update_task_data_on_bpmn_process(bpmn_process, bpmn_process_instance=spiff_task.workflow)
-        if bpmn_process_json_data is not None:
-            self.json_data_dicts[bpmn_process_json_data["hash"]] = bpmn_process_json_data
         self.task_models[task_model.guid] = task_model
 
         if start_and_end_times:
@@ -269,11 +372,8 @@ class TaskService:
         new_properties_json["success"] = spiff_workflow.success
         bpmn_process.properties_json = new_properties_json
 
-        bpmn_process_json_data = self.update_task_data_on_bpmn_process(bpmn_process, bpmn_process_instance=spiff_workflow)
-        if bpmn_process_json_data is not None:
-            self.json_data_dicts[bpmn_process_json_data["hash"]] = bpmn_process_json_data
-
         self.bpmn_processes[bpmn_process.guid or "top_level"] = bpmn_process
+        self.bpmn_process_workflows_with_pending_data[bpmn_process.guid or "top_level"] = spiff_workflow
 
         if spiff_workflow.parent_task_id and bpmn_process.direct_parent_process_id:
             direct_parent_bpmn_process = self.bpmn_subprocess_id_mapping[bpmn_process.direct_parent_process_id]
@@ -285,6 +385,15 @@ class TaskService:
             ]
             bpmn_process.bpmn_process_definition_id = bpmn_process_definition.id
 
+    def update_pending_task_data_on_bpmn_processes(self) -> None:
+        for bpmn_process_key, spiff_workflow in self.bpmn_process_workflows_with_pending_data.items():
+            bpmn_process_json_data = self.update_task_data_on_bpmn_process(
+                self.bpmn_processes[bpmn_process_key], bpmn_process_instance=spiff_workflow
+            )
+            if bpmn_process_json_data is not None:
+                self.json_data_dicts[bpmn_process_json_data["hash"]] = bpmn_process_json_data
+        self.bpmn_process_workflows_with_pending_data = {}
+
     def update_task_model(
         self,
         task_model: TaskModel,
@@ -308,24 +417,77 @@ class TaskService:
         python_env_data_dict = self.__class__._get_python_env_data_dict_from_spiff_task(spiff_task, self.serializer)
         task_model.properties_json = new_properties_json
         task_model.state = TaskState.get_name(new_properties_json["state"])
-        json_data_dict = self.__class__.update_json_data_on_db_model_and_return_dict_if_updated(
+        (json_data_dict, task_data_size) = self.__class__.update_json_data_on_db_model_and_return_dict_and_size_if_updated(
             task_model, spiff_task_data, "json_data_hash"
         )
+        if spiff_task.has_state(TaskState.FINISHED_MASK) and len(spiff_task_data) > 0:
+            self.task_data_size_tracker.set_task_data_size(task_model.guid, task_data_size)
+        else:
+            self.task_data_size_tracker.remove_task(task_model.guid)
         python_env_dict = self.__class__.update_json_data_on_db_model_and_return_dict_if_updated(
             task_model, python_env_data_dict, "python_env_data_hash"
         )
-        if json_data_dict is not None:
-            self.json_data_dicts[json_data_dict["hash"]] = json_data_dict
+        if json_data_dict is not None and json_data_dict["hash"] not in self.json_data_dicts:
+            self.json_data_dicts[json_data_dict["hash"]] = self._task_json_data_dict_to_store(
+                spiff_task, json_data_dict, task_data_size
+            )
         if python_env_dict is not None:
             self.json_data_dicts[python_env_dict["hash"]] = python_env_dict
         task_model.runtime_info = spiff_task.task_spec.task_info(spiff_task)
 
+    def _task_json_data_dict_to_store(
+        self, spiff_task: SpiffTask, json_data_dict: JsonDataDict, task_data_size: int
+    ) -> JsonDataDict:
+        """Returns a delta against the data of the parent task if delta storage is enabled and it is worth it.
+
+        A full snapshot is stored once a delta chain reaches the snapshot interval so reads never have to
+        walk too far back. Existing json data records are never updated so a chain always ends in a snapshot.
+        """
+        json_data_dict_to_store = json_data_dict
+        delta_chain_depth = 0
+        if self.json_data_delta_snapshot_interval > 0 and spiff_task.parent is not None:
+            parent_task_data = self.stored_task_data.get(str(spiff_task.parent.id))
+            if parent_task_data is not None:
+                (parent_hash, parent_data, parent_delta_chain_depth) = parent_task_data
+                if parent_hash != json_data_dict["hash"] and parent_delta_chain_depth < self.json_data_delta_snapshot_interval:
+                    delta = JsonDataModel.delta_between(parent_data, json_data_dict["data"])
+                    if len(json.dumps(delta)) * 2 < task_data_size:
+                        json_data_dict_to_store = {"hash": json_data_dict["hash"], "data": delta, "delta_base_hash": parent_hash}
+                        delta_chain_depth = parent_delta_chain_depth + 1
+
+        if self.json_data_delta_snapshot_interval > 0:
+            self.stored_task_data[str(spiff_task.id)] = (json_data_dict["hash"], json_data_dict["data"], delta_chain_depth)
+        return json_data_dict_to_store
+
+    def prefetch_task_models(self, spiff_tasks: Iterable[SpiffTask]) -> None:
+        """Loads the task models of the given spiff tasks in chunks instead of one query per task.
+
+        Guids that are not in the database are remembered as new so they are created without looking them up again.
+        """
+        guids_to_load = list(
+            {
+                str(spiff_task.id)
+                for spiff_task in spiff_tasks
+                if str(spiff_task.id) not in self.task_models
+                and str(spiff_task.id) not in self.prefetched_task_models
+                and str(spiff_task.id) not in self.new_task_guids
+            }
+        )
+        for index in range(0, len(guids_to_load), self.TASK_MODEL_PREFETCH_CHUNK_SIZE):
+            guids_in_chunk = guids_to_load[index : index + self.TASK_MODEL_PREFETCH_CHUNK_SIZE]
+            task_models = TaskModel.query.filter(TaskModel.guid.in_(guids_in_chunk)).all()  # type: ignore
+            for task_model in task_models:
+                self.prefetched_task_models[task_model.guid] = task_model
+            self.new_task_guids.update(set(guids_in_chunk) - {task_model.guid for task_model in task_models})
+
     def find_or_create_task_model_from_spiff_task(
         self,
         spiff_task: SpiffTask,
     ) -> tuple[BpmnProcessModel | None, TaskModel]:
         spiff_task_guid = str(spiff_task.id)
-        task_model: TaskModel | None = TaskModel.query.filter_by(guid=spiff_task_guid).first()
+        task_model: TaskModel | None = self.prefetched_task_models.get(spiff_task_guid)
+        if task_model is None and spiff_task_guid not in self.new_task_guids:
+            task_model = TaskModel.query.filter_by(guid=spiff_task_guid).first()
         bpmn_process = None
         if task_model is None:
             bpmn_process = self.task_bpmn_process(spiff_task)
@@ -525,6 +687,7 @@ class TaskService:
         for spiff_task in spiff_tasks:
             if spiff_task.last_state_change > start_time:
                 spiff_tasks_updated[str(spiff_task.id)] = spiff_task
+        self.prefetch_task_models(spiff_tasks_updated.values())
         for _id, spiff_task in spiff_tasks_updated.items():
             self.update_task_model_with_spiff_task(spiff_task)
 
@@ -566,11 +729,21 @@ class TaskService:
     def update_json_data_on_db_model_and_return_dict_if_updated(
         cls, db_model: SpiffworkflowBaseDBModel, task_data_dict: dict, task_model_data_column: str
     ) -> JsonDataDict | None:
-        json_data_dict = JsonDataModel.json_data_dict_from_dict(task_data_dict)
+        (json_data_dict, _) = cls.update_json_data_on_db_model_and_return_dict_and_size_if_updated(
+            db_model, task_data_dict, task_model_data_column
+        )
+        return json_data_dict
+
+    @classmethod
+    def update_json_data_on_db_model_and_return_dict_and_size_if_updated(
+        cls, db_model: SpiffworkflowBaseDBModel, task_data_dict: dict, task_model_data_column: str
+    ) -> tuple[JsonDataDict | None, int]:
+        """Same as update_json_data_on_db_model_and_return_dict_if_updated but also returns the json size of the data."""
+        (json_data_dict, data_size) = JsonDataModel.json_data_dict_and_size_from_dict(task_data_dict)
         if getattr(db_model, task_model_data_column) != json_data_dict["hash"]:
             setattr(db_model, task_model_data_column, json_data_dict["hash"])
-            return json_data_dict
-        return None
+            return (json_data_dict, data_size)
+        return (None, data_size)
 
     @classmethod
     def bpmn_process_and_descendants(cls, bpmn_processes: list[BpmnProcessModel]) -> list[BpmnProcessModel]:
@@ -33,8 +33,10 @@ from spiffworkflow_backend.helpers.spiff_enum import SpiffEnum
 from spiffworkflow_backend.models.bpmn_process import BpmnProcessModel
 from spiffworkflow_backend.models.db import db
 from spiffworkflow_backend.models.future_task import FutureTaskModel
+from spiffworkflow_backend.models.json_data import JsonDataModel
 from spiffworkflow_backend.models.message_instance import MessageInstanceModel
 from spiffworkflow_backend.models.message_instance_correlation import MessageInstanceCorrelationRuleModel
+from spiffworkflow_backend.models.message_instance_correlation_key import MessageInstanceCorrelationKeyModel
 from spiffworkflow_backend.models.process_instance import ProcessInstanceModel
 from spiffworkflow_backend.models.process_instance_event import ProcessInstanceEventType
 from spiffworkflow_backend.models.task import TaskModel  # noqa: F401
@@ -46,6 +48,8 @@ from spiffworkflow_backend.services.process_instance_lock_service import Process
 from spiffworkflow_backend.services.process_instance_tmp_service import ProcessInstanceTmpService
 from spiffworkflow_backend.services.process_model_service import ProcessModelService
 from spiffworkflow_backend.services.task_service import StartAndEndTimes
+from spiffworkflow_backend.services.task_service import TaskChangeTracker
+from spiffworkflow_backend.services.task_service import TaskDataSizeTracker
 from spiffworkflow_backend.services.task_service import TaskService
 
 
@@ -289,6 +293,7 @@ class TaskModelSavingDelegate(EngineStepDelegate):
         secondary_engine_step_delegate: EngineStepDelegate | None = None,
         task_model_mapping: dict[str, TaskModel] | None = None,
         bpmn_subprocess_mapping: dict[str, BpmnProcessModel] | None = None,
+        task_data_size_tracker: TaskDataSizeTracker | None = None,
     ) -> None:
         self.secondary_engine_step_delegate = secondary_engine_step_delegate
         self.process_instance = process_instance
@@ -301,6 +306,9 @@ class TaskModelSavingDelegate(EngineStepDelegate):
         self.spiff_tasks_to_process: set[UUID] = set()
         self.spiff_task_timestamps: dict[UUID, StartAndEndTimes] = {}
 
+        # looked up on the first completed task and reused for the rest of the run
+        self._metadata_extraction_paths: list[tuple[str, list[str]]] | None = None
+
         self.task_service = TaskService(
             process_instance=self.process_instance,
             serializer=self.serializer,
@@ -308,8 +316,19 @@ class TaskModelSavingDelegate(EngineStepDelegate):
             run_started_at=time.time(),
             task_model_mapping=task_model_mapping,
             bpmn_subprocess_mapping=bpmn_subprocess_mapping,
+            task_data_size_tracker=task_data_size_tracker,
         )
 
+    def check_task_data_size(self) -> None:
+        task_data_size_tracker = self.task_service.task_data_size_tracker
+        if task_data_size_tracker.limit_exceeded():
+            raise (
+                ApiError(
+                    error_code="task_data_size_exceeded",
+                    message=f"Maximum task data size of {task_data_size_tracker.TASK_DATA_SIZE_LIMIT} exceeded.",
+                )
+            )
+
     def will_complete_task(self, spiff_task: SpiffTask) -> None:
         if self._should_update_task_model():
             self.spiff_task_timestamps[spiff_task.id] = {"start_in_seconds": time.time(), "end_in_seconds": None}
@@ -323,16 +342,20 @@ class TaskModelSavingDelegate(EngineStepDelegate):
     def did_complete_task(self, spiff_task: SpiffTask) -> None:
         if self._should_update_task_model():
             # NOTE: used with process-all-tasks and process-children-of-last-task
+            # the children are loaded along with the task since they are usually the next ones to get saved
+            self.task_service.prefetch_task_models([spiff_task, *spiff_task.children])
             task_model = self.task_service.update_task_model_with_spiff_task(spiff_task)
             if self.current_task_start_in_seconds is None:
                 raise Exception("Could not find cached current_task_start_in_seconds. This should never have happened")
             task_model.start_in_seconds = self.current_task_start_in_seconds
             task_model.end_in_seconds = time.time()
+            self.check_task_data_size()
 
-        metadata = ProcessModelService.extract_metadata(
-            self.process_instance.process_model_identifier,
-            spiff_task.data,
-        )
+        if self._metadata_extraction_paths is None:
+            self._metadata_extraction_paths = ProcessModelService.metadata_extraction_paths_for_process_model(
+                self.process_instance.process_model_identifier
+            )
+        metadata = ProcessModelService.extract_metadata_from_paths(self._metadata_extraction_paths, spiff_task.data)
         log_extras = {
             "task_id": str(spiff_task.id),
             "task_spec": spiff_task.task_spec.name,
@@ -368,16 +391,29 @@ class TaskModelSavingDelegate(EngineStepDelegate):
         # ANOTHER NOTE: at one point we attempted to be smarter about what tasks we considered for persistence,
         # but it didn't quite work in all cases, so we deleted it. you can find it in commit
         # 1ead87b4b496525df8cc0e27836c3e987d593dc0 if you are curious.
-        for waiting_spiff_task in bpmn_process_instance.get_tasks(
-            state=TaskState.WAITING
-            | TaskState.CANCELLED
-            | TaskState.READY
-            | TaskState.MAYBE
-            | TaskState.LIKELY
-            | TaskState.FUTURE
-            | TaskState.STARTED
-            | TaskState.ERROR,
-        ):
+        #
+        # tasks that look exactly like they did when they were loaded or last saved are skipped
+        # so large numbers of FUTURE and parallel tasks do not get serialized on every run.
+        user_defined_state = bpmn_process_instance.script_engine.environment.user_defined_state()
+        python_env_data_dict = self.serializer.registry.convert(user_defined_state)
+        (python_env_json_data_dict, _) = JsonDataModel.json_data_dict_and_size_from_dict(python_env_data_dict)
+        task_change_tracker = TaskChangeTracker(self.task_service.task_model_mapping, python_env_json_data_dict["hash"])
+        saved_spiff_tasks = [
+            waiting_spiff_task
+            for waiting_spiff_task in bpmn_process_instance.get_tasks(
+                state=TaskState.WAITING
+                | TaskState.CANCELLED
+                | TaskState.READY
+                | TaskState.MAYBE
+                | TaskState.LIKELY
+                | TaskState.FUTURE
+                | TaskState.STARTED
+                | TaskState.ERROR,
+            )
+            if not task_change_tracker.task_unchanged(waiting_spiff_task)
+        ]
+        self.task_service.prefetch_task_models(saved_spiff_tasks)
+        for waiting_spiff_task in saved_spiff_tasks:
             self.task_service.update_task_model_with_spiff_task(waiting_spiff_task)
 
         self.task_service.save_objects_to_database()
@@ -693,6 +729,9 @@ class WorkflowExecutionService:
                     correlation_key_names=correlation_property.correlation_keys,
                 )
                 db.session.add(message_correlation)
+            # compute the correlation keys now so send messages can find this instance without evaluating expressions
+            for correlation_key_record in MessageInstanceCorrelationKeyModel.build_for_receive_message(message_instance) or []:
+                db.session.add(correlation_key_record)
             db.session.add(message_instance)
 
             bpmn_process = self.process_instance_model.bpmn_process
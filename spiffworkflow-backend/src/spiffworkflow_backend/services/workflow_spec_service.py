@@ -1,4 +1,7 @@
+import glob
 import os
+from dataclasses import dataclass
+from hashlib import sha256
 from typing import NewType
 
 from flask import current_app
@@ -9,6 +12,7 @@ from SpiffWorkflow.bpmn.specs.bpmn_process_spec import BpmnProcessSpec  # type:
 from SpiffWorkflow.spiff.parser.process import SpiffBpmnParser  # type: ignore
 
 from spiffworkflow_backend.exceptions.api_error import ApiError
+from spiffworkflow_backend.helpers.lru_cache import LRUCache
 from spiffworkflow_backend.models.file import File
 from spiffworkflow_backend.models.file import FileType
 from spiffworkflow_backend.models.process_model import ProcessModelInfo
@@ -20,8 +24,24 @@ from spiffworkflow_backend.services.spec_file_service import SpecFileService
 
 IdToBpmnProcessSpecMapping = NewType("IdToBpmnProcessSpecMapping", dict[str, BpmnProcessSpec])
 
+# (process_model_identifier, process_id, digest of the process model's own files)
+ProcessSpecCacheKey = tuple[str, str, str]
+
+
+@dataclass
+class ProcessSpecCacheEntry:
+    bpmn_process_spec: BpmnProcessSpec
+    subprocesses: IdToBpmnProcessSpecMapping
+
+    # full paths to files from other process models that were pulled in through call activities mapped to their digests
+    dependency_file_digests: dict[str, str]
+
 
 class WorkflowSpecService:
+    # parsing bpmn is expensive and the specs are not modified when running workflows,
+    # so cache the parsed specs per process and the contents of every file that went into them.
+    SPEC_CACHE: LRUCache[ProcessSpecCacheKey, ProcessSpecCacheEntry] = LRUCache("process_spec")
+
     @classmethod
     def get_spec(
         cls,
@@ -30,12 +50,27 @@ class WorkflowSpecService:
         process_id_to_run: str | None = None,
     ) -> tuple[BpmnProcessSpec, IdToBpmnProcessSpecMapping]:
         """Returns a SpiffWorkflow specification for the given process_instance spec, using the files provided."""
-        parser = MyCustomParser()
-
         process_id = process_id_to_run or process_model_info.primary_process_id
 
+        file_data_by_name: dict[str, bytes] = {}
+        for file in files:
+            if file.type in [FileType.bpmn.value, FileType.dmn.value]:
+                file_data_by_name[file.name] = SpecFileService.get_data(process_model_info, file.name)
+
+        cache_key = None
+        if process_id:
+            cache_key = (process_model_info.id, process_id, cls.digest_for_file_data(file_data_by_name))
+            cls.SPEC_CACHE.resize(current_app.config["SPIFFWORKFLOW_BACKEND_PROCESS_SPEC_CACHE_MAX_SIZE"])
+            cache_entry = cls.SPEC_CACHE.get(cache_key, is_valid=cls._dependency_files_are_unchanged)
+            if cache_entry is not None:
+                return (cache_entry.bpmn_process_spec, cache_entry.subprocesses)
+
+        parser = MyCustomParser()
+
         for file in files:
-            data = SpecFileService.get_data(process_model_info, file.name)
+            if file.name not in file_data_by_name:
+                continue
+            data = file_data_by_name[file.name]
             try:
                 if file.type == FileType.bpmn.value:
                     bpmn: etree.Element = SpecFileService.get_etree_from_xml_bytes(data)
@@ -48,14 +83,15 @@ class WorkflowSpecService:
                     error_code="invalid_xml",
                     message=f"'{file.name}' is not a valid xml file." + str(xse),
                 ) from xse
-        if process_id is None or process_id == "":
+        if process_id is None or process_id == "" or cache_key is None:
             raise (
                 ApiError(
                     error_code="no_primary_bpmn_error",
                     message=f"There is no primary BPMN process id defined for process_model {process_model_info.id}",
                 )
             )
-        cls.update_spiff_parser_with_all_process_dependency_files(parser)
+        dependency_files: set[str] = set()
+        cls.update_spiff_parser_with_all_process_dependency_files(parser, dependency_files=dependency_files)
 
         try:
             bpmn_process_spec = parser.get_spec(process_id)
@@ -71,14 +107,57 @@ class WorkflowSpecService:
                 task_id=ve.id,
                 tag=ve.tag,
             ) from ve
+
+        cls.SPEC_CACHE.set(
+            cache_key,
+            ProcessSpecCacheEntry(
+                bpmn_process_spec=bpmn_process_spec,
+                subprocesses=subprocesses,
+                dependency_file_digests=cls.digests_for_file_paths(dependency_files),
+            ),
+        )
         return (bpmn_process_spec, subprocesses)
 
+    @classmethod
+    def clear_spec_cache(cls) -> None:
+        """Call this whenever bpmn or dmn files change on disk outside of the normal file save paths."""
+        cls.SPEC_CACHE.clear()
+
+    @classmethod
+    def digest_for_file_data(cls, file_data_by_name: dict[str, bytes]) -> str:
+        digest = sha256()
+        for file_name in sorted(file_data_by_name.keys()):
+            digest.update(file_name.encode("utf-8"))
+            digest.update(sha256(file_data_by_name[file_name]).digest())
+        return digest.hexdigest()
+
+    @classmethod
+    def digests_for_file_paths(cls, file_paths: set[str]) -> dict[str, str]:
+        digests = {}
+        for file_path in file_paths:
+            try:
+                with open(file_path, "rb") as f:
+                    digests[file_path] = sha256(f.read()).hexdigest()
+            except FileNotFoundError:
+                digests[file_path] = ""
+        return digests
+
+    @classmethod
+    def _dependency_files_are_unchanged(cls, cache_entry: ProcessSpecCacheEntry) -> bool:
+        current_digests = cls.digests_for_file_paths(set(cache_entry.dependency_file_digests.keys()))
+        return current_digests == cache_entry.dependency_file_digests
+
     @classmethod
     def update_spiff_parser_with_all_process_dependency_files(
         cls,
         parser: SpiffBpmnParser,
         processed_identifiers: set[str] | None = None,
+        dependency_files: set[str] | None = None,
     ) -> None:
+        """Adds the bpmn and dmn files of any called processes to the parser.
+
+        If dependency_files is given, the full paths of every file added are put in it.
+        """
         if processed_identifiers is None:
             processed_identifiers = set()
         processor_dependencies = parser.get_process_dependencies()
@@ -98,12 +177,17 @@ class WorkflowSpecService:
             new_bpmn_file_full_path = cls.bpmn_file_full_path_from_bpmn_process_identifier(bpmn_process_identifier)
             new_bpmn_files.add(new_bpmn_file_full_path)
             dmn_file_glob = os.path.join(os.path.dirname(new_bpmn_file_full_path), "*.dmn")
-            parser.add_dmn_files_by_glob(dmn_file_glob)
+            dmn_files = glob.glob(dmn_file_glob)
+            parser.add_dmn_files(dmn_files)
+            if dependency_files is not None:
+                dependency_files.update(dmn_files)
             processed_identifiers.add(bpmn_process_identifier)
 
         if new_bpmn_files:
             parser.add_bpmn_files(new_bpmn_files)
-            cls.update_spiff_parser_with_all_process_dependency_files(parser, processed_identifiers)
+            if dependency_files is not None:
+                dependency_files.update(new_bpmn_files)
+            cls.update_spiff_parser_with_all_process_dependency_files(parser, processed_identifiers, dependency_files)
 
     @classmethod
     def bpmn_file_full_path_from_bpmn_process_identifier(
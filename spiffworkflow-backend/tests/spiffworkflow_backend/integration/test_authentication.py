@@ -208,3 +208,59 @@ class TestAuthentication(BaseTest):
             headers={"Authorization": "Bearer " + access_token.split("=")[1]},
         )
         assert response.status_code == 403
+
+    def test_reuses_verified_tokens_until_they_expire(
+        self,
+        app: Flask,
+        mocker: MockerFixture,
+        client: FlaskClient,
+        with_db_and_bpmn_file_cleanup: None,
+        with_super_admin_user: UserModel,
+    ) -> None:
+        parse_jwt_token_spy = mocker.spy(AuthenticationService, "parse_jwt_token")
+        token = with_super_admin_user.encode_auth_token()
+        headers = {"Authorization": f"Bearer {token}"}
+
+        for _ in range(3):
+            response = client.get("/v1.0/process-groups", headers=headers)
+            assert response.status_code == 200
+        assert parse_jwt_token_spy.call_count == 1
+
+        # entries that outlived their ttl are verified again
+        cache_key = AuthenticationService.verified_token_cache_key("default", token)
+        verified_token = AuthenticationService.VERIFIED_TOKEN_CACHE.get(cache_key)
+        assert verified_token is not None
+        assert verified_token.user_id == with_super_admin_user.id
+        verified_token.expires_at = 0
+        response = client.get("/v1.0/process-groups", headers=headers)
+        assert response.status_code == 200
+        assert parse_jwt_token_spy.call_count == 2
+
+        with self.app_config_mock(app, "SPIFFWORKFLOW_BACKEND_VERIFIED_TOKEN_CACHE_MAX_SIZE", 0):
+            response = client.get("/v1.0/process-groups", headers=headers)
+            assert response.status_code == 200
+            response = client.get("/v1.0/process-groups", headers=headers)
+            assert response.status_code == 200
+        # verify_token and get_scope each decode the token when nothing is cached
+        assert parse_jwt_token_spy.call_count == 6
+
+    def test_logout_forgets_the_verified_access_token(
+        self,
+        app: Flask,
+        client: FlaskClient,
+        with_db_and_bpmn_file_cleanup: None,
+        with_super_admin_user: UserModel,
+    ) -> None:
+        token = with_super_admin_user.encode_auth_token()
+        response = client.get("/v1.0/process-groups", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        cache_key = AuthenticationService.verified_token_cache_key("default", token)
+        assert AuthenticationService.VERIFIED_TOKEN_CACHE.get(cache_key) is not None
+
+        # the browser goes to logout directly so the access token comes from the cookie
+        client.set_cookie("access_token", token)
+        response = client.get(
+            "/v1.0/logout?id_token=unused_id_token&authentication_identifier=default&redirect_url=/&backend_only=true"
+        )
+        assert response.status_code == 302
+        assert AuthenticationService.VERIFIED_TOKEN_CACHE.get(cache_key) is None
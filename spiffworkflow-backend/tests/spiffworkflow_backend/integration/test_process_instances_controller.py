@@ -3,11 +3,16 @@ import os
 from flask.app import Flask
 from flask.testing import FlaskClient
 
+from spiffworkflow_backend.models.db import db
 from spiffworkflow_backend.models.process_instance import ProcessInstanceModel
 from spiffworkflow_backend.models.process_instance import ProcessInstanceStatus
+from spiffworkflow_backend.models.process_instance_queue import ProcessInstanceQueueModel
+from spiffworkflow_backend.models.process_instance_queue import ProcessInstanceQueuePriority
 from spiffworkflow_backend.models.user import UserModel
+from spiffworkflow_backend.services.authorization_service import AuthorizationService
 from spiffworkflow_backend.services.process_instance_processor import ProcessInstanceProcessor
 from spiffworkflow_backend.services.spec_file_service import SpecFileService
+from spiffworkflow_backend.services.user_service import UserService
 from tests.spiffworkflow_backend.helpers.base_test import BaseTest
 from tests.spiffworkflow_backend.helpers.test_data import load_test_spec
 
@@ -56,6 +61,52 @@ class TestProcessInstancesController(BaseTest):
         assert response.json["process_instance"]["id"] == process_instance.id
         assert response.json["uri_type"] is None
 
+    def test_process_instance_priority_set(
+        self,
+        app: Flask,
+        client: FlaskClient,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        process_model = load_test_spec(
+            process_model_id="group/sample",
+            bpmn_file_name="sample.bpmn",
+            process_model_source_directory="sample",
+        )
+        process_instance = self.create_process_instance_from_process_model(process_model=process_model)
+        url = (
+            f"/v1.0/process-instance-priority/{self.modify_process_identifier_for_path_param(process_model.id)}/"
+            f"{process_instance.id}"
+        )
+        user = self.find_or_create_user(username="priority_user")
+        UserService.add_user_to_group_by_group_identifier(user, "priority_group")
+        headers = self.logged_in_headers(user)
+
+        AuthorizationService.add_permission_from_uri_or_macro("priority_group", "read", "PM:group:sample")
+        response = client.post(url, headers=headers, json={"priority": 1})
+        assert response.status_code == 403
+
+        # setting the priority comes with all permissions on the process model
+        AuthorizationService.add_permission_from_uri_or_macro("priority_group", "all", "PM:group:sample")
+        response = client.post(url, headers=headers, json={"priority": ProcessInstanceQueuePriority.high.value})
+        assert response.status_code == 200
+        queue_entry = ProcessInstanceQueueModel.query.filter_by(process_instance_id=process_instance.id).first()
+        assert queue_entry is not None
+        assert queue_entry.priority == ProcessInstanceQueuePriority.high.value
+
+        for invalid_priority in [True, 7, "1", None]:
+            response = client.post(url, headers=headers, json={"priority": invalid_priority})
+            assert response.status_code == 400
+        db.session.refresh(queue_entry)
+        assert queue_entry.priority == ProcessInstanceQueuePriority.high.value
+
+        # process instances that are done are no longer in the queue
+        db.session.delete(queue_entry)
+        db.session.commit()
+        response = client.post(url, headers=headers, json={"priority": ProcessInstanceQueuePriority.low.value})
+        assert response.status_code == 400
+        assert response.json is not None
+        assert response.json["error_code"] == "process_instance_not_queued"
+
     def test_process_instance_migrate(
         self,
         app: Flask,
@@ -1,7 +1,11 @@
+import pytest
 from flask import Flask
 
 from spiffworkflow_backend.models.script_attributes_context import ScriptAttributesContext
 from spiffworkflow_backend.scripts.get_env import GetEnv
+from spiffworkflow_backend.scripts.script import CURRENT_SCRIPT_ATTRIBUTES_CONTEXT
+from spiffworkflow_backend.scripts.script import Script
+from spiffworkflow_backend.scripts.script import ScriptAttributesContextMissingError
 from tests.spiffworkflow_backend.helpers.base_test import BaseTest
 
 
@@ -23,3 +27,28 @@ class TestGetEnv(BaseTest):
             script_attributes_context,
         )
         assert result == "unit_testing"
+
+    def test_get_env_script_function_uses_the_current_script_attributes_context(
+        self,
+        app: Flask,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        script_attributes_context = ScriptAttributesContext(
+            task=None,
+            environment_identifier="unit_testing",
+            process_instance_id=1,
+            process_model_identifier="test_process_model",
+        )
+        # the script functions are only built once per process
+        assert Script.script_functions() is Script.script_functions()
+        script_function = Script.script_functions()["get_env"]
+        with pytest.raises(ScriptAttributesContextMissingError):
+            script_function()
+
+        script_attributes_context_token = CURRENT_SCRIPT_ATTRIBUTES_CONTEXT.set(script_attributes_context)
+        try:
+            assert script_function() == "unit_testing"
+        finally:
+            CURRENT_SCRIPT_ATTRIBUTES_CONTEXT.reset(script_attributes_context_token)
+
+        assert Script.generate_augmented_list(script_attributes_context)["get_env"]() == "unit_testing"
@@ -114,6 +114,10 @@ class TestAuthorizationService(BaseTest):
                     "/process-instance-migrate/some-process-group:some-process-model:*",
                     "create",
                 ),
+                (
+                    "/process-instance-priority/some-process-group:some-process-model:*",
+                    "create",
+                ),
                 (
                     "/process-instance-suspend/some-process-group:some-process-model:*",
                     "create",
@@ -204,6 +208,10 @@ class TestAuthorizationService(BaseTest):
                     "/process-instance-migrate/some-process-group:some-process-model/*",
                     "create",
                 ),
+                (
+                    "/process-instance-priority/some-process-group:some-process-model/*",
+                    "create",
+                ),
                 (
                     "/process-instance-suspend/some-process-group:some-process-model/*",
                     "create",
@@ -546,6 +554,7 @@ class TestAuthorizationService(BaseTest):
                 ("/process-data/*", "read"),
                 ("/process-instance-events/*", "read"),
                 ("/process-instance-migrate/*", "create"),
+                ("/process-instance-priority/*", "create"),
                 ("/process-instance-reset/*", "create"),
                 ("/process-instance-resume/*", "create"),
                 ("/process-instance-suspend/*", "create"),
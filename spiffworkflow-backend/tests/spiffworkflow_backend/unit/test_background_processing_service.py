@@ -1,15 +1,18 @@
 import time
+from typing import Any
 
 from flask import Flask
 from pytest_mock.plugin import MockerFixture
 
 from spiffworkflow_backend.background_processing.background_processing_service import BackgroundProcessingService
+from spiffworkflow_backend.background_processing.process_instance_worker_pool import ProcessInstanceWorkerPool
 from spiffworkflow_backend.models.db import db
 from spiffworkflow_backend.models.future_task import FutureTaskModel
 from spiffworkflow_backend.models.process_instance import ProcessInstanceModel
 from spiffworkflow_backend.models.process_instance import ProcessInstanceStatus
 from spiffworkflow_backend.models.process_instance_queue import ProcessInstanceQueueModel
 from spiffworkflow_backend.models.process_model import ProcessModelInfo
+from spiffworkflow_backend.services.process_instance_lock_service import ProcessInstanceLockService
 from spiffworkflow_backend.services.process_instance_processor import ProcessInstanceProcessor
 from spiffworkflow_backend.services.process_instance_queue_service import ProcessInstanceQueueService
 from spiffworkflow_backend.services.process_instance_service import ProcessInstanceService
@@ -95,6 +98,91 @@ class TestBackgroundProcessingService(BaseTest):
         ProcessInstanceService.do_waiting(ProcessInstanceStatus.waiting.value)
         assert process_instance.status == ProcessInstanceStatus.waiting.value
 
+    def test_do_waiting_releases_each_claim_once_its_process_instance_has_run(
+        self,
+        app: Flask,
+        mocker: MockerFixture,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        process_model = load_test_spec(
+            process_model_id="test_group/model_with_lanes",
+            bpmn_file_name="lanes.bpmn",
+            process_model_source_directory="model_with_lanes",
+        )
+        for _ in range(3):
+            self.create_process_instance_from_process_model(process_model=process_model, status="waiting")
+        db.session.query(ProcessInstanceQueueModel).update(
+            {"updated_at_in_seconds": round(time.time()) - ProcessInstanceService.WAITING_MIN_AGE_IN_SECONDS - 1}
+        )
+        db.session.commit()
+        locked_process_instance_ids_during_runs: list[list[int]] = []
+
+        def record_run(process_instance: ProcessInstanceModel, *_args: Any) -> None:
+            locked_process_instance_ids_during_runs.append(
+                [
+                    queue_entry.process_instance_id
+                    for queue_entry in ProcessInstanceQueueModel.query.filter(
+                        ProcessInstanceQueueModel.locked_by.is_not(None)  # type: ignore
+                    ).all()
+                ]
+            )
+
+        mocker.patch.object(ProcessInstanceService, "run_waiting_process_instance", side_effect=record_run)
+        with self.app_config_mock(app, "SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_DEQUEUE_BATCH_SIZE", 2):
+            ProcessInstanceService.do_waiting(ProcessInstanceStatus.waiting.value)
+
+        assert len(locked_process_instance_ids_during_runs) == 3
+        # only the running process instance and the rest of its batch are locked
+        assert [len(locked_ids) for locked_ids in locked_process_instance_ids_during_runs] == [2, 1, 1]
+        assert ProcessInstanceQueueModel.query.filter(ProcessInstanceQueueModel.locked_by.is_not(None)).count() == 0  # type: ignore
+
+    def test_do_waiting_runs_process_instances_on_the_worker_pool(
+        self,
+        app: Flask,
+        mocker: MockerFixture,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        process_model = load_test_spec(
+            process_model_id="test_group/model_with_lanes",
+            bpmn_file_name="lanes.bpmn",
+            process_model_source_directory="model_with_lanes",
+        )
+        process_instance_ids = [
+            self.create_process_instance_from_process_model(process_model=process_model, status="waiting").id for _ in range(3)
+        ]
+        db.session.query(ProcessInstanceQueueModel).update(
+            {"updated_at_in_seconds": round(time.time()) - ProcessInstanceService.WAITING_MIN_AGE_IN_SECONDS - 1}
+        )
+        db.session.commit()
+        locked_bys: dict[int, str] = {}
+        run_process_instance_ids: list[int] = []
+
+        def record_run(process_instance: ProcessInstanceModel, *_args: Any) -> None:
+            # the worker claimed it in the db before running it
+            queue_entry = ProcessInstanceQueueModel.query.filter_by(process_instance_id=process_instance.id).first()
+            assert queue_entry is not None
+            assert queue_entry.locked_by == ProcessInstanceLockService.locked_by()
+            locked_bys[process_instance.id] = ProcessInstanceLockService.locked_by()
+            run_process_instance_ids.append(process_instance.id)
+
+        mocker.patch.object(ProcessInstanceService, "run_waiting_process_instance", side_effect=record_run)
+        with self.app_config_mock(app, "SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_WORKER_POOL_SIZE", 2):
+            try:
+                BackgroundProcessingService(app).process_waiting_process_instances()
+                worker_pool = ProcessInstanceWorkerPool.for_app(app)
+                worker_pool.shutdown()
+            finally:
+                app.extensions.pop("process_instance_worker_pool", None)
+
+        # running one leaves it ready to run again but each one only runs once per tick
+        assert sorted(run_process_instance_ids) == sorted(process_instance_ids)
+        # each worker thread locks with its own locked_by
+        assert all(locked_by.startswith("bg:worker:") for locked_by in locked_bys.values())
+        assert 1 <= len(set(locked_bys.values())) <= 2
+        assert worker_pool.in_flight_count == 0
+        # claims are released once the process instances have run
+        assert ProcessInstanceQueueModel.query.filter(ProcessInstanceQueueModel.locked_by.is_not(None)).count() == 0  # type: ignore
+
     def test_does_not_queue_future_tasks_if_requested(
         self,
         app: Flask,
@@ -140,6 +228,34 @@ class TestBackgroundProcessingService(BaseTest):
             assert len(future_tasks) == 1
             assert future_tasks[0].archived_for_process_instance_status is False
 
+    def test_do_process_future_tasks_queues_each_future_task_once(
+        self,
+        app: Flask,
+        mocker: MockerFixture,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        with self.app_config_mock(app, "SPIFFWORKFLOW_BACKEND_CELERY_ENABLED", True):
+            mock = mocker.patch("celery.current_app.send_task")
+            self._load_up_a_future_task_and_return_instance()
+            future_task = FutureTaskModel.query.one()
+            FutureTaskModel.insert_or_update(future_task.guid, future_task.run_at_in_seconds + 10)
+            db.session.commit()
+            mock.reset_mock()
+
+            BackgroundProcessingService.do_process_future_tasks(99999999999999999)
+            assert mock.call_count == 1
+            future_task = FutureTaskModel.query.one()
+            assert future_task.queued_to_run_at_in_seconds == future_task.run_at_in_seconds
+
+            BackgroundProcessingService.do_process_future_tasks(99999999999999999)
+            assert mock.call_count == 1
+
+            # a future task that was moved is queued again
+            FutureTaskModel.insert_or_update(future_task.guid, future_task.run_at_in_seconds + 10)
+            db.session.commit()
+            BackgroundProcessingService.do_process_future_tasks(99999999999999999)
+            assert mock.call_count == 2
+
     def _load_up_a_future_task_and_return_instance(
         self, process_model: ProcessModelInfo | None = None, should_schedule_waiting_timer_events: bool = True
     ) -> ProcessInstanceModel:
@@ -0,0 +1,80 @@
+import queue
+
+from flask import Flask
+from pytest_mock.plugin import MockerFixture
+
+from spiffworkflow_backend.background_processing.apscheduler import _polling_interval
+from spiffworkflow_backend.background_processing.background_wakeup_channel import LOCAL_LISTENER_IS_RUNNING
+from spiffworkflow_backend.background_processing.background_wakeup_channel import LOCAL_WAKEUPS
+from spiffworkflow_backend.background_processing.background_wakeup_channel import WAKEUP_TOPIC_MESSAGE_INSTANCE
+from spiffworkflow_backend.background_processing.background_wakeup_channel import BackgroundWakeupChannel
+from spiffworkflow_backend.background_processing.background_wakeup_channel import Wakeup
+from spiffworkflow_backend.models.db import db
+from spiffworkflow_backend.models.process_instance_queue import ProcessInstanceQueueModel
+from tests.spiffworkflow_backend.helpers.base_test import BaseTest
+from tests.spiffworkflow_backend.helpers.test_data import load_test_spec
+
+
+class TestBackgroundWakeupChannel(BaseTest):
+    def _local_wakeups(self) -> list[Wakeup]:
+        wakeups = []
+        while True:
+            try:
+                wakeups.append(LOCAL_WAKEUPS.get_nowait())
+            except queue.Empty:
+                return wakeups
+
+    def test_publishes_wakeups_locally_when_the_session_commits(
+        self,
+        app: Flask,
+        mocker: MockerFixture,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        mocker.patch.object(BackgroundWakeupChannel, "uses_postgres", return_value=False)
+        process_model = load_test_spec(
+            process_model_id="test_group/model_with_lanes",
+            bpmn_file_name="lanes.bpmn",
+            process_model_source_directory="model_with_lanes",
+        )
+        with self.app_config_mock(app, "SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_WAKEUPS_ENABLED", True):
+            LOCAL_LISTENER_IS_RUNNING.set()
+            try:
+                self._local_wakeups()
+                process_instance = self.create_process_instance_from_process_model(process_model=process_model)
+                # enqueueing only adds the queue entry to the session and wakeups wait for the commit
+                assert self._local_wakeups() == []
+                db.session.commit()
+                queue_entry = ProcessInstanceQueueModel.query.filter_by(process_instance_id=process_instance.id).first()
+                assert queue_entry is not None
+                assert {
+                    "topic": "process_instance_queue:not_started",
+                    "run_at_in_seconds": queue_entry.run_at_in_seconds,
+                } in self._local_wakeups()
+
+                # only the earliest wakeup for a topic is sent
+                BackgroundWakeupChannel.publish(WAKEUP_TOPIC_MESSAGE_INSTANCE, 200)
+                BackgroundWakeupChannel.publish(WAKEUP_TOPIC_MESSAGE_INSTANCE, 100)
+                BackgroundWakeupChannel.publish(WAKEUP_TOPIC_MESSAGE_INSTANCE, 300)
+                db.session.commit()
+                assert self._local_wakeups() == [{"topic": WAKEUP_TOPIC_MESSAGE_INSTANCE, "run_at_in_seconds": 100}]
+
+                # nothing wakes up for work that was rolled back
+                BackgroundWakeupChannel.publish(WAKEUP_TOPIC_MESSAGE_INSTANCE)
+                db.session.rollback()
+                db.session.commit()
+                assert self._local_wakeups() == []
+            finally:
+                LOCAL_LISTENER_IS_RUNNING.clear()
+
+    def test_only_polls_slowly_when_wakeups_can_reach_other_processes(
+        self,
+        app: Flask,
+        mocker: MockerFixture,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        assert _polling_interval(app, 10) == 10
+        with self.app_config_mock(app, "SPIFFWORKFLOW_BACKEND_BACKGROUND_SCHEDULER_WAKEUPS_ENABLED", True):
+            mocker.patch.object(BackgroundWakeupChannel, "uses_postgres", return_value=False)
+            assert _polling_interval(app, 10) == 10
+            mocker.patch.object(BackgroundWakeupChannel, "uses_postgres", return_value=True)
+            assert _polling_interval(app, 10) == 300
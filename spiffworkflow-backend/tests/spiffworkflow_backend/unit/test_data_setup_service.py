@@ -1,10 +1,16 @@
+import shutil
+
 from flask.app import Flask
 from flask.testing import FlaskClient
+from pytest_mock.plugin import MockerFixture
 
 from spiffworkflow_backend.models.message_model import MessageModel
 from spiffworkflow_backend.models.reference_cache import ReferenceCacheModel
+from spiffworkflow_backend.services import data_setup_service
 from spiffworkflow_backend.services.data_setup_service import DataSetupService
+from spiffworkflow_backend.services.file_system_service import FileSystemService
 from tests.spiffworkflow_backend.helpers.base_test import BaseTest
+from tests.spiffworkflow_backend.helpers.test_data import load_test_spec
 
 
 class TestDataSetupService(BaseTest):
@@ -43,3 +49,49 @@ class TestDataSetupService(BaseTest):
 
         assert message_map["basic_message"].location == "examples/1-basic-concepts"
         assert message_map["basic_message"].correlation_properties == []
+
+    def test_data_setup_service_only_parses_changed_files(
+        self,
+        app: Flask,
+        mocker: MockerFixture,
+        client: FlaskClient,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        self.copy_example_process_models()
+        # a second process model so one can be removed while the other stays in the index
+        removed_process_model = load_test_spec(
+            "test_group/hello_world",
+            bpmn_file_name="hello_world.bpmn",
+            process_model_source_directory="hello_world",
+        )
+        mocker.patch.object(DataSetupService, "PARALLEL_PARSE_MIN_FILE_COUNT", 1)
+        # data setup reuses references for every file even when they do not all fit in the spec file references cache
+        mocker.patch.dict(app.config, {"SPIFFWORKFLOW_BACKEND_SPEC_FILE_REFERENCES_CACHE_MAX_SIZE": 1})
+
+        # parse in worker processes the first time
+        with self.app_config_mock(app, "SPIFFWORKFLOW_BACKEND_DATA_SETUP_MAX_PARSER_PROCESSES", 2):
+            first_failing_process_models = DataSetupService.save_all_process_models()
+        first_generation_references = sorted(
+            (r.identifier, r.relative_location, r.type, r.file_name) for r in ReferenceCacheModel.basic_query().all()
+        )
+        assert len(first_generation_references) > 0
+
+        # spy after the parallel run since the spy cannot be sent to worker processes
+        parse_spy = mocker.spy(data_setup_service, "parse_references_for_file")
+        with self.app_config_mock(app, "SPIFFWORKFLOW_BACKEND_DATA_SETUP_MAX_PARSER_PROCESSES", 1):
+            assert DataSetupService.save_all_process_models() == first_failing_process_models
+        assert parse_spy.call_count == 0
+        second_generation_references = sorted(
+            (r.identifier, r.relative_location, r.type, r.file_name) for r in ReferenceCacheModel.basic_query().all()
+        )
+        assert second_generation_references == first_generation_references
+
+        removed_process_model_path = FileSystemService.process_model_full_path(removed_process_model)
+        assert any(file_path.startswith(removed_process_model_path) for (file_path, _, _) in DataSetupService.REFERENCES_BY_FILE)
+        shutil.rmtree(removed_process_model_path)
+        with self.app_config_mock(app, "SPIFFWORKFLOW_BACKEND_DATA_SETUP_MAX_PARSER_PROCESSES", 1):
+            DataSetupService.save_all_process_models()
+        assert parse_spy.call_count == 0
+        remaining_file_paths = [file_path for (file_path, _, _) in DataSetupService.REFERENCES_BY_FILE]
+        assert len(remaining_file_paths) > 0
+        assert not any(file_path.startswith(removed_process_model_path) for file_path in remaining_file_paths)
@@ -1,8 +1,16 @@
 """Process Model."""
 
+import os
+import subprocess
+from pathlib import Path
+
+import pytest
 from flask.app import Flask
 from flask.testing import FlaskClient
+from pytest_mock.plugin import MockerFixture
 
+from spiffworkflow_backend.models.process_model import ProcessModelInfo
+from spiffworkflow_backend.services.git_service import GitCommandError
 from spiffworkflow_backend.services.git_service import GitService
 from tests.spiffworkflow_backend.helpers.base_test import BaseTest
 
@@ -18,3 +26,103 @@ class TestGitService(BaseTest):
             ["echo", "   This output should not end in space  "], prepend_with_git=False
         )
         assert output == "This output should not end in space"
+
+    def test_caches_current_revision_until_head_changes(
+        self,
+        app: Flask,
+        mocker: MockerFixture,
+        tmp_path: Path,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        repo_dir = str(tmp_path)
+        commit_command = ["-c", "user.name=tester", "-c", "user.email=tester@example.com", "commit", "-q", "--allow-empty"]
+        # safe_command does not allow git init so create the repo directly
+        subprocess.run(["git", "init", "-q", repo_dir], check=True)  # noqa: S603, S607
+        GitService.run_shell_command([*commit_command, "-m", "first"], context_directory=repo_dir)
+
+        GitService.clear_current_revision_cache()
+        run_shell_command_spy = mocker.spy(GitService, "run_shell_command")
+        with self.app_config_mock(app, "SPIFFWORKFLOW_BACKEND_BPMN_SPEC_ABSOLUTE_DIR", repo_dir):
+            first_revision = GitService.get_current_revision()
+            assert GitService.get_current_revision() == first_revision
+            assert run_shell_command_spy.call_count == 1
+
+            GitService.run_shell_command([*commit_command, "-m", "second"], context_directory=repo_dir)
+            second_revision = GitService.get_current_revision()
+            assert second_revision != first_revision
+            assert second_revision == GitService.run_shell_command_to_get_stdout(
+                ["rev-parse", "--short", "HEAD"], context_directory=repo_dir
+            )
+            assert GitService.get_current_revision() == second_revision
+            assert run_shell_command_spy.call_count == 4
+        GitService.clear_current_revision_cache()
+
+    def test_caches_file_contents_for_older_revisions(
+        self,
+        app: Flask,
+        mocker: MockerFixture,
+        tmp_path: Path,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        repo_dir = str(tmp_path / "repo")
+        cache_dir = str(tmp_path / "cache")
+        process_model = ProcessModelInfo(id="test_group/test_model", display_name="test_model", description="test_model")
+        form_path = os.path.join(repo_dir, "test_group", "test_model", "form.json")
+        os.makedirs(os.path.dirname(form_path))
+        commit_command = ["-c", "user.name=tester", "-c", "user.email=tester@example.com", "commit", "-q", "-a"]
+        subprocess.run(["git", "init", "-q", repo_dir], check=True)  # noqa: S603, S607
+        with open(form_path, "w") as f:
+            f.write('{"version": 1}')
+        GitService.run_shell_command(["add", "."], context_directory=repo_dir)
+        GitService.run_shell_command([*commit_command, "-m", "first"], context_directory=repo_dir)
+        first_revision = GitService.run_shell_command_to_get_stdout(["rev-parse", "HEAD"], context_directory=repo_dir)
+        with open(form_path, "w") as f:
+            f.write('{"version": 2}')
+        GitService.run_shell_command([*commit_command, "-m", "second"], context_directory=repo_dir)
+
+        GitService.FILE_CONTENTS_CACHE.clear()
+        GitService.COMMIT_ID_CACHE.clear()
+        with (
+            self.app_config_mock(app, "SPIFFWORKFLOW_BACKEND_BPMN_SPEC_ABSOLUTE_DIR", repo_dir),
+            self.app_config_mock(app, "SPIFFWORKFLOW_BACKEND_GIT_FILE_CONTENTS_CACHE_DIR", cache_dir),
+        ):
+            run_shell_command_spy = mocker.spy(GitService, "run_shell_command")
+            for _ in range(3):
+                file_contents = GitService.get_instance_file_contents_for_revision(process_model, first_revision, "form.json")
+                assert file_contents == '{"version": 1}'
+            assert run_shell_command_spy.call_count == 1
+            assert GitService.FILE_CONTENTS_CACHE.hits == 2
+
+            # the cache dir is used when the in memory cache does not have the file
+            GitService.FILE_CONTENTS_CACHE.clear()
+            file_contents = GitService.get_instance_file_contents_for_revision(process_model, first_revision, "form.json")
+            assert file_contents == '{"version": 1}'
+            assert run_shell_command_spy.call_count == 1
+
+            # refs are resolved to a full commit id every time since refs can move
+            file_contents = GitService.get_instance_file_contents_for_revision(process_model, "HEAD", "form.json")
+            assert file_contents == '{"version": 2}'
+            assert run_shell_command_spy.call_count == 3
+            file_contents = GitService.get_instance_file_contents_for_revision(process_model, "HEAD", "form.json")
+            assert run_shell_command_spy.call_count == 4
+
+            # short commit ids are resolved once and then remembered
+            for _ in range(2):
+                file_contents = GitService.get_instance_file_contents_for_revision(process_model, first_revision[:7], "form.json")
+                assert file_contents == '{"version": 1}'
+            assert run_shell_command_spy.call_count == 5
+            assert GitService.COMMIT_ID_CACHE.get((repo_dir, first_revision[:7])) == first_revision
+
+            GitService.FILE_CONTENTS_CACHE.clear()
+            with (
+                self.app_config_mock(app, "SPIFFWORKFLOW_BACKEND_GIT_FILE_CONTENTS_USE_CAT_FILE_BATCH", True),
+                self.app_config_mock(app, "SPIFFWORKFLOW_BACKEND_GIT_FILE_CONTENTS_CACHE_DIR", None),
+            ):
+                file_contents = GitService.get_instance_file_contents_for_revision(process_model, first_revision, "form.json")
+                assert file_contents == '{"version": 1}'
+                with pytest.raises(GitCommandError):
+                    GitService.get_instance_file_contents_for_revision(process_model, "HEAD", "does_not_exist.json")
+            assert run_shell_command_spy.call_count == 6
+        GitService.CAT_FILE_BATCH_READERS.pop(repo_dir).close()
+        GitService.FILE_CONTENTS_CACHE.clear()
+        GitService.COMMIT_ID_CACHE.clear()
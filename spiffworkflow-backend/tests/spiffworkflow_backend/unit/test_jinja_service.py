@@ -60,3 +60,16 @@ class TestJinjaService(BaseTest):
                 r"* From ScriptTask: Sanitized \| from \| script \| task",
             ]
         )
+
+    def test_reuses_compiled_templates(self, app: Flask) -> None:
+        JinjaService.COMPILED_TEMPLATE_CACHE.clear()
+        template = "Hello {{ name | sanitize_for_md }}"
+        assert JinjaService.render_jinja_template(template, task_data={"name": "a|b"}) == r"Hello a\|b"
+        misses = JinjaService.COMPILED_TEMPLATE_CACHE.misses
+        assert JinjaService.render_jinja_template(template, task_data={"name": "c"}) == "Hello c"
+        assert JinjaService.COMPILED_TEMPLATE_CACHE.misses == misses
+        assert len(JinjaService.COMPILED_TEMPLATE_CACHE) == 1
+
+        with self.app_config_mock(app, "SPIFFWORKFLOW_BACKEND_JINJA_TEMPLATE_CACHE_MAX_SIZE", 0):
+            assert JinjaService.render_jinja_template(template, task_data={"name": "d"}) == "Hello d"
+            assert len(JinjaService.COMPILED_TEMPLATE_CACHE) == 0
@@ -3,6 +3,7 @@ import time
 from flask import Flask
 from flask import g
 from flask.testing import FlaskClient
+from pytest_mock.plugin import MockerFixture
 
 from spiffworkflow_backend.helpers.spiff_enum import ProcessInstanceExecutionMode
 from spiffworkflow_backend.models.db import db
@@ -167,6 +168,115 @@ class TestMessageService(BaseTest):
         for message_instance in message_instances:
             assert message_instance.correlation_keys == {"invoice": {"po_number": 1001, "customer_id": "Sartography"}}
 
+    def test_receive_messages_are_found_with_stored_correlation_keys(
+        self,
+        app: Flask,
+        client: FlaskClient,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        payload = {
+            "customer_id": "Sartography",
+            "po_number": 1001,
+            "description": "We built a new feature for messages!",
+            "amount": "100.00",
+        }
+        load_test_spec(
+            "test_group/message_receive",
+            process_model_source_directory="message_send_one_conversation",
+            bpmn_file_name="message_receiver.bpmn",
+        )
+        process_instance = self.start_sender_process(client, payload, "test_between_processes")
+        MessageService.correlate_all_message_instances()
+
+        waiting_message = MessageInstanceModel.query.filter_by(
+            message_type="receive", status="ready", process_instance_id=process_instance.id
+        ).first()
+        assert waiting_message is not None
+        assert len(waiting_message.correlation_key_records) > 0
+        send_message = MessageInstanceModel.query.filter_by(message_type="send", status="ready").first()
+        assert send_message is not None
+        assert MessageService.find_receive_message_for_send_message(send_message) == waiting_message
+
+        # receive messages without stored keys are still found by evaluating their retrieval expressions
+        for correlation_key_record in waiting_message.correlation_key_records:
+            db.session.delete(correlation_key_record)
+        db.session.commit()
+        assert MessageService.find_receive_message_for_send_message(send_message) == waiting_message
+        assert len(waiting_message.correlation_key_records) > 0
+
+        MessageService.correlate_all_message_instances()
+        assert process_instance.status == "complete"
+
+    def test_can_correlate_messages_in_batches(
+        self,
+        app: Flask,
+        client: FlaskClient,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        payload = {
+            "customer_id": "Sartography",
+            "po_number": 1001,
+            "description": "We built a new feature for messages!",
+            "amount": "100.00",
+        }
+        load_test_spec(
+            "test_group/message_receive",
+            process_model_source_directory="message_send_one_conversation",
+            bpmn_file_name="message_receiver.bpmn",
+        )
+        process_instance = self.start_sender_process(client, payload, "test_between_processes")
+
+        with self.app_config_mock(app, "SPIFFWORKFLOW_BACKEND_MESSAGE_CORRELATION_BATCH_SIZE", 2):
+            # the first send has no waiting receive so it starts the receiver process through its message start event
+            MessageService.correlate_all_message_instances()
+            self.assure_there_is_a_process_waiting_on_a_message(process_instance)
+
+            # the response from the receiver process is matched with the waiting receive and delivered in a batch
+            MessageService.correlate_all_message_instances()
+
+        assert process_instance.status == "complete"
+        message_instances = MessageInstanceModel.query.all()
+        assert len(message_instances) == 4
+        for message_instance in message_instances:
+            assert message_instance.status == "completed"
+            assert message_instance.counterpart_id is not None
+        assert MessageService.claim_ready_send_messages(2) == []
+
+    def test_batched_messages_are_released_when_they_cannot_be_queued(
+        self,
+        app: Flask,
+        client: FlaskClient,
+        mocker: MockerFixture,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        payload = {
+            "customer_id": "Sartography",
+            "po_number": 1001,
+            "description": "We built a new feature for messages!",
+            "amount": "100.00",
+        }
+        load_test_spec(
+            "test_group/message_receive",
+            process_model_source_directory="message_send_one_conversation",
+            bpmn_file_name="message_receiver.bpmn",
+        )
+        process_instance = self.start_sender_process(client, payload, "test_between_processes")
+
+        with self.app_config_mock(app, "SPIFFWORKFLOW_BACKEND_MESSAGE_CORRELATION_BATCH_SIZE", 2):
+            MessageService.correlate_all_message_instances()
+            self.assure_there_is_a_process_waiting_on_a_message(process_instance)
+
+            with self.app_config_mock(app, "SPIFFWORKFLOW_BACKEND_CELERY_ENABLED", True):
+                mocker.patch("celery.current_app.send_task", side_effect=Exception("broker is down"))
+                MessageService.correlate_all_message_instances()
+            assert MessageInstanceModel.query.filter_by(status="running").count() == 0
+
+            MessageService.correlate_all_message_instances()
+
+        assert process_instance.status == "complete"
+        for message_instance in MessageInstanceModel.query.all():
+            assert message_instance.status == "completed"
+
     def test_start_process_with_message_when_failure(
         self,
         app: Flask,
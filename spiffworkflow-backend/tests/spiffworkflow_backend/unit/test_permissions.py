@@ -1,11 +1,14 @@
 from flask.app import Flask
 from flask.testing import FlaskClient
+from pytest_mock.plugin import MockerFixture
 
+from spiffworkflow_backend.models.cache_generation import CacheGenerationModel
 from spiffworkflow_backend.models.db import db
 from spiffworkflow_backend.models.group import GroupModel
 from spiffworkflow_backend.models.permission_assignment import PermissionAssignmentModel
 from spiffworkflow_backend.models.permission_target import PermissionTargetModel
 from spiffworkflow_backend.models.principal import PrincipalModel
+from spiffworkflow_backend.services.authorization_service import AuthorizationService
 from spiffworkflow_backend.services.user_service import UserService
 from tests.spiffworkflow_backend.helpers.base_test import BaseTest
 from tests.spiffworkflow_backend.helpers.test_data import load_test_spec
@@ -169,3 +172,116 @@ class TestPermissions(BaseTest):
         self.assert_user_has_permission(group_a_admin, "update", "/process-models/")
         self.assert_user_has_permission(group_a_admin, "update", "/process-models")
         self.assert_user_has_permission(group_a_admin, "update", "/process-modelshey", expected_result=False)
+
+    def test_permission_matcher_gives_the_same_results_as_the_database(
+        self, app: Flask, with_db_and_bpmn_file_cleanup: None
+    ) -> None:
+        user = self.find_or_create_user()
+        self.add_permissions_to_user(user, target_uri="/process-models/group_a:%", permission_names=["read"])
+        self.add_permissions_to_user(
+            user, target_uri="/process-models/group_a:secret:%", permission_names=["read"], grant_type="deny"
+        )
+        self.add_permissions_to_user(user, target_uri="/process-instances/%", permission_names=["read"])
+        self.add_permissions_to_user(user, target_uri="/task-data/5", permission_names=["read"])
+        self.add_permissions_to_user(user, target_uri="/messages/a_b", permission_names=["update"])
+        self.add_permissions_to_user(user, target_uri="/logs", permission_names=["read", "update"])
+
+        uris_to_check = [
+            "/process-models/group_a",
+            "/process-models/group_a:",
+            "/process-models/group_a:model",
+            "/process-models/groupXa:model",
+            "/process-models/group_a:secret",
+            "/process-models/group_a:secret:model",
+            "/process-models/group_b:model",
+            "/Process-Models/group_a:model",
+            # the base of a wildcard target matches but other uris sharing its prefix do not
+            "/process-instances",
+            "/process-instances/",
+            "/process-instances/5/task-data",
+            "/process-instancesX",
+            "/task-data/5",
+            "/task-data/55",
+            "/task-data/5/more",
+            # _ matches any single character since targets are LIKE patterns
+            "/messages/a_b",
+            "/messages/aXb",
+            "/messages/aXXb",
+            "/messages/A_B",
+            "/logs",
+            "/LOGS",
+            "/logs/more",
+            "/v1.0/logs",
+        ]
+        for permission in ["read", "update", "delete"]:
+            for uri in uris_to_check:
+                with self.app_config_mock(app, "SPIFFWORKFLOW_BACKEND_PERMISSION_MATCHER_CACHE_MAX_SIZE", 0):
+                    expected_result = AuthorizationService.user_has_permission(user, permission, uri)
+                assert (
+                    AuthorizationService.user_has_permission(user, permission, uri) == expected_result
+                ), f"Permission matcher did not match the database for: {permission} {uri}"
+
+        assert AuthorizationService.user_has_permission(user, "read", "/process-models/group_a:model")
+        assert not AuthorizationService.user_has_permission(user, "read", "/process-models/group_a:secret:model")
+
+        # changing permissions bumps the generation so the cached matcher is not used anymore
+        self.add_permissions_to_user(user, target_uri="/process-models/group_b:%", permission_names=["read"])
+        assert AuthorizationService.user_has_permission(user, "read", "/process-models/group_b:model")
+
+    def test_permission_generation_is_looked_up_once_per_request(
+        self, app: Flask, mocker: MockerFixture, with_db_and_bpmn_file_cleanup: None
+    ) -> None:
+        user = self.find_or_create_user()
+        self.add_permissions_to_user(user, target_uri="/process-models/group_a:%", permission_names=["read"])
+        newest_generation_spy = mocker.spy(CacheGenerationModel, "newest_generation_for_table")
+
+        with app.test_request_context("/v1.0/process-models"):
+            assert AuthorizationService.user_has_permission(user, "read", "/process-models/group_a:model")
+            assert not AuthorizationService.user_has_permission(user, "read", "/process-models/group_b:model")
+            assert newest_generation_spy.call_count == 1
+
+            # permissions changed during the request are still seen by the rest of it
+            self.add_permissions_to_user(user, target_uri="/process-models/group_b:%", permission_names=["read"])
+            assert AuthorizationService.user_has_permission(user, "read", "/process-models/group_b:model")
+            assert newest_generation_spy.call_count == 2
+
+        with app.test_request_context("/v1.0/process-models"):
+            assert AuthorizationService.user_has_permission(user, "read", "/process-models/group_b:model")
+            assert newest_generation_spy.call_count == 3
+
+    def test_permission_assignment_matcher_gives_the_same_results_as_permission_assignments_include(
+        self, app: Flask, with_db_and_bpmn_file_cleanup: None
+    ) -> None:
+        user = self.find_or_create_user()
+        self.add_permissions_to_user(user, target_uri="/process-groups/group_a:%", permission_names=["read"])
+        self.add_permissions_to_user(
+            user, target_uri="/process-groups/group_a:secret:%", permission_names=["read"], grant_type="deny"
+        )
+        self.add_permissions_to_user(user, target_uri="/process-models/group_b:model", permission_names=["read"])
+        self.add_permissions_to_user(user, target_uri="/process-instances/%", permission_names=["create"])
+
+        permission_assignments = AuthorizationService.all_permission_assignments_for_user(user=user)
+        permission_assignment_matcher = AuthorizationService.permission_assignment_matcher_for_user(user=user)
+        uris_to_check = [
+            "/process-groups/group_a",
+            "/process-groups/group_a:",
+            "/process-groups/group_a:model",
+            "/process-groups/group_ab",
+            "/process-groups/group_a:secret",
+            "/process-groups/group_a:secret:model",
+            "/process-models/group_b:model",
+            "/process-models/group_b:model:more",
+            "/process-instances",
+            "/v1.0/process-instances/group_b:model",
+            "/process-instances/*",
+        ]
+        for permission in ["read", "create"]:
+            for uri in uris_to_check:
+                expected_result = AuthorizationService.permission_assignments_include(permission_assignments, permission, uri)
+                assert (
+                    AuthorizationService.permission_assignment_matcher_includes(permission_assignment_matcher, permission, uri)
+                    == expected_result
+                ), f"Permission assignment matcher did not match permission_assignments_include for: {permission} {uri}"
+
+        assert permission_assignment_matcher.has_target_starting_with("read", "permit", "/process-models/group_b:")
+        assert not permission_assignment_matcher.has_target_starting_with("read", "permit", "/process-models/group_c:")
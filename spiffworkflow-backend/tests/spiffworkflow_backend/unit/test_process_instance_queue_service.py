@@ -5,7 +5,11 @@ import pytest
 from flask.app import Flask
 from pytest_mock.plugin import MockerFixture
 
+from spiffworkflow_backend.exceptions.api_error import ApiError
+from spiffworkflow_backend.models.db import db
 from spiffworkflow_backend.models.process_instance import ProcessInstanceModel
+from spiffworkflow_backend.models.process_instance_queue import ProcessInstanceQueueModel
+from spiffworkflow_backend.models.process_instance_queue import ProcessInstanceQueuePriority
 from spiffworkflow_backend.services.process_instance_lock_service import ProcessInstanceLockService
 from spiffworkflow_backend.services.process_instance_queue_service import ProcessInstanceIsAlreadyLockedError
 from spiffworkflow_backend.services.process_instance_queue_service import ProcessInstanceQueueService
@@ -138,3 +142,84 @@ class TestProcessInstanceQueueService(BaseTest):
             with ProcessInstanceQueueService.dequeued(process_instance):
                 pass
         assert dequeue_mocker.call_count == 6
+
+    def test_claim_many_locks_queue_entries_for_this_locked_by(
+        self,
+        app: Flask,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        process_instance = self._create_process_instance()
+        other_process_instance = self._create_process_instance()
+        locked_by = ProcessInstanceLockService.locked_by()
+
+        queue_entries = ProcessInstanceQueueService.claim_many("not_started", round(time.time()), limit=1)
+        assert len(queue_entries) == 1
+        assert queue_entries[0].locked_by == locked_by
+        claimed_process_instance_id = queue_entries[0].process_instance_id
+        assert ProcessInstanceQueueService.peek_many("not_started", round(time.time())) == [
+            pi.id for pi in [process_instance, other_process_instance] if pi.id != claimed_process_instance_id
+        ]
+
+        # dequeuing a claimed process instance uses the claim and unlocks it like any other dequeue
+        claimed_process_instance = ProcessInstanceModel.query.filter_by(id=claimed_process_instance_id).first()
+        with ProcessInstanceQueueService.dequeued(claimed_process_instance):
+            assert ProcessInstanceLockService.has_lock(claimed_process_instance_id)
+        assert not ProcessInstanceLockService.has_lock(claimed_process_instance_id)
+        assert claimed_process_instance_id in ProcessInstanceQueueService.peek_many("not_started", round(time.time()))
+
+        # claims that are never dequeued get released
+        queue_entries = ProcessInstanceQueueService.claim_many(
+            "not_started", round(time.time()), exclude_process_instance_ids={claimed_process_instance_id}
+        )
+        assert [queue_entry.process_instance_id for queue_entry in queue_entries] == [
+            pi.id for pi in [process_instance, other_process_instance] if pi.id != claimed_process_instance_id
+        ]
+        ProcessInstanceQueueService.release_claims()
+        assert sorted(ProcessInstanceQueueService.peek_many("not_started", round(time.time()))) == sorted(
+            [process_instance.id, other_process_instance.id]
+        )
+
+    def test_queue_entries_run_by_priority_with_aging_and_fair_share_across_process_models(
+        self,
+        app: Flask,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        bulk_process_instances = [self._create_process_instance() for _ in range(3)]
+        other_process_model = load_test_spec(
+            "test_group/hello_world",
+            bpmn_file_name="hello_world.bpmn",
+            process_model_source_directory="hello_world",
+        )
+        other_process_instance = self.create_process_instance_from_process_model(
+            process_model=other_process_model, user=self.find_or_create_user("initiator_user")
+        )
+        run_at_in_seconds = round(time.time()) - 100
+        db.session.query(ProcessInstanceQueueModel).update({"run_at_in_seconds": run_at_in_seconds})
+        db.session.commit()
+
+        def run_order() -> list[int]:
+            return ProcessInstanceQueueService.peek_many("not_started", round(time.time()))
+
+        with self.app_config_mock(app, "SPIFFWORKFLOW_BACKEND_PROCESS_INSTANCE_QUEUE_PRIORITY_AGING_IN_SECONDS", 300):
+            with self.app_config_mock(app, "SPIFFWORKFLOW_BACKEND_PROCESS_INSTANCE_QUEUE_FAIR_SHARE_IN_SECONDS", 10):
+                # the other process model gets a turn before the rest of the bulk instances
+                expected_order = [bulk_process_instances[0].id, other_process_instance.id] + [
+                    pi.id for pi in bulk_process_instances[1:]
+                ]
+                assert run_order() == expected_order
+                queue_entries = ProcessInstanceQueueService.claim_many("not_started", round(time.time()), limit=2)
+                assert [queue_entry.process_instance_id for queue_entry in queue_entries] == expected_order[0:2]
+                ProcessInstanceQueueService.release_claims()
+
+                ProcessInstanceQueueService.set_priority(other_process_instance, ProcessInstanceQueuePriority.low.value)
+                assert run_order() == [pi.id for pi in bulk_process_instances] + [other_process_instance.id]
+
+                # a low priority entry that has waited long enough runs before newer entries
+                db.session.query(ProcessInstanceQueueModel).filter_by(process_instance_id=other_process_instance.id).update(
+                    {"run_at_in_seconds": run_at_in_seconds - 600}
+                )
+                db.session.commit()
+                assert run_order() == [other_process_instance.id] + [pi.id for pi in bulk_process_instances]
+
+        with pytest.raises(ApiError):
+            ProcessInstanceQueueService.set_priority(other_process_instance, 7)
@@ -1,8 +1,13 @@
+import json
+import os
 import re
 
 from flask import Flask
+from pytest_mock.plugin import MockerFixture
 
 from spiffworkflow_backend.services.authorization_service import AuthorizationService
+from spiffworkflow_backend.services.file_system_service import FileSystemService
+from spiffworkflow_backend.services.process_model_catalog import ProcessModelCatalog
 from spiffworkflow_backend.services.process_model_service import ProcessModelService
 from spiffworkflow_backend.services.user_service import UserService
 from tests.spiffworkflow_backend.helpers.base_test import BaseTest
@@ -170,3 +175,59 @@ class TestProcessModelService(BaseTest):
         # this model should not show up in results because it is not executable
         process_models = ProcessModelService.get_process_models_for_api(user=user, recursive=True, filter_runnable_by_user=True)
         assert len(process_models) == 1
+
+    def test_extract_metadata_caches_extraction_paths_until_the_process_model_changes(
+        self,
+        app: Flask,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        process_model = load_test_spec(
+            "test_group/hello_world",
+            bpmn_file_name="hello_world.bpmn",
+            process_model_source_directory="hello_world",
+        )
+        ProcessModelService.update_process_model(
+            process_model, {"metadata_extraction_paths": [{"key": "outer_inner", "path": "outer.inner"}]}
+        )
+        data = {"outer": {"inner": "value_one"}}
+        assert ProcessModelService.extract_metadata(process_model.id, data) == {"outer_inner": "value_one"}
+        cached_paths = [paths for (_, paths) in ProcessModelService.METADATA_EXTRACTION_PATHS_CACHE.values()]
+        assert [("outer_inner", ["outer", "inner"])] in cached_paths
+
+        # saving the process model drops the cached paths
+        metadata_extraction_paths = [{"key": "outer", "path": "outer"}]
+        ProcessModelService.update_process_model(process_model, {"metadata_extraction_paths": metadata_extraction_paths})
+        assert ProcessModelService.extract_metadata(process_model.id, data) == {"outer": {"inner": "value_one"}}
+
+    def test_lists_process_models_from_the_catalog_until_files_change(
+        self,
+        app: Flask,
+        with_db_and_bpmn_file_cleanup: None,
+        mocker: MockerFixture,
+    ) -> None:
+        # load_test_spec does not write a process_group.json so create the group first
+        self.create_process_group("test_group", display_name="Test Group")
+        process_model = load_test_spec(
+            "test_group/hello_world",
+            bpmn_file_name="hello_world.bpmn",
+            process_model_source_directory="hello_world",
+        )
+        assert [pm.id for pm in ProcessModelService.get_process_models(recursive=True)] == [process_model.id]
+
+        read_json_file_spy = mocker.spy(ProcessModelCatalog, "read_json_file")
+        assert [pm.id for pm in ProcessModelService.get_process_models(recursive=True)] == [process_model.id]
+        process_groups = ProcessModelService.get_process_groups()
+        assert [pg.id for pg in process_groups] == ["test_group"]
+        assert process_groups[0].display_name == "Test Group"
+        assert [pm.id for pm in process_groups[0].process_models] == [process_model.id]
+        assert read_json_file_spy.call_count == 0
+
+        # a process model written directly to disk is picked up without clearing the catalog
+        other_model_path = os.path.join(FileSystemService.root_path(), "test_group", "other_model")
+        os.makedirs(other_model_path)
+        with open(os.path.join(other_model_path, "process_model.json"), "w") as f:
+            json.dump({"display_name": "Other Model", "description": ""}, f)
+        process_models = ProcessModelService.get_process_models(recursive=True)
+        assert [pm.id for pm in process_models] == ["test_group/hello_world", "test_group/other_model"]
+        assert process_models[1].display_name == "Other Model"
+        assert read_json_file_spy.call_count > 0
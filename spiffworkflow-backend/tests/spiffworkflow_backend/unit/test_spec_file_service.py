@@ -5,6 +5,7 @@ import pytest
 from flask import Flask
 from flask.testing import FlaskClient
 from lxml import etree  # type: ignore
+from pytest_mock.plugin import MockerFixture
 
 from spiffworkflow_backend.models.cache_generation import CacheGenerationModel
 from spiffworkflow_backend.models.db import db
@@ -202,6 +203,36 @@ class TestSpecFileService(BaseTest):
         assert dmn1[0].identifier == "Decision_0vrtcmk"
         assert dmn1[0].type == "decision"
 
+    def test_reuses_references_until_the_file_changes(
+        self,
+        app: Flask,
+        mocker: MockerFixture,
+        client: FlaskClient,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        process_model = load_test_spec(
+            process_model_id="test_group/call_activity_nested",
+            process_model_source_directory="call_activity_nested",
+        )
+        files = SpecFileService.get_files(process_model)
+        file = next(filter(lambda f: f.name == "call_activity_level_3.bpmn", files))
+        get_references_spy = mocker.spy(SpecFileService, "get_references_for_file_contents")
+
+        references = SpecFileService.get_references_for_file(file, process_model)
+        references[0].display_name = "changed by the caller"
+        references = SpecFileService.get_references_for_file(file, process_model)
+        assert references[0].display_name == "Level 3"
+        assert get_references_spy.call_count == 1
+
+        full_file_path = SpecFileService.full_file_path(process_model, file.name)
+        with open(full_file_path, "rb") as f:
+            file_contents = f.read()
+        with open(full_file_path, "wb") as f:
+            f.write(file_contents.replace(b'name="Level 3"', b'name="Level Three"'))
+        references = SpecFileService.get_references_for_file(file, process_model)
+        assert references[0].display_name == "Level Three"
+        assert get_references_spy.call_count == 2
+
     def test_validate_bpmn_xml_with_invalid_xml(
         self,
         app: Flask,
@@ -1,10 +1,18 @@
+import pytest
 from flask import Flask
+from pytest_mock.plugin import MockerFixture
+from SpiffWorkflow.util.task import TaskState  # type: ignore
 
+from spiffworkflow_backend.exceptions.api_error import ApiError
 from spiffworkflow_backend.models.bpmn_process import BpmnProcessModel
 from spiffworkflow_backend.models.bpmn_process_definition import BpmnProcessDefinitionModel
+from spiffworkflow_backend.models.db import db
+from spiffworkflow_backend.models.json_data import JsonDataModel
 from spiffworkflow_backend.models.task import TaskModel  # noqa: F401
 from spiffworkflow_backend.models.task_definition import TaskDefinitionModel
 from spiffworkflow_backend.services.process_instance_processor import ProcessInstanceProcessor
+from spiffworkflow_backend.services.task_service import TaskChangeTracker
+from spiffworkflow_backend.services.task_service import TaskDataSizeTracker
 from spiffworkflow_backend.services.task_service import TaskService
 from tests.spiffworkflow_backend.helpers.base_test import BaseTest
 from tests.spiffworkflow_backend.helpers.test_data import load_test_spec
@@ -176,3 +184,196 @@ class TestTaskService(BaseTest):
         assert signal_event["event"]["name"] == "eat_spam"
         assert signal_event["event"]["typename"] == "SignalEventDefinition"
         assert signal_event["label"] == "Eat Spam"
+
+    def test_task_data_sizes_are_tracked_as_tasks_are_saved(
+        self,
+        app: Flask,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        process_model = load_test_spec(
+            process_model_id="test_group/simple_script",
+            process_model_source_directory="simple_script",
+        )
+        process_instance = self.create_process_instance_from_process_model(process_model)
+        processor = ProcessInstanceProcessor(process_instance)
+        processor.do_engine_steps(save=True)
+
+        tracker = processor.task_data_size_tracker
+        assert tracker is not None
+        assert len(tracker.task_data_sizes) > 0
+        assert tracker.total_size == sum(tracker.task_data_sizes.values())
+        assert tracker.total_size <= ProcessInstanceProcessor.get_task_data_size(processor.bpmn_process_instance)
+
+        guid = list(tracker.task_data_sizes.keys())[0]
+        tracker.set_task_data_size(guid, TaskDataSizeTracker.TASK_DATA_SIZE_LIMIT + 1)
+        assert tracker.limit_exceeded()
+        tracker.remove_task(guid)
+        assert not tracker.limit_exceeded()
+
+    def test_task_data_stored_as_deltas_can_be_rebuilt(
+        self,
+        app: Flask,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        base_data = {"big": "x" * 500, "removed": 1, "changed": 1}
+        (base_dict, _) = JsonDataModel.json_data_dict_and_size_from_dict(base_data)
+        data = {"big": "x" * 500, "changed": 2, "added": [1, 2]}
+        (full_dict, _) = JsonDataModel.json_data_dict_and_size_from_dict(data)
+        delta = JsonDataModel.delta_between(base_data, data)
+        assert delta == {"set": {"changed": 2, "added": [1, 2]}, "removed": ["removed"]}
+
+        JsonDataModel.insert_or_update_json_data_records(
+            {
+                base_dict["hash"]: base_dict,
+                full_dict["hash"]: {"hash": full_dict["hash"], "data": delta, "delta_base_hash": base_dict["hash"]},
+            }
+        )
+        db.session.commit()
+        data_dicts = JsonDataModel.find_data_dicts_by_hashes([full_dict["hash"], base_dict["hash"], "missing"])
+        assert data_dicts == {full_dict["hash"]: data, base_dict["hash"]: base_data}
+        assert JsonDataModel.find_data_dict_by_hash(full_dict["hash"]) == data
+
+    def test_task_data_delta_storage_keeps_task_data_intact(
+        self,
+        app: Flask,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        process_model = load_test_spec(
+            process_model_id="test_group/simple_script",
+            process_model_source_directory="simple_script",
+        )
+        with self.app_config_mock(app, "SPIFFWORKFLOW_BACKEND_JSON_DATA_DELTA_SNAPSHOT_INTERVAL", 2):
+            process_instance = self.create_process_instance_from_process_model(process_model)
+            processor = ProcessInstanceProcessor(process_instance)
+            processor.do_engine_steps(save=True)
+
+        for spiff_task in processor.bpmn_process_instance.get_tasks():
+            task_model = TaskModel.query.filter_by(guid=str(spiff_task.id)).first()
+            assert task_model is not None
+            assert task_model.json_data() == spiff_task.data
+
+    def test_unchanged_tasks_are_not_saved_again(
+        self,
+        app: Flask,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        process_model = load_test_spec(
+            process_model_id="test_group/manual_task",
+            process_model_source_directory="manual_task",
+        )
+        process_instance = self.create_process_instance_from_process_model(process_model)
+        processor = ProcessInstanceProcessor(process_instance)
+        processor.do_engine_steps(save=True)
+
+        processor = ProcessInstanceProcessor(process_instance)
+        ready_tasks = processor.bpmn_process_instance.get_tasks(state=TaskState.READY)
+        assert len(ready_tasks) == 1
+        ready_task = ready_tasks[0]
+        task_model = processor.task_model_mapping[str(ready_task.id)]
+        assert TaskChangeTracker(processor.task_model_mapping, task_model.python_env_data_hash).task_unchanged(ready_task)
+
+        ready_task.data = {**ready_task.data, "new_key": "new_value"}
+        assert not TaskChangeTracker(processor.task_model_mapping, task_model.python_env_data_hash).task_unchanged(ready_task)
+        processor.do_engine_steps(save=True)
+        assert TaskChangeTracker(processor.task_model_mapping, task_model.python_env_data_hash).task_unchanged(ready_task)
+        db.session.refresh(task_model)
+        assert task_model.json_data()["new_key"] == "new_value"
+
+        # data changed in place is noticed as well
+        ready_task.data["new_key"] = "changed_value"
+        assert not TaskChangeTracker(processor.task_model_mapping, task_model.python_env_data_hash).task_unchanged(ready_task)
+        processor.do_engine_steps(save=True)
+        db.session.refresh(task_model)
+        assert task_model.json_data()["new_key"] == "changed_value"
+
+        # tasks saved with an older python env are saved again so their python env data stays current
+        assert not TaskChangeTracker(processor.task_model_mapping, "other_python_env_data_hash").task_unchanged(ready_task)
+
+    def test_task_models_can_be_prefetched(
+        self,
+        app: Flask,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        process_model = load_test_spec(
+            process_model_id="test_group/manual_task",
+            process_model_source_directory="manual_task",
+        )
+        process_instance = self.create_process_instance_from_process_model(process_model)
+        processor = ProcessInstanceProcessor(process_instance)
+        processor.do_engine_steps(save=True)
+
+        processor = ProcessInstanceProcessor(process_instance)
+        task_service = TaskService(
+            process_instance=process_instance,
+            serializer=processor._serializer,
+            bpmn_definition_to_task_definitions_mappings=processor.bpmn_definition_to_task_definitions_mappings,
+        )
+        spiff_tasks = processor.bpmn_process_instance.get_tasks()
+        task_service.prefetch_task_models(spiff_tasks)
+        saved_task_guids = {t.guid for t in TaskModel.query.filter_by(process_instance_id=process_instance.id).all()}
+        assert set(task_service.prefetched_task_models.keys()) == saved_task_guids
+        assert task_service.new_task_guids == {str(t.id) for t in spiff_tasks} - saved_task_guids
+
+        ready_task = processor.bpmn_process_instance.get_tasks(state=TaskState.READY)[0]
+        (_, task_model) = task_service.find_or_create_task_model_from_spiff_task(ready_task)
+        assert task_model is task_service.prefetched_task_models[str(ready_task.id)]
+
+    def test_bpmn_process_data_is_hashed_once_per_workflow_when_saving(
+        self,
+        app: Flask,
+        mocker: MockerFixture,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        process_model = load_test_spec(
+            process_model_id="test_group/manual_task_with_subprocesses",
+            process_model_source_directory="manual_task_with_subprocesses",
+        )
+        process_instance = self.create_process_instance_from_process_model(process_model)
+        processor = ProcessInstanceProcessor(process_instance)
+        processor.do_engine_steps(save=True)
+
+        processor = ProcessInstanceProcessor(process_instance)
+        task_service = TaskService(
+            process_instance=process_instance,
+            serializer=processor._serializer,
+            bpmn_definition_to_task_definitions_mappings=processor.bpmn_definition_to_task_definitions_mappings,
+            task_model_mapping=processor.task_model_mapping,
+            bpmn_subprocess_mapping=processor.bpmn_subprocess_mapping,
+        )
+        hash_spy = mocker.spy(task_service, "update_task_data_on_bpmn_process")
+        spiff_tasks = processor.bpmn_process_instance.get_tasks()
+        for spiff_task in spiff_tasks:
+            task_service.update_task_model_with_spiff_task(spiff_task)
+        assert hash_spy.call_count == 0
+
+        task_service.save_objects_to_database()
+        assert hash_spy.call_count == len({id(spiff_task.workflow) for spiff_task in spiff_tasks})
+        assert hash_spy.call_count == len(task_service.bpmn_processes)
+
+    def test_task_data_size_limit_counts_tasks_saved_before_the_instance_was_loaded(
+        self,
+        app: Flask,
+        mocker: MockerFixture,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        process_model = load_test_spec(
+            process_model_id="test_group/dynamic_enum_select_fields",
+            process_model_source_directory="dynamic_enum_select_fields",
+        )
+        process_instance = self.create_process_instance_from_process_model(process_model)
+        processor = ProcessInstanceProcessor(process_instance)
+        processor.do_engine_steps(save=True)
+        assert process_instance.status == "user_input_required"
+
+        processor = ProcessInstanceProcessor(process_instance)
+        # loading an instance only to read it does not measure its task data
+        assert processor.task_data_size_tracker is None
+        processor.do_engine_steps(save=True)
+        assert processor.task_data_size_tracker is not None
+        assert processor.task_data_size_tracker.total_size > 0
+
+        mocker.patch.object(TaskDataSizeTracker, "TASK_DATA_SIZE_LIMIT", processor.task_data_size_tracker.total_size - 1)
+        processor = ProcessInstanceProcessor(process_instance)
+        with pytest.raises(ApiError) as exception:
+            processor.do_engine_steps(save=True)
+        assert exception.value.error_code == "task_data_size_exceeded"
@@ -0,0 +1,74 @@
+from flask.app import Flask
+from flask.testing import FlaskClient
+
+from spiffworkflow_backend.services.process_model_service import ProcessModelService
+from spiffworkflow_backend.services.spec_file_service import SpecFileService
+from spiffworkflow_backend.services.workflow_spec_service import WorkflowSpecService
+from tests.spiffworkflow_backend.helpers.base_test import BaseTest
+from tests.spiffworkflow_backend.helpers.test_data import load_test_spec
+
+
+class TestWorkflowSpecService(BaseTest):
+    def test_get_spec_uses_cache_until_a_file_changes(
+        self,
+        app: Flask,
+        client: FlaskClient,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        process_model = load_test_spec(
+            process_model_id="test_group/simple_script",
+            process_model_source_directory="simple_script",
+        )
+        WorkflowSpecService.clear_spec_cache()
+        files = ProcessModelService.get_process_model_files(process_model)
+
+        misses_before = WorkflowSpecService.SPEC_CACHE.misses
+        hits_before = WorkflowSpecService.SPEC_CACHE.hits
+        (spec_one, _) = WorkflowSpecService.get_spec(files, process_model)
+        (spec_two, _) = WorkflowSpecService.get_spec(files, process_model)
+        assert spec_one is spec_two
+        assert WorkflowSpecService.SPEC_CACHE.misses == misses_before + 1
+        assert WorkflowSpecService.SPEC_CACHE.hits == hits_before + 1
+
+        # changing the file contents on disk changes the digest so the spec is parsed again
+        bpmn_file_name = files[0].name
+        full_file_path = SpecFileService.full_file_path(process_model, bpmn_file_name)
+        with open(full_file_path, "ab") as f:
+            f.write(b"\n")
+        (spec_three, _) = WorkflowSpecService.get_spec(files, process_model)
+        assert spec_three is not spec_one
+        (spec_four, _) = WorkflowSpecService.get_spec(files, process_model)
+        assert spec_four is spec_three
+
+        # saving a file through the spec file service clears the cache
+        SpecFileService.update_file(process_model, bpmn_file_name, SpecFileService.get_data(process_model, bpmn_file_name))
+        assert len(WorkflowSpecService.SPEC_CACHE) == 0
+        (spec_five, _) = WorkflowSpecService.get_spec(files, process_model)
+        assert spec_five is not spec_four
+
+    def test_get_spec_revalidates_files_from_called_process_models(
+        self,
+        app: Flask,
+        client: FlaskClient,
+        with_db_and_bpmn_file_cleanup: None,
+    ) -> None:
+        process_model = load_test_spec(
+            process_model_id="test_group/call_activity_nested",
+            process_model_source_directory="call_activity_nested",
+        )
+        WorkflowSpecService.clear_spec_cache()
+        files = ProcessModelService.get_process_model_files(process_model)
+        bpmn_files = [f for f in files if f.name.endswith(".bpmn")]
+
+        # only hand over the primary file so the called processes are found through their references
+        primary_file = [f for f in bpmn_files if f.name == process_model.primary_file_name]
+        (spec_one, subprocesses) = WorkflowSpecService.get_spec(primary_file, process_model)
+        assert "Level2" in subprocesses
+        cache_entry = list(WorkflowSpecService.SPEC_CACHE._entries.values())[0]
+        assert len(cache_entry.dependency_file_digests) > 0
+
+        dependency_file_path = list(cache_entry.dependency_file_digests.keys())[0]
+        with open(dependency_file_path, "ab") as f:
+            f.write(b"\n")
+        (spec_two, _) = WorkflowSpecService.get_spec(primary_file, process_model)
+        assert spec_two is not spec_one